@@ -7,9 +7,10 @@ import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
+from agents.donation_goals import Goal
 from core.event_bus import EventBus
 from core.interfaces import Event, EventType
 
@@ -73,6 +74,8 @@ class AnalyticsAgent:
         self._subs_count: int = 0
         self._is_live: bool = False
         self._stream_start: float = time.time()
+        self._encoder: dict | None = None
+        self._goals: dict | None = None
         self._subscribe()
 
     @property
@@ -85,6 +88,8 @@ class AnalyticsAgent:
         self._bus.subscribe(EventType.SUBSCRIPTION, self._on_subscription)
         self._bus.subscribe(EventType.VIEWER_COUNT, self._on_viewer_count)
         self._bus.subscribe(EventType.STREAM_STATE, self._on_stream_state)
+        self._bus.subscribe(EventType.ENCODER_HEALTH, self._on_encoder_health)
+        self._bus.subscribe(EventType.GOAL_PROGRESS, self._on_goal_progress)
 
     async def _on_chat(self, event: Event) -> None:
         self._collector.record_chat_message()
@@ -157,6 +162,22 @@ class AnalyticsAgent:
         if activity:
             self._current_activity = activity
 
+    async def _on_encoder_health(self, event: Event) -> None:
+        self._encoder = event.payload
+        await self._broadcast({"type": "encoder_health", "data": event.payload})
+
+    @property
+    def encoder_health(self) -> dict | None:
+        return self._encoder
+
+    async def _on_goal_progress(self, event: Event) -> None:
+        self._goals = event.payload
+        await self._broadcast({"type": "goal_progress", "data": event.payload})
+
+    @property
+    def goals(self) -> dict | None:
+        return self._goals
+
     def _format_uptime(self) -> str:
         elapsed = int(time.time() - self._stream_start)
         hours, remainder = divmod(elapsed, 3600)
@@ -214,6 +235,8 @@ class AnalyticsAgent:
         try:
             await ws.send_text(json.dumps(self._stream_state_msg()))
             await ws.send_text(json.dumps(self._metrics_update_msg()))
+            if self._goals:
+                await ws.send_text(json.dumps({"type": "goal_progress", "data": self._goals}))
             while True:
                 await ws.receive_text()
         except WebSocketDisconnect:
@@ -233,8 +256,13 @@ class AnalyticsAgent:
         }
 
 
-def create_app(agent: AnalyticsAgent | None = None) -> FastAPI:
-    """Build the FastAPI app. If no agent provided, creates a standalone one."""
+def create_app(agent: AnalyticsAgent | None = None, history=None, goals=None) -> FastAPI:
+    """Build the FastAPI app. If no agent provided, creates a standalone one.
+
+    `history` is an optional `core.history.StreamHistory` backing /api/streams/history.
+    `goals` is an optional `agents.donation_goals.DonationGoalTracker` that
+    POST/DELETE /api/stream/goals manage.
+    """
     _app = FastAPI(title="Aiko Analytics API")
     _app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
@@ -253,6 +281,45 @@ def create_app(agent: AnalyticsAgent | None = None) -> FastAPI:
     def get_stream_state() -> dict:
         return collector.snapshot()
 
+    @_app.get("/api/stream/encoder")
+    def get_encoder_health() -> dict:
+        return agent.encoder_health or {"status": "unknown"}
+
+    @_app.post("/api/stream/encoder")
+    async def post_encoder_health(payload: dict) -> dict:
+        """Encoder stats pushed by the streamer process (see streamer.encoder_health)."""
+        await agent._bus.publish(Event(type=EventType.ENCODER_HEALTH, payload=payload, priority=3, source="streamer"))
+        return {"ok": True}
+
+    @_app.get("/api/stream/goals")
+    def get_goals() -> dict:
+        return agent.goals or {"goals": [], "milestones": []}
+
+    @_app.post("/api/stream/goals", status_code=201)
+    async def post_goal(payload: dict) -> dict:
+        """Add a goal: `target`, `description`, optional `kind`, `milestones`, `stretch`, `primary`."""
+        if goals is None:
+            raise HTTPException(status_code=503, detail="goal tracking is not enabled")
+        fields = {k: payload[k] for k in ("target", "description", "kind", "milestones") if k in payload}
+        try:
+            goal = Goal(**fields)
+            goals.add_goal(goal, stretch=bool(payload.get("stretch", False)))
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if payload.get("primary"):
+            goals.set_primary(goal.id)
+        return next(g for g in goals.snapshot() if g["id"] == goal.id)
+
+    @_app.delete("/api/stream/goals/{goal_id}")
+    async def delete_goal(goal_id: str) -> dict:
+        if goals is None:
+            raise HTTPException(status_code=503, detail="goal tracking is not enabled")
+        try:
+            goals.remove_goal(goal_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"no goal {goal_id!r}")
+        return {"ok": True}
+
     @_app.get("/api/revenue/summary")
     def get_revenue_summary() -> dict:
         return {
@@ -266,8 +333,25 @@ def create_app(agent: AnalyticsAgent | None = None) -> FastAPI:
         return {"top_donors": [], "top_chatters": []}
 
     @_app.get("/api/streams/history")
-    def get_stream_history() -> dict:
-        return {"streams": []}
+    def get_stream_history(
+        limit: int = Query(20, ge=1, le=200),
+        cursor: str | None = None,
+        sort: str = "date",
+        since: float | None = None,
+        until: float | None = None,
+        min_revenue: float | None = None,
+        min_engagement: float | None = None,
+        activity: str | None = None,
+    ) -> dict:
+        if history is None:
+            return {"streams": [], "next_cursor": None}
+        try:
+            return history.query(
+                limit=limit, cursor=cursor, sort=sort, since=since, until=until,
+                min_revenue=min_revenue, min_engagement=min_engagement, activity=activity,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     @_app.get("/api/optimization/report")
     def get_optimization_report() -> dict:
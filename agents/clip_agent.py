@@ -1,27 +1,343 @@
 """Clip agent — real-time moment detection and FFmpeg extraction."""
+from __future__ import annotations
+import asyncio
+import math
 import time
-from dataclasses import dataclass, field
-from core.interfaces import EventType
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+
+from loguru import logger
+
+from agents.clip_jobs import DEFAULT_PRIORITIES, ClipJobQueue
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+from streamer.segment_ring import SegmentRing, extract_clip
+
+
+class RollingStats:
+    """Mean and variance over the last `window` values, O(1) per push.
+
+    Sliding-window Welford: each push adds the new value and, once full, removes the
+    oldest, updating the running mean and sum of squared deviations in place.
+    """
+
+    def __init__(self, window: int) -> None:
+        self._values: deque[float] = deque(maxlen=window)
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def window(self) -> int:
+        return self._values.maxlen
+
+    def push(self, x: float) -> None:
+        if len(self._values) == self._values.maxlen:
+            old = self._values[0]
+            n = len(self._values)
+            if n == 1:
+                self._mean = self._m2 = 0.0
+            else:
+                mean = (self._mean * n - old) / (n - 1)
+                self._m2 -= (old - self._mean) * (old - mean)
+                self._mean = mean
+        self._values.append(x)
+        n = len(self._values)
+        delta = x - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (x - self._mean)
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def std(self) -> float:
+        n = len(self._values)
+        return math.sqrt(max(self._m2, 0.0) / (n - 1)) if n > 1 else 0.0
+
+    def zscore(self, x: float, floor: float) -> float:
+        return (x - self._mean) / max(self.std, floor)
+
+
+class Ewma:
+    """Exponentially weighted mean and variance with a half-life in samples."""
+
+    def __init__(self, half_life: float) -> None:
+        self.alpha = 1.0 - 0.5 ** (1.0 / half_life)
+        self.mean: float | None = None
+        self.var = 0.0
+
+    def push(self, x: float) -> None:
+        if self.mean is None:
+            self.mean = x
+            return
+        delta = x - self.mean
+        self.mean += self.alpha * delta
+        self.var = (1.0 - self.alpha) * (self.var + self.alpha * delta * delta)
+
+    def zscore(self, x: float, floor: float) -> float:
+        if self.mean is None:
+            return 0.0
+        return (x - self.mean) / max(math.sqrt(self.var), floor)
+
+
+class RateSignal:
+    """Burst detector for a stream of weighted occurrences (chat lines, dollars, subs).
+
+    Occurrences are summed into `bucket`-second bins. The burst is the total over the
+    last `burst` bins, including the one still open; its baseline is a `RollingStats` of
+    past burst totals over `window` bins. `floor` is the smallest standard deviation
+    used, so a quiet stream does not turn one message into a huge z-score.
+    """
+
+    def __init__(self, floor: float, bucket: float = 1.0, burst: int = 10, window: int = 300) -> None:
+        self.floor = floor
+        self.bucket = bucket
+        self._bins: deque[float] = deque(maxlen=burst)
+        self._burst_sum = 0.0
+        self._open = 0.0
+        self._open_at: float | None = None
+        self.baseline = RollingStats(window)
+
+    def _advance(self, now: float) -> None:
+        if self._open_at is None:
+            self._open_at = now
+            return
+        elapsed = int((now - self._open_at) // self.bucket)
+        if elapsed <= 0:
+            return
+        self._open_at += elapsed * self.bucket
+        # Every bin closes exactly once, so this is amortized O(1) per call; a gap longer
+        # than the baseline window only needs to push that many (empty) bins.
+        for _ in range(min(elapsed, self.baseline.window)):
+            if len(self._bins) == self._bins.maxlen:
+                self._burst_sum -= self._bins[0]
+            self._bins.append(self._open)
+            self._burst_sum += self._open
+            self.baseline.push(self._burst_sum)
+            self._open = 0.0
+
+    def add(self, now: float, weight: float = 1.0) -> None:
+        self._advance(now)
+        self._open += weight
+
+    def burst(self, now: float) -> float:
+        self._advance(now)
+        oldest = self._bins[0] if len(self._bins) == self._bins.maxlen else 0.0
+        return self._burst_sum - oldest + self._open
+
+    def per_minute(self, now: float) -> float:
+        return self.burst(now) * 60.0 / (self.bucket * self._bins.maxlen)
+
+    def zscore(self, now: float) -> float:
+        return self.baseline.zscore(self.burst(now), self.floor)
+
+
+SIGNAL_WEIGHTS = {"chat": 1.0, "donations": 1.0, "subs": 0.8, "viewers": 0.6}
+Z_CAP = 6.0
 
 
-@dataclass
 class MomentDetector:
-    chat_velocity_threshold: float = 30.0
-    _velocity_history: list[float] = field(default_factory=list)
-    _last_clip_time: float = 0.0
-
-    def record_velocity(self, velocity: float) -> None:
-        self._velocity_history.append(velocity)
-        if len(self._velocity_history) > 10:
-            self._velocity_history.pop(0)
-
-    def is_clip_worthy(self, velocity: float) -> bool:
-        if not self._velocity_history:
-            return False
-        avg = sum(self._velocity_history) / len(self._velocity_history)
-        spike = velocity > avg * 2.5 and velocity > self.chat_velocity_threshold
-        cooldown_ok = time.time() - self._last_clip_time > 120
-        if spike and cooldown_ok:
-            self._last_clip_time = time.time()
-            return True
-        return False
+    """Scores how clip-worthy *right now* is from chat, donation, sub and viewer signals.
+
+    Each signal is a z-score against its own rolling baseline: chat lines, donated
+    dollars and subs per 10 s burst (`RateSignal`), and viewer count against an EWMA.
+    The score is the weighted sum of the positive z-scores, each capped at `Z_CAP`, so
+    moments where several signals move together outrank a spike in one. Every update
+    is O(1) and cheap enough to run on every chat message.
+
+    With a `bus`, the detector subscribes itself and publishes `CLIP_MOMENT` events
+    (payload: `score`, per-signal `signals`, `reason`, wall-clock `at`) whenever the
+    score crosses `threshold`, at most once per `cooldown` seconds and not before
+    `warmup` seconds of baseline have been seen.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus | None = None,
+        threshold: float = 4.0,
+        cooldown: float = 120.0,
+        warmup: float = 60.0,
+        chat_velocity_threshold: float = 30.0,
+    ) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.warmup = warmup
+        self.chat_velocity_threshold = chat_velocity_threshold
+        self._chat = RateSignal(floor=3.0)
+        self._donations = RateSignal(floor=5.0)
+        self._subs = RateSignal(floor=1.0)
+        self._viewers = Ewma(half_life=120)
+        self._viewer_count = 0
+        self._started: float | None = None
+        self._last_clip = float("-inf")
+        self._bus = bus
+        self.stats: Counter[str] = Counter()
+        if bus:
+            bus.subscribe(EventType.CHAT_MESSAGE, self._on_chat)
+            bus.subscribe(EventType.DONATION, self._on_donation)
+            bus.subscribe(EventType.SUBSCRIPTION, self._on_subscription)
+            bus.subscribe(EventType.RAID, self._on_raid)
+            bus.subscribe(EventType.VIEWER_COUNT, self._on_viewer_count)
+
+    def _start(self, now: float) -> None:
+        if self._started is None:
+            self._started = now
+
+    def record_chat(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._start(now)
+        self._chat.add(now)
+
+    def record_donation(self, amount: float, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._start(now)
+        self._donations.add(now, amount)
+
+    def record_sub(self, count: int = 1, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._start(now)
+        self._subs.add(now, count)
+
+    def record_viewers(self, count: int, now: float | None = None) -> None:
+        self._start(time.monotonic() if now is None else now)
+        self._viewer_count = count
+        self._viewers.push(count)
+
+    def signals(self, now: float | None = None) -> dict[str, float]:
+        now = time.monotonic() if now is None else now
+        chat = self._chat.zscore(now)
+        # Chat needs absolute volume too: 4 lines in a dead chat is not a moment.
+        if self._chat.per_minute(now) < self.chat_velocity_threshold:
+            chat = min(chat, 0.0)
+        floor = max(5.0, 0.05 * (self._viewers.mean or 0.0))
+        return {
+            "chat": chat,
+            "donations": self._donations.zscore(now),
+            "subs": self._subs.zscore(now),
+            "viewers": self._viewers.zscore(self._viewer_count, floor),
+        }
+
+    def score(self, now: float | None = None) -> tuple[float, dict[str, float]]:
+        signals = self.signals(now)
+        total = sum(SIGNAL_WEIGHTS[name] * min(max(z, 0.0), Z_CAP) for name, z in signals.items())
+        return total, signals
+
+    def check(self, now: float | None = None) -> dict | None:
+        """Return a clip-moment payload if now is worth clipping, else None."""
+        now = time.monotonic() if now is None else now
+        if self._started is None or now - self._started < self.warmup or now - self._last_clip < self.cooldown:
+            return None
+        total, signals = self.score(now)
+        if total < self.threshold:
+            return None
+        self._last_clip = now
+        self.stats["moments"] += 1
+        return {
+            "score": round(total, 2),
+            "signals": {name: round(z, 2) for name, z in signals.items()},
+            "reason": max(signals, key=lambda name: SIGNAL_WEIGHTS[name] * signals[name]),
+            "at": time.time(),
+        }
+
+    async def _emit(self) -> None:
+        self.stats["checks"] += 1
+        moment = self.check()
+        if moment is None:
+            return
+        logger.info(f"[clip] moment score={moment['score']} driven by {moment['reason']}")
+        await self._bus.publish(Event(
+            type=EventType.CLIP_MOMENT,
+            payload=moment,
+            priority=int(moment["score"]),
+            source="clip_agent",
+        ))
+
+    async def _on_chat(self, event: Event) -> None:
+        self.record_chat()
+        await self._emit()
+
+    async def _on_donation(self, event: Event) -> None:
+        self.record_donation(event.payload.get("amount", 0.0))
+        await self._emit()
+
+    async def _on_subscription(self, event: Event) -> None:
+        self.record_sub(event.payload.get("count", 1))
+        await self._emit()
+
+    async def _on_raid(self, event: Event) -> None:
+        self.record_viewers(self._viewer_count + event.payload.get("viewers", 0))
+        await self._emit()
+
+    async def _on_viewer_count(self, event: Event) -> None:
+        self.record_viewers(event.payload.get("count", 0))
+        await self._emit()
+
+
+class ClipExtractor:
+    """Cuts a clip around every `CLIP_MOMENT` from the streamer's segment ring.
+
+    Waits until the ring holds `post_roll` seconds past the moment, then stitches the
+    segments covering [at - pre_roll, at + post_roll] into `clips_dir` by stream copy.
+    Clips are cut one at a time in background tasks, so the bus never waits on FFmpeg.
+    With a `jobs` queue, each finished clip gets the `followups` post-processing jobs.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        ring: SegmentRing,
+        clips_dir: str = "data/clips",
+        pre_roll: float = 20.0,
+        post_roll: float = 10.0,
+        jobs: ClipJobQueue | None = None,
+        followups: tuple[str, ...] = tuple(DEFAULT_PRIORITIES),
+    ) -> None:
+        self._ring = ring
+        self._jobs = jobs
+        self.followups = followups
+        self._clips_dir = Path(clips_dir)
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self._one_at_a_time = asyncio.Semaphore(1)
+        self._tasks: set[asyncio.Task] = set()
+        self.clips: list[Path] = []
+        self.stats: Counter[str] = Counter()
+        bus.subscribe(EventType.CLIP_MOMENT, self._on_moment)
+
+    async def _on_moment(self, event: Event) -> None:
+        task = asyncio.create_task(self.extract(event.payload["at"], event.payload.get("score", 0.0)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def extract(self, at: float, score: float = 0.0) -> Path | None:
+        start, end = at - self.pre_roll, at + self.post_roll
+        timeout = self.post_roll + 3 * self._ring.segment_seconds
+        if not await self._ring.wait_for(end, timeout=max(end - time.time(), 0.0) + timeout):
+            self.stats["missing_segments"] += 1
+            logger.warning(f"[clips] no segments reached {datetime.fromtimestamp(end):%H:%M:%S}; is the streamer writing {self._ring.directory}?")
+            return None
+        segments = self._ring.window(start, end)
+        out = self._clips_dir / f"clip-{datetime.fromtimestamp(at):%Y%m%d-%H%M%S}-{score:.1f}.mp4"
+        async with self._one_at_a_time:
+            try:
+                await extract_clip(segments, out)
+            except (OSError, RuntimeError, ValueError) as e:
+                self.stats["errors"] += 1
+                logger.error(f"[clips] extracting {out.name} failed ({type(e).__name__}: {e})")
+                return None
+        self.stats["clips"] += 1
+        self.clips.append(out)
+        if self._jobs:
+            for kind in self.followups:
+                await self._jobs.submit(kind, out, duration=segments[-1].end - segments[0].start)
+        return out
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
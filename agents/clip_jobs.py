@@ -0,0 +1,359 @@
+"""Clip post-processing jobs — vertical reframes, thumbnails, loudness — on a niced, pinned process pool."""
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import subprocess
+import time
+import uuid
+from collections import Counter
+from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from loguru import logger
+
+from core.checkpoint import atomic_write, load_newest
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+CommandBuilder = Callable[[Path, Path, int], list[str]]
+
+FFMPEG = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats", "-y", "-progress", "pipe:1"]
+
+
+def vertical_command(src: Path, out: Path, threads: int) -> list[str]:
+    """Centre-crop to 9:16 and scale to 1080x1920 for Shorts/TikTok."""
+    return [
+        *FFMPEG, "-threads", str(threads), "-i", str(src),
+        "-vf", "crop=ih*9/16:ih,scale=1080:1920",
+        "-c:v", "libx264", "-preset", "medium", "-crf", "21", "-threads", str(threads),
+        "-c:a", "copy", "-movflags", "+faststart", str(out),
+    ]
+
+
+def thumbnail_command(src: Path, out: Path, threads: int) -> list[str]:
+    """Pick a representative frame from the first part of the clip."""
+    return [
+        *FFMPEG, "-threads", str(threads), "-i", str(src),
+        "-vf", "thumbnail=150,scale=1280:-2", "-frames:v", "1", str(out),
+    ]
+
+
+def loudnorm_command(src: Path, out: Path, threads: int) -> list[str]:
+    """EBU R128 loudness normalization to -14 LUFS; video is copied."""
+    return [
+        *FFMPEG, "-threads", str(threads), "-i", str(src),
+        "-af", "loudnorm=I=-14:TP=-1.5:LRA=11", "-c:v", "copy",
+        "-c:a", "aac", "-b:a", "160k", "-movflags", "+faststart", str(out),
+    ]
+
+
+JOB_KINDS: dict[str, tuple[CommandBuilder, str]] = {
+    "vertical": (vertical_command, "vertical.mp4"),
+    "thumbnail": (thumbnail_command, "thumb.jpg"),
+    "loudnorm": (loudnorm_command, "loudnorm.mp4"),
+}
+
+# Thumbnails are needed first (dashboard), shorts last (slowest, least urgent).
+DEFAULT_PRIORITIES = {"thumbnail": 10, "loudnorm": 5, "vertical": 1}
+
+
+@dataclass(order=True)
+class ClipJob:
+    sort_key: tuple[int, float] = field(init=False, repr=False)
+    kind: str = field(compare=False)
+    clip: str = field(compare=False)
+    priority: int = field(compare=False, default=0)
+    duration: float | None = field(compare=False, default=None)
+    id: str = field(compare=False, default_factory=lambda: uuid.uuid4().hex[:12])
+    created_at: float = field(compare=False, default_factory=time.time)
+    attempts: int = field(compare=False, default=0)
+    status: str = field(compare=False, default="queued")
+
+    def __post_init__(self) -> None:
+        self.sort_key = (-self.priority, self.created_at)
+
+    @property
+    def output(self) -> Path:
+        clip = Path(self.clip)
+        return clip.with_name(f"{clip.stem}.{JOB_KINDS[self.kind][1]}")
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("sort_key")
+        return data
+
+
+# Set in each worker process by _init_worker.
+_progress: multiprocessing.Queue | None = None
+
+
+def _init_worker(progress: multiprocessing.Queue, nice: int, cpus: list[int] | None) -> None:
+    """Runs once per pool process; FFmpeg children inherit the niceness and CPU mask."""
+    global _progress
+    _progress = progress
+    os.nice(nice)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+
+def _run_job(job_id: str, cmd: list[str], duration: float | None, report_every: float = 0.5) -> tuple[int, str]:
+    """Run one FFmpeg command in a pool process, forwarding its pid and `-progress` output."""
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if _progress is not None:
+        _progress.put((job_id, "started", proc.pid))
+    last = 0.0
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if key != "out_time_us" or not value.isdigit() or _progress is None:
+            continue
+        now = time.monotonic()
+        if now - last >= report_every:
+            last = now
+            seconds = int(value) / 1e6
+            fraction = min(seconds / duration, 1.0) if duration else None
+            _progress.put((job_id, seconds, fraction))
+    stderr = proc.stderr.read()
+    return proc.wait(), stderr.strip()[-500:]
+
+
+def default_cpus(reserve: int = 2) -> list[int] | None:
+    """All CPUs this process may use except the first `reserve`, which clip jobs never touch."""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    return cpus[reserve:] if len(cpus) > reserve else cpus
+
+
+class ClipJobQueue:
+    """Priority queue of clip post-processing jobs feeding a bounded process pool.
+
+    At most `concurrency` FFmpeg jobs run at once. Each runs in a pool process that is
+    reniced to `nice` and pinned to `cpus` (by default everything but the first two
+    CPUs), with `-threads` split between the slots. The live encoder is not pinned: the
+    niceness is what keeps clip work from taking its CPU time, and the two spare CPUs
+    mean the encoder, Chromium and the event loop never wait for a clip job to be
+    preempted. Jobs are handed to the pool only when a slot frees up, so a
+    high-priority job never waits behind a backlog already sitting in the executor.
+
+    The queue is persisted atomically to `state_path` after every change. On restart,
+    queued jobs and jobs that were running are queued again. `close()` therefore does
+    not wait for running encodes: it terminates their FFmpeg processes and leaves the
+    jobs queued for next time. Progress is published on the bus as `CLIP_JOB` events
+    with `status` queued / running / progress / done / failed.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        state_path: str | None = None,
+        concurrency: int = 1,
+        nice: int = 15,
+        cpus: list[int] | None = None,
+        max_attempts: int = 2,
+        stop_timeout: float = 5.0,
+    ) -> None:
+        self._bus = bus
+        self._state_path = Path(state_path) if state_path else None
+        self.concurrency = concurrency
+        self.nice = nice
+        self.cpus = cpus if cpus is not None else default_cpus()
+        self.max_attempts = max_attempts
+        self.stop_timeout = stop_timeout
+        self.threads = max(1, len(self.cpus or [0]) // concurrency)
+        self._queue: list[ClipJob] = []
+        self._running: dict[str, ClipJob] = {}
+        self._pids: dict[str, int] = {}
+        self._closing = False
+        self._slots = asyncio.Semaphore(concurrency)
+        self._ready = asyncio.Event()
+        self._persist_lock = asyncio.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+        self._progress: multiprocessing.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._workers: set[asyncio.Task] = set()
+        self.stats: Counter[str] = Counter()
+        if self._state_path:
+            self._restore()
+
+    def _restore(self) -> None:
+        saved = load_newest(self._state_path, lambda p: json.loads(p.read_text()))
+        for data in saved or []:
+            data.pop("status", None)
+            heapq.heappush(self._queue, ClipJob(**data))
+        if self._queue:
+            logger.info(f"[clip-jobs] restored {len(self._queue)} unfinished jobs")
+
+    @property
+    def pending(self) -> list[ClipJob]:
+        return sorted(self._queue)
+
+    @property
+    def running(self) -> list[ClipJob]:
+        return list(self._running.values())
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._progress = ctx.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.concurrency,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._progress, self.nice, self.cpus),
+        )
+        self._tasks = [
+            asyncio.create_task(self._dispatch_loop(), name="clip-jobs"),
+            asyncio.create_task(self._progress_loop(), name="clip-job-progress"),
+        ]
+        self._ready.set()
+
+    async def submit(self, kind: str, clip: str | Path, priority: int | None = None, duration: float | None = None) -> ClipJob:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"unknown clip job kind {kind!r}; expected one of {sorted(JOB_KINDS)}")
+        priority = DEFAULT_PRIORITIES.get(kind, 0) if priority is None else priority
+        job = ClipJob(kind=kind, clip=str(clip), priority=priority, duration=duration)
+        heapq.heappush(self._queue, job)
+        self.stats["submitted"] += 1
+        await self._publish(job)
+        await self._persist()
+        self._ready.set()
+        return job
+
+    async def _publish(self, job: ClipJob, **extra) -> None:
+        await self._bus.publish(Event(
+            type=EventType.CLIP_JOB,
+            payload={"id": job.id, "kind": job.kind, "clip": job.clip, "status": job.status, **extra},
+            priority=job.priority,
+            source="clip_jobs",
+        ))
+
+    async def _persist(self) -> None:
+        if not self._state_path:
+            return
+        async with self._persist_lock:
+            jobs = [job.to_dict() for job in [*self._running.values(), *self._queue]]
+            try:
+                await asyncio.to_thread(atomic_write, self._state_path, json.dumps(jobs).encode())
+            except OSError as e:
+                logger.error(f"[clip-jobs] persisting queue failed ({type(e).__name__}: {e})")
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._queue:
+                await self._slots.acquire()
+                if not self._queue:
+                    self._slots.release()
+                    break
+                job = heapq.heappop(self._queue)
+                worker = asyncio.create_task(self._run(job))
+                self._workers.add(worker)
+                worker.add_done_callback(self._workers.discard)
+
+    async def _run(self, job: ClipJob) -> None:
+        builder, _ = JOB_KINDS[job.kind]
+        cmd = builder(Path(job.clip), job.output, self.threads)
+        job.status = "running"
+        job.attempts += 1
+        self._running[job.id] = job
+        await self._publish(job)
+        await self._persist()
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            returncode, stderr = await loop.run_in_executor(self._pool, _run_job, job.id, cmd, job.duration)
+            error = None if returncode == 0 else f"ffmpeg exited {returncode}: {stderr}"
+        except Exception as e:  # BrokenProcessPool, missing ffmpeg, ...
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            self._running.pop(job.id, None)
+            self._pids.pop(job.id, None)
+            self._slots.release()
+
+        if error and self._closing:
+            # Terminated by close(): not a failed attempt; it runs again after a restart.
+            job.status = "queued"
+            job.attempts -= 1
+            heapq.heappush(self._queue, job)
+            self.stats["interrupted"] += 1
+            return
+        if error and job.attempts < self.max_attempts:
+            job.status = "queued"
+            heapq.heappush(self._queue, job)
+            self._ready.set()
+            self.stats["retried"] += 1
+            logger.warning(f"[clip-jobs] {job.kind} {job.id} failed, retrying ({error})")
+            await self._publish(job, error=error)
+        elif error:
+            job.status = "failed"
+            self.stats["failed"] += 1
+            logger.error(f"[clip-jobs] {job.kind} for {Path(job.clip).name} failed ({error})")
+            await self._publish(job, error=error)
+        else:
+            job.status = "done"
+            self.stats["done"] += 1
+            elapsed = round(time.monotonic() - started, 2)
+            logger.info(f"[clip-jobs] {job.kind} for {Path(job.clip).name} done in {elapsed}s")
+            await self._publish(job, output=str(job.output), seconds=elapsed)
+        await self._persist()
+
+    async def _progress_loop(self) -> None:
+        while True:
+            try:
+                job_id, seconds, fraction = await asyncio.to_thread(self._progress.get, True, 0.5)
+            except queue.Empty:
+                continue
+            if seconds == "started":  # (job_id, "started", pid) when the job's FFmpeg starts
+                self._pids[job_id] = fraction
+                if self._closing:
+                    self._terminate(job_id)
+                continue
+            job = self._running.get(job_id)
+            if job:
+                await self._publish(job, status="progress", seconds=round(seconds, 2), progress=fraction)
+
+    def _terminate(self, job_id: str) -> None:
+        pid = self._pids.get(job_id)
+        if pid is not None:
+            with suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+
+    async def join(self) -> None:
+        """Wait until nothing is queued or running."""
+        while self._queue or self._running:
+            await asyncio.sleep(0.05)
+
+    async def close(self) -> None:
+        """Stop dispatching and terminate running jobs; they stay persisted for next time."""
+        self._closing = True
+        tasks, self._tasks = self._tasks, []
+        if tasks:
+            tasks[0].cancel()  # the dispatcher; the progress loop runs until the jobs stop
+        # A job whose pid has not arrived yet is terminated by the progress loop on arrival.
+        for job_id in list(self._running):
+            self._terminate(job_id)
+        if self._workers:
+            _, stuck = await asyncio.wait(self._workers, timeout=self.stop_timeout)
+            if stuck:
+                logger.warning(f"[clip-jobs] {len(stuck)} jobs did not stop within {self.stop_timeout:.0f}s")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pool:
+            await asyncio.to_thread(self._pool.shutdown, wait=False, cancel_futures=True)
+            self._pool = None
+        if self._progress:
+            self._progress.close()
+            self._progress = None
+        await self._persist()
@@ -1,56 +1,338 @@
-"""Donation goal tracker with milestone announcements."""
+"""Donation, sub and bit goals with indexed milestones, bus wiring and persisted progress."""
 from __future__ import annotations
-from dataclasses import dataclass, field
+import asyncio
+import json
+import time
+import uuid
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from contextlib import suppress
+from dataclasses import asdict, dataclass, field
 from typing import Callable
 
+from loguru import logger
+
+from core.checkpoint import StateCheckpointer, load_newest
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
 MILESTONE_PCTS = [25, 50, 75, 100]
+GOAL_COMPLETE_TEMPLATE = "WE HIT THE GOAL — {description}!! THANK YOU CHAT"
+GOAL_KINDS = ("donations", "subs", "bits")
+# SPEAK priorities (see agents.speech_scheduler): milestones queue ahead of chat replies,
+# the goal-complete line interrupts one.
+MILESTONE_SPEECH_PRIORITY = 10
+COMPLETE_SPEECH_PRIORITY = 20
 
 
 @dataclass
 class Goal:
     target: float
     description: str
+    kind: str = "donations"  # "donations" (dollars), "subs" (count) or "bits"
+    milestones: list[float] = field(default_factory=lambda: list(MILESTONE_PCTS))
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    start: float = 0.0  # the kind's running total where this goal begins; set by the tracker
+
+    def __post_init__(self) -> None:
+        """Coerce numbers (goals arrive as JSON) and reject anything the milestone index cannot hold."""
+        if self.kind not in GOAL_KINDS:
+            raise ValueError(f"unknown goal kind {self.kind!r}; expected one of {list(GOAL_KINDS)}")
+        self.target = float(self.target)
+        if not self.target > 0:
+            raise ValueError("goal target must be positive")
+        if isinstance(self.milestones, (str, bytes)):
+            raise TypeError("goal milestones must be a list of percentages")
+        self.milestones = sorted({float(pct) for pct in self.milestones})
+        if not all(0 < pct <= 100 for pct in self.milestones):
+            raise ValueError("goal milestones must be percentages in (0, 100]")
+        self.start = float(self.start)
+
+
+def _units(kind: str, value: float) -> str:
+    if kind == "donations":
+        return f"${value:.2f}"
+    return f"{value:g} {kind}"
 
 
 class DonationGoalTracker:
-    def __init__(self) -> None:
-        self._goal: Goal | None = None
-        self.current_total: float = 0.0
-        self._triggered: set[int] = set()
+    """Any number of concurrent and stacked goals over running donation, sub and bit totals.
+
+    Each kind keeps one running total, and a goal is the range `[start, start + target]`
+    of it. A new goal starts at the current total. A stretch goal starts where the
+    previous goal of its kind ends, so overflow carries into it. Every milestone is an
+    absolute threshold in a per-kind sorted index. A contribution moves the total from
+    `old` to `new`, and the milestones crossed are the index slice between the two
+    `bisect_right` positions, so each event costs O(log m) however many goals are set.
+
+    With a `bus`, `DONATION` (`amount`, optional `bits`) and `SUBSCRIPTION` (`count`,
+    default 1) events are counted directly. Progress is published as `GOAL_PROGRESS` at
+    most every `publish_interval` seconds, immediately when a milestone is crossed. With
+    a `state_path`, goals and totals are checkpointed (debounced, off the loop) and
+    restored on restart. Milestones already passed stay quiet after a restore. With a
+    bus, `on_milestone` and `on_complete` default to publishing the announcement as a
+    `SPEAK` event; assign them to route it elsewhere.
+
+    The single-goal API (`set_goal`, `record_donation`, `progress_pct`, `announce_text`)
+    works on the primary goal, which is the one given to `set_goal` or else the first
+    one added.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus | None = None,
+        state_path: str | None = None,
+        publish_interval: float = 1.0,
+        debounce: float = 5.0,
+    ) -> None:
+        self._bus = bus
+        self.publish_interval = publish_interval
+        self._goals: dict[str, Goal] = {}
+        self._primary: str | None = None
+        self._totals: defaultdict[str, float] = defaultdict(float)
+        self._thresholds: defaultdict[str, list[float]] = defaultdict(list)
+        self._entries: defaultdict[str, list[tuple[str, float]]] = defaultdict(list)
+        self._recent: list[dict] = []
+        self._publisher: asyncio.Task | None = None
+        self._publish_due = False
+        self._publish_now = asyncio.Event()
+        self._last_publish = float("-inf")
+        self.stats: Counter[str] = Counter()
+        self._speech: set[asyncio.Task] = set()
         self.on_milestone: Callable[[int, str], None] = lambda pct, msg: None
         self.on_complete: Callable[[str], None] = lambda msg: None
+        if bus is not None:
+            self.on_milestone = lambda pct, msg: self._say(msg, MILESTONE_SPEECH_PRIORITY)
+            self.on_complete = lambda msg: self._say(msg, COMPLETE_SPEECH_PRIORITY)
+        self._checkpointer = StateCheckpointer(self, state_path, debounce=debounce, keep=2) if state_path else None
+        if state_path:
+            self._restore(state_path)
+        if bus is not None:
+            bus.subscribe(EventType.DONATION, self._on_donation)
+            bus.subscribe(EventType.SUBSCRIPTION, self._on_subscription)
+
+    # -- goals -------------------------------------------------------------------
 
     def set_goal(self, goal: Goal) -> None:
-        self._goal = goal
-        self.current_total = 0.0
-        self._triggered.clear()
+        """Replace every goal with `goal`, starting from zero."""
+        self._goals.clear()
+        self._thresholds.clear()
+        self._entries.clear()
+        self._primary = None
+        self.add_goal(goal)
+        self._primary = goal.id
+
+    def add_goal(self, goal: Goal, stretch: bool = False) -> Goal:
+        """Track `goal` alongside the others; a `stretch` goal stacks on the last goal of its kind."""
+        total = self._totals[goal.kind]
+        stacked = [g for g in self._goals.values() if g.kind == goal.kind]
+        goal.start = max(g.start + g.target for g in stacked) if stretch and stacked else total
+        reached = self._index(goal, total)
+        self._goals[goal.id] = goal
+        self._primary = self._primary or goal.id
+        # A stretch goal may begin below the total already raised.
+        for pct in reached:
+            self._announce(goal, pct)
+        self._changed(urgent=bool(reached))
+        return goal
+
+    def set_primary(self, goal_id: str) -> None:
+        """Make `goal_id` the goal the single-goal API reports on."""
+        if goal_id not in self._goals:
+            raise KeyError(goal_id)
+        self._primary = goal_id
+        self._changed()
+
+    def remove_goal(self, goal_id: str) -> None:
+        goal = self._goals.pop(goal_id)
+        if self._primary == goal_id:
+            self._primary = next(iter(self._goals), None)
+        pairs = [(t, e) for t, e in zip(self._thresholds[goal.kind], self._entries[goal.kind]) if e[0] != goal_id]
+        self._thresholds[goal.kind] = [t for t, _ in pairs]
+        self._entries[goal.kind] = [e for _, e in pairs]
+        self._changed()
+
+    def _index(self, goal: Goal, total: float) -> list[float]:
+        """Insert the goal's milestones into the sorted index; return those already at or below `total`."""
+        reached = []
+        thresholds, entries = self._thresholds[goal.kind], self._entries[goal.kind]
+        for pct in sorted(goal.milestones):
+            threshold = round(goal.start + goal.target * pct / 100, 6)
+            if threshold <= total:
+                reached.append(pct)
+                continue
+            i = bisect_right(thresholds, threshold)
+            thresholds.insert(i, threshold)
+            entries.insert(i, (goal.id, pct))
+        return reached
+
+    @property
+    def goals(self) -> list[Goal]:
+        return list(self._goals.values())
+
+    def _goal(self, goal_id: str | None) -> Goal | None:
+        return self._goals.get(goal_id or self._primary or "")
+
+    # -- progress ----------------------------------------------------------------
+
+    def progress(self, goal_id: str | None = None) -> float:
+        """Amount raised toward a goal (the primary one by default); may exceed its target."""
+        goal = self._goal(goal_id)
+        return max(0.0, round(self._totals[goal.kind] - goal.start, 6)) if goal else 0.0
+
+    @property
+    def current_total(self) -> float:
+        return self.progress()
 
     @property
     def progress_pct(self) -> float:
-        if not self._goal or self._goal.target == 0:
+        goal = self._goal(None)
+        if not goal:
             return 0.0
-        return round((self.current_total / self._goal.target) * 100, 1)
+        return round(self.progress(goal.id) / goal.target * 100, 1)
+
+    def record(self, kind: str, amount: float) -> int:
+        """Add `amount` to the `kind` total and fire any milestones crossed; returns how many."""
+        if amount <= 0:
+            return 0
+        old = self._totals[kind]
+        new = self._totals[kind] = round(old + amount, 6)
+        thresholds = self._thresholds.get(kind)
+        crossed: list[tuple[str, float]] = []
+        if thresholds:
+            lo = bisect_right(thresholds, old)
+            crossed = self._entries[kind][lo:bisect_right(thresholds, new, lo=lo)]
+        for goal_id, pct in crossed:
+            self._announce(self._goals[goal_id], pct)
+        self.stats[kind] += 1
+        self._changed(urgent=bool(crossed))
+        return len(crossed)
 
     def record_donation(self, amount: float) -> None:
-        if not self._goal:
-            return
-        self.current_total += amount
-        pct = self.progress_pct
-        for milestone in MILESTONE_PCTS:
-            if pct >= milestone and milestone not in self._triggered:
-                self._triggered.add(milestone)
-                if milestone == 100:
-                    msg = f"WE HIT THE GOAL — {self._goal.description}!! THANK YOU CHAT"
-                    self.on_complete(msg)
-                else:
-                    msg = f"chat we're at {milestone}% of the goal — {self.announce_text()}"
-                    self.on_milestone(milestone, msg)
-
-    def announce_text(self) -> str:
-        if not self._goal:
+        self.record("donations", amount)
+
+    def _announce(self, goal: Goal, pct: float) -> None:
+        self.stats["milestones"] += 1
+        self._recent.append({"goal": goal.id, "pct": pct})
+        if pct == 100:
+            self.on_complete(GOAL_COMPLETE_TEMPLATE.format(description=goal.description))
+        else:
+            self.on_milestone(pct, f"chat we're at {pct:g}% of the goal — {self.announce_text(goal.id)}")
+
+    def announce_text(self, goal_id: str | None = None) -> str:
+        goal = self._goal(goal_id)
+        if not goal:
             return ""
-        remaining = max(0.0, self._goal.target - self.current_total)
+        current = self.progress(goal.id)
+        remaining = max(0.0, goal.target - current)
         return (
-            f"we're at ${self.current_total:.2f} of ${self._goal.target:.2f} — "
-            f"only ${remaining:.2f} left! {self._goal.description}"
+            f"we're at {_units(goal.kind, current)} of {_units(goal.kind, goal.target)} — "
+            f"only {_units(goal.kind, remaining)} left! {goal.description}"
+        )
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {
+                "id": goal.id,
+                "kind": goal.kind,
+                "description": goal.description,
+                "target": goal.target,
+                "current": self.progress(goal.id),
+                "pct": round(self.progress(goal.id) / goal.target * 100, 1),
+                "complete": self.progress(goal.id) >= goal.target,
+                "primary": goal.id == self._primary,
+            }
+            for goal in self._goals.values()
+        ]
+
+    # -- bus ---------------------------------------------------------------------
+
+    def _say(self, text: str, priority: int) -> None:
+        event = Event(
+            type=EventType.SPEAK,
+            payload={"text": text, "emotion": "excited"},
+            priority=priority,
+            source="donation_goals",
         )
+        try:
+            task = asyncio.get_running_loop().create_task(self._bus.publish(event))
+        except RuntimeError:
+            logger.warning(f"[goals] no event loop; not announcing {text!r}")
+            return
+        self._speech.add(task)
+        task.add_done_callback(self._speech.discard)
+
+    async def _on_donation(self, event: Event) -> None:
+        self.record("donations", float(event.payload.get("amount", 0.0)))
+        self.record("bits", float(event.payload.get("bits", 0)))
+
+    async def _on_subscription(self, event: Event) -> None:
+        self.record("subs", float(event.payload.get("count", 1)))
+
+    def _changed(self, urgent: bool = False) -> None:
+        if self._checkpointer:
+            self._checkpointer.mark_dirty()
+        if self._bus is None:
+            return
+        self._publish_due = True
+        if urgent:
+            self._publish_now.set()
+        if self._publisher and not self._publisher.done():
+            return
+        try:
+            self._publisher = asyncio.get_running_loop().create_task(self._publish_loop())
+        except RuntimeError:
+            self._publisher = None  # no loop (sync callers); published with the next change
+
+    async def _publish_loop(self) -> None:
+        # A donation storm becomes one GOAL_PROGRESS per interval; milestones go out at once.
+        while self._publish_due:
+            delay = self.publish_interval - (time.monotonic() - self._last_publish)
+            if delay > 0:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._publish_now.wait(), delay)
+            self._publish_now.clear()
+            self._publish_due = False
+            self._last_publish = time.monotonic()
+            milestones, self._recent = self._recent, []
+            self.stats["published"] += 1
+            await self._bus.publish(Event(
+                type=EventType.GOAL_PROGRESS,
+                payload={"goals": self.snapshot(), "milestones": milestones},
+                priority=5 if milestones else 1,
+                source="donation_goals",
+            ))
+
+    # -- persistence -------------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        return {
+            "totals": dict(self._totals),
+            "goals": [asdict(goal) for goal in self._goals.values()],
+            "primary": self._primary,
+        }
+
+    def _restore(self, state_path: str) -> None:
+        saved = load_newest(state_path, lambda p: json.loads(p.read_text()))
+        if not saved:
+            return
+        self._totals.update(saved["totals"])
+        for data in saved["goals"]:
+            try:
+                goal = Goal(**data)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"[goals] skipping unreadable saved goal {data!r} ({type(e).__name__}: {e})")
+                continue
+            self._index(goal, self._totals[goal.kind])
+            self._goals[goal.id] = goal
+        self._primary = saved.get("primary") if saved.get("primary") in self._goals else next(iter(self._goals), None)
+        logger.info(f"[goals] restored {len(self._goals)} goals ({dict(self._totals)})")
+
+    async def close(self) -> None:
+        """Send the last update and announcements and write the final checkpoint."""
+        await asyncio.gather(*self._speech, return_exceptions=True)
+        if self._publisher and not self._publisher.done():
+            self._publish_now.set()
+            await self._publisher
+        if self._checkpointer:
+            await self._checkpointer.flush()
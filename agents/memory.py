@@ -0,0 +1,158 @@
+"""Rolling conversation memory — recent orchestrator decisions verbatim, older ones summarized."""
+from __future__ import annotations
+import asyncio
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from loguru import logger
+
+Summarizer = Callable[[str, list[str]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap ~4 chars/token estimate — good enough for keeping prompts under a ceiling."""
+    return len(text) // 4 + 1
+
+
+def format_call(call: dict) -> str:
+    args = ", ".join(f"{k}={v!r}" for k, v in call["input"].items())
+    return f"{call['name']}({args})"
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    return text if len(text) <= max_chars else "…" + text[-(max_chars - 1):]
+
+
+async def tally_summarizer(summary: str, turns: list[str]) -> str:
+    """Default summarizer: no LLM call, just counts what was done and keeps the last line said."""
+    counts: Counter[str] = Counter()
+    last_said = ""
+    for turn in turns:
+        for name in ("set_activity", "send_chat_response"):
+            counts[name] += turn.count(f"{name}(")
+        if "send_chat_response(" in turn:
+            last_said = turn.split("send_chat_response(", 1)[1].split(")", 1)[0]
+    parts = [summary] if summary else []
+    parts.append(
+        f"{len(turns)} more decisions: {counts['set_activity']} activity switches, "
+        f"{counts['send_chat_response']} lines spoken"
+        + (f" (last: {last_said})" if last_said else "")
+        + "."
+    )
+    return " ".join(parts)
+
+
+def llm_summarizer(client, model: str = "claude-haiku-4-5", max_tokens: int = 200) -> Summarizer:
+    """Summarizer backed by a small model on an AsyncAnthropic client."""
+    async def summarize(summary: str, turns: list[str]) -> str:
+        response = await client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[{
+                "role": "user",
+                "content": (
+                    "Compress this live-stream director log into a short running summary. "
+                    "Keep what the streamer did, said, and how chat reacted.\n\n"
+                    f"Summary so far: {summary or '(none)'}\n\nNew entries:\n" + "\n".join(turns)
+                ),
+            }],
+        )
+        return "".join(block.text for block in response.content if block.type == "text")
+    return summarize
+
+
+@dataclass
+class Turn:
+    at: float
+    text: str
+    tokens: int
+
+
+class ConversationMemory:
+    """Bounded memory of what the orchestrator did.
+
+    The newest `window` turns are kept verbatim. Turns pushed out of the window (or
+    past the token ceiling) are folded into a running summary by a background task,
+    so a decision never waits on compaction. The rendered memory never exceeds
+    `token_ceiling` tokens.
+    """
+
+    def __init__(
+        self,
+        window: int = 12,
+        token_ceiling: int = 1200,
+        summary_tokens: int = 300,
+        summarizer: Summarizer = tally_summarizer,
+    ) -> None:
+        self.window = window
+        self.token_ceiling = token_ceiling
+        self.summary_tokens = summary_tokens
+        self._summarizer = summarizer
+        self._turns: deque[Turn] = deque()
+        self._turn_tokens = 0
+        self._overflow: list[str] = []
+        self._summary = ""
+        self._compactor: asyncio.Task | None = None
+
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def record(self, text: str, now: float | None = None) -> None:
+        # +4 covers the "- 12s ago: " prefix render() adds to each line.
+        turn = Turn(time.monotonic() if now is None else now, text, estimate_tokens(text) + 4)
+        self._turns.append(turn)
+        self._turn_tokens += turn.tokens
+        budget = self.token_ceiling - self.summary_tokens
+        while self._turns and (len(self._turns) > self.window or self._turn_tokens > budget):
+            old = self._turns.popleft()
+            self._turn_tokens -= old.tokens
+            self._overflow.append(old.text)
+        if self._overflow:
+            self._schedule_compaction()
+
+    def record_decision(self, source: str, reason: str, calls: list[dict], now: float | None = None) -> None:
+        actions = ", ".join(format_call(c) for c in calls) or "no action"
+        self.record(f"{source} ({reason}): {actions}", now)
+
+    def _schedule_compaction(self) -> None:
+        if self._compactor and not self._compactor.done():
+            return
+        try:
+            self._compactor = asyncio.get_running_loop().create_task(self._compact())
+        except RuntimeError:
+            self._compactor = None
+
+    async def _compact(self) -> None:
+        while self._overflow:
+            batch, self._overflow = self._overflow, []
+            try:
+                summary = await self._summarizer(self._summary, batch)
+            except Exception as e:
+                logger.warning(f"[memory] summarizer failed ({type(e).__name__}: {e}); using tally")
+                summary = await tally_summarizer(self._summary, batch)
+            self._summary = _truncate(summary.strip(), self.summary_tokens)
+
+    async def flush(self) -> None:
+        if self._overflow:
+            self._schedule_compaction()
+        if self._compactor:
+            await self._compactor
+
+    def render(self, now: float | None = None) -> str:
+        if not self._turns and not self._summary:
+            return ""
+        now = time.monotonic() if now is None else now
+        lines = []
+        if self._summary:
+            lines.append(f"Earlier this stream: {self._summary}")
+        if self._turns:
+            lines.append("Recent decisions (oldest first):")
+            lines.extend(f"- {now - t.at:.0f}s ago: {t.text}" for t in self._turns)
+        return "\n".join(lines)
@@ -1,12 +1,27 @@
 """Orchestrator agent — Claude tool-use loop for autonomous stream direction."""
 from __future__ import annotations
 import asyncio
-from anthropic import Anthropic
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from anthropic import AsyncAnthropic
+from loguru import logger
 from core.config import settings
 from core.event_bus import EventBus
 from core.interfaces import Event, EventType
-from core.bandit import ThompsonBandit, Action
+from core.bandit import Action, LinearThompsonBandit, ThompsonBandit, context_features
+from core.bandit_eval import DecisionLog
+from core.checkpoint import StateCheckpointer
 from agents.analytics import MetricsCollector
+from agents.scheduler import HEARTBEAT, DecisionScheduler
+from agents.speech_scheduler import RESPONSE_PRIORITY, donation_priority
+from agents.token_budget import CallUsage, TokenBudget
+from agents.memory import ConversationMemory
+
+ToolCallHandler = Callable[[dict], Awaitable[None]]
+
+DECISION_TIMEOUT = 20.0
 
 TOOLS = [
     {
@@ -46,26 +61,205 @@ TOOLS = [
 ]
 
 
+# Static prefix (tools, then system) is cached; only the user turn changes per decision.
+CACHE_CONTROL = {"type": "ephemeral"}
+CACHED_TOOLS = [*TOOLS[:-1], {**TOOLS[-1], "cache_control": CACHE_CONTROL}]
+
+CONTENT_TRIGGERS = ("donation", "subscription", "raid", "chat velocity spike")
+
+
+@dataclass
+class PolicyDecision:
+    tool_calls: list[dict] = field(default_factory=list)
+    escalate: bool = False
+    reason: str = "hold"
+
+
+class LocalPolicy:
+    """Fast-path tier: rules over the metrics snapshot plus the bandit, no network.
+
+    Routine activity switches are decided here. Anything that needs new words
+    (thanking a donor, greeting a raid, filling dead air) or where the bandit has no
+    confident answer escalates to the LLM tier. `stats` counts outcomes so the
+    escalation rate can be tracked.
+    """
+
+    def __init__(
+        self,
+        bandit: ThompsonBandit | LinearThompsonBandit | None = None,
+        min_activity_seconds: float = 180.0,
+        dead_air_seconds: float = 90.0,
+        confidence_margin: float = 0.1,
+        min_observations: float = 10.0,
+        engagement_drop: float = 0.3,
+    ) -> None:
+        self._bandit = bandit
+        self.min_activity_seconds = min_activity_seconds
+        self.dead_air_seconds = dead_air_seconds
+        self.confidence_margin = confidence_margin
+        self.min_observations = min_observations
+        self.engagement_drop = engagement_drop
+        self._activity: str | None = None
+        self._activity_started = 0.0
+        self._last_engagement: float | None = None
+        self._started = time.monotonic()
+        self.stats: Counter[str] = Counter()
+
+    @property
+    def escalation_rate(self) -> float:
+        total = self.stats["local"] + self.stats["hold"] + self.stats["escalate"]
+        return self.stats["escalate"] / total if total else 0.0
+
+    def llm_calls_per_hour(self, now: float | None = None) -> float:
+        hours = ((now or time.monotonic()) - self._started) / 3600
+        return self.stats["escalate"] / hours if hours > 0 else 0.0
+
+    def _confident_arm(self) -> str | None:
+        """The bandit's best arm, if it beats the runner-up by `confidence_margin` with enough data."""
+        if not self._bandit:
+            return None
+        ranked = sorted(self._bandit.state().items(), key=lambda kv: kv[1]["expected"], reverse=True)
+        if len(ranked) < 2:
+            return None
+        (best, best_arm), (_, second_arm) = ranked[0], ranked[1]
+        observations = best_arm["n"] if "n" in best_arm else best_arm["alpha"] + best_arm["beta"] - 2
+        if best_arm["expected"] - second_arm["expected"] < self.confidence_margin:
+            return None
+        if observations < self.min_observations:
+            return None
+        return best
+
+    def decide(
+        self,
+        inputs: dict,
+        reasons: list[str],
+        seconds_since_speech: float = float("inf"),
+        now: float | None = None,
+    ) -> PolicyDecision:
+        now = time.monotonic() if now is None else now
+        activity = inputs["activity"]
+        if activity != self._activity:
+            self._activity, self._activity_started = activity, now
+        last_engagement, self._last_engagement = self._last_engagement, inputs["engagement_score"]
+        decision = self._decide(inputs, reasons, seconds_since_speech, now, last_engagement)
+        self.stats["escalate" if decision.escalate else ("local" if decision.tool_calls else "hold")] += 1
+        return decision
+
+    def _decide(
+        self,
+        inputs: dict,
+        reasons: list[str],
+        seconds_since_speech: float,
+        now: float,
+        last_engagement: float | None,
+    ) -> PolicyDecision:
+        activity = inputs["activity"]
+        for reason in reasons:
+            if reason.startswith(CONTENT_TRIGGERS):
+                return PolicyDecision(escalate=True, reason=f"content: {reason}")
+        if seconds_since_speech >= self.dead_air_seconds:
+            return PolicyDecision(escalate=True, reason="content: dead air")
+        if last_engagement and inputs["engagement_score"] < last_engagement * (1 - self.engagement_drop):
+            return PolicyDecision(escalate=True, reason="uncertain: engagement dropped sharply")
+
+        velocity = inputs["chat_velocity"]
+        if velocity < 2.0 and activity in ("react", "q_and_a"):
+            return self._switch("talk", "rule: chat too quiet to react to")
+        if velocity >= 30.0 and activity in ("idle", "game"):
+            return self._switch("react", "rule: chat is busy")
+
+        timed_out = any(r.startswith("activity timeout") for r in reasons)
+        if timed_out or now - self._activity_started >= self.min_activity_seconds:
+            best = self._confident_arm()
+            if best and best != activity:
+                return self._switch(best, "bandit: confident best arm")
+            if timed_out and not best:
+                return PolicyDecision(escalate=True, reason="uncertain: activity timed out, bandit undecided")
+        return PolicyDecision()
+
+    @staticmethod
+    def _switch(activity: str, reason: str) -> PolicyDecision:
+        return PolicyDecision(
+            tool_calls=[{"name": "set_activity", "input": {"activity": activity}}],
+            reason=reason,
+        )
+
+
 class OrchestratorAgent:
     def __init__(
         self,
         collector: MetricsCollector | None = None,
-        bandit: ThompsonBandit | None = None,
-        bandit_save_path: str | None = None,
+        bandit: ThompsonBandit | LinearThompsonBandit | None = None,
+        checkpointer: StateCheckpointer | None = None,
+        request_timeout: float = DECISION_TIMEOUT,
+        policy: LocalPolicy | None = None,
+        budget: TokenBudget | None = None,
+        memory: ConversationMemory | None = None,
+        decision_log: DecisionLog | None = None,
     ) -> None:
-        self._client = Anthropic(api_key=settings.anthropic_api_key)
+        self._client = AsyncAnthropic(api_key=settings.anthropic_api_key, timeout=request_timeout)
+        self._request_timeout = request_timeout
+        self._inflight: asyncio.Task | None = None
         self._collector = collector
         self._bandit = bandit
-        self._bandit_save_path = bandit_save_path
+        self._checkpointer = checkpointer
+        self._policy = policy or LocalPolicy(bandit)
+        self._budget = budget or TokenBudget()
+        self._memory = memory if memory is not None else ConversationMemory()
+        self._decision_log = decision_log
+        self._inputs: dict | None = None
+        # Dead air is measured from startup until something is said on the stream.
+        self._last_speech = time.monotonic()
         try:
             with open("persona/character.md") as f:
                 self._system = f.read()
         except FileNotFoundError:
             self._system = "You are Aiko, an autonomous VTuber. Be engaging and entertaining."
+        self._system_blocks = [{
+            "type": "text",
+            "text": self._system + "\n\nYou are directing a live stream. Use tools to take actions.",
+            "cache_control": CACHE_CONTROL,
+        }]
+
+    def _context_inputs(self, current_activity: str = "idle") -> dict:
+        """The raw values `_build_context` renders — used by the scheduler for change detection."""
+        snap = self._collector.snapshot() if self._collector else {
+            "viewer_count": 0, "chat_velocity": 0.0, "donations_per_hour": 0.0, "engagement_score": 0.0,
+        }
+        return {**snap, "activity": current_activity}
+
+    @property
+    def policy(self) -> LocalPolicy:
+        return self._policy
 
-    def _build_context(self, current_activity: str = "idle") -> str:
+    @property
+    def budget(self) -> TokenBudget:
+        return self._budget
+
+    @property
+    def memory(self) -> ConversationMemory:
+        return self._memory
+
+    def _request(self, context: str) -> dict:
+        """Messages API kwargs: cacheable tools + persona first, then memory, volatile stream context last."""
+        remembered = self._memory.render()
+        content = context if not remembered else [
+            {"type": "text", "text": remembered},
+            {"type": "text", "text": context},
+        ]
+        return {
+            "model": "claude-opus-4-6",
+            "max_tokens": 1024,
+            "system": self._system_blocks,
+            "tools": CACHED_TOOLS,
+            "messages": [{"role": "user", "content": content}],
+        }
+
+    def _build_context(self, current_activity: str = "idle", events: list[str] | None = None) -> str:
+        happened = [e for e in events or [] if e != HEARTBEAT]
         if self._collector is None:
-            return "Current stream state: idle. Chat is quiet. What should Aiko do?"
+            context = "Current stream state: idle. Chat is quiet. What should Aiko do?"
+            return f"Just happened: {'; '.join(happened)}. {context}" if happened else context
 
         snap = self._collector.snapshot()
         parts = [
@@ -75,6 +269,8 @@ class OrchestratorAgent:
             f"revenue ${snap['donations_per_hour']:.1f}/hr.",
             f"Current activity: {current_activity}.",
         ]
+        if happened:
+            parts.append(f"Just happened: {'; '.join(happened)}.")
 
         if self._bandit:
             suggested = self._bandit.select()
@@ -86,19 +282,62 @@ class OrchestratorAgent:
         parts.append("Based on this, what should Aiko do next?")
         return " ".join(parts)
 
-    async def decide(self, context: str) -> list[dict]:
-        response = self._client.messages.create(
-            model="claude-opus-4-6",
-            max_tokens=1024,
-            system=self._system + "\n\nYou are directing a live stream. Use tools to take actions.",
-            tools=TOOLS,
-            messages=[{"role": "user", "content": context}],
-        )
-        return [
-            {"name": block.name, "input": block.input}
-            for block in response.content
-            if block.type == "tool_use"
-        ]
+    async def decide(self, context: str, on_tool_call: ToolCallHandler | None = None) -> list[dict]:
+        """Stream one decision from Claude.
+
+        Each tool_use block is handed to `on_tool_call` as soon as it finishes streaming,
+        so early actions (e.g. speech) go out while later blocks are still generating.
+        On timeout the calls received so far are returned.
+        """
+        calls: list[dict] = []
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(self._request_timeout):
+                async with self._client.messages.stream(**self._request(context)) as stream:
+                    async for event in stream:
+                        if event.type != "content_block_stop" or event.content_block.type != "tool_use":
+                            continue
+                        call = {"name": event.content_block.name, "input": event.content_block.input}
+                        calls.append(call)
+                        if on_tool_call:
+                            await on_tool_call(call)
+                    message = await stream.get_final_message()
+            self._budget.record(CallUsage.from_usage(message.usage, latency=time.monotonic() - started))
+        except TimeoutError:
+            logger.warning(
+                f"[orchestrator] decision timed out after {self._request_timeout}s "
+                f"({len(calls)} tool calls received)"
+            )
+        return calls
+
+    def cancel(self) -> bool:
+        """Cancel the in-flight decision, if any. Tool calls already dispatched stand."""
+        if self._inflight and not self._inflight.done():
+            self._inflight.cancel()
+            return True
+        return False
+
+    async def _on_speak(self, event: Event) -> None:
+        self._last_speech = time.monotonic()
+
+    async def _dispatch(self, bus: EventBus, call: dict, speech_priority: int = RESPONSE_PRIORITY) -> None:
+        if call["name"] == "send_chat_response":
+            self._last_speech = time.monotonic()
+            await bus.publish(Event(
+                type=EventType.SPEAK,
+                payload=call["input"],
+                priority=speech_priority,
+                source="orchestrator",
+            ))
+        elif call["name"] == "set_activity":
+            chosen = call["input"].get("activity", "idle")
+            await bus.publish(Event(
+                type=EventType.STREAM_STATE,
+                payload={"activity": chosen},
+                priority=5,
+                source="orchestrator",
+            ))
+            self._record_action(chosen)
 
     def _record_action(self, action_name: str) -> None:
         if not self._bandit:
@@ -116,36 +355,77 @@ class OrchestratorAgent:
             if self._collector:
                 snap = self._collector.snapshot()
                 reward = min(snap["engagement_score"] / 100, 1.0)
+            if self._decision_log and action in self._bandit.actions:
+                # Switches come from the local rules, the bandit's greedy confident arm or
+                # the LLM, never from a Thompson draw: the acting policy picked this arm
+                # deterministically, so its propensity is 1.
+                arm = self._bandit.actions.index(action)
+                context = context_features(self._inputs or self._context_inputs())
+                self._decision_log.append(context, arm, 1.0, reward)
             self._bandit.update(action, reward)
-            if self._bandit_save_path:
-                self._bandit.save(self._bandit_save_path)
+            if self._checkpointer:
+                self._checkpointer.mark_dirty()
+
+    async def _run_local_tier(self, bus: EventBus, inputs: dict, reasons: list[str]) -> PolicyDecision:
+        decision = self._policy.decide(
+            inputs, reasons, seconds_since_speech=time.monotonic() - self._last_speech,
+        )
+        for call in decision.tool_calls:
+            await self._dispatch(bus, call)
+        if decision.tool_calls:
+            self._memory.record_decision("local", decision.reason, decision.tool_calls)
+        if decision.tool_calls or decision.escalate:
+            logger.debug(f"[orchestrator] local tier: {decision.reason} (escalate={decision.escalate})")
+        return decision
 
     async def run_loop(
         self,
         bus: EventBus,
         poll_interval: float = 5.0,
         current_activity_getter=None,
+        scheduler: DecisionScheduler | None = None,
     ) -> None:
-        """Main orchestration loop — observe stream state, decide actions, dispatch."""
+        """Main orchestration loop — wait for the scheduler, decide actions, dispatch.
+
+        `poll_interval` is the quiet-stream check interval; significant bus events wake
+        the loop early and unchanged inputs skip the decision entirely. Each decision
+        goes to the local policy first and only reaches Claude when it escalates.
+        """
+        scheduler = scheduler or DecisionScheduler(bus, check_interval=poll_interval)
+        # Any speech counts against dead air: donation thank-yous, goal announcements, ...
+        bus.subscribe(EventType.SPEAK, self._on_speak)
         while True:
+            reasons = await scheduler.wait()
             activity = current_activity_getter() if current_activity_getter else "idle"
-            context = self._build_context(current_activity=activity)
-            tool_calls = await self.decide(context)
-            for call in tool_calls:
-                if call["name"] == "send_chat_response":
-                    await bus.publish(Event(
-                        type=EventType.SPEAK,
-                        payload=call["input"],
-                        priority=10,
-                        source="orchestrator",
-                    ))
-                elif call["name"] == "set_activity":
-                    chosen = call["input"].get("activity", "idle")
-                    await bus.publish(Event(
-                        type=EventType.STREAM_STATE,
-                        payload={"activity": chosen},
-                        priority=5,
-                        source="orchestrator",
-                    ))
-                    self._record_action(chosen)
-            await asyncio.sleep(poll_interval)
+            inputs = self._context_inputs(activity)
+            self._inputs = inputs
+            if self._bandit:
+                self._bandit.observe(inputs)
+            if not scheduler.should_decide(inputs, reasons):
+                scheduler.mark_skipped()
+                continue
+            scheduler.mark_decided(inputs, reasons)
+            decision = await self._run_local_tier(bus, inputs, reasons)
+            if not decision.escalate:
+                continue
+            if self._budget.exhausted():
+                logger.warning(f"[orchestrator] hourly token budget exhausted — skipping LLM ({decision.reason})")
+                continue
+            context = self._build_context(current_activity=activity, events=reasons)
+            # A reply to a donation wake-up is the thank-you: voice it at the donation's rank.
+            speech_priority = donation_priority(max(scheduler.donations)) if scheduler.donations else RESPONSE_PRIORITY
+            self._inflight = asyncio.create_task(
+                self.decide(context, on_tool_call=lambda call: self._dispatch(bus, call, speech_priority))
+            )
+            try:
+                calls = await self._inflight
+                self._memory.record_decision("llm", decision.reason, calls)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    self._inflight.cancel()
+                    raise
+                logger.info("[orchestrator] decision cancelled")
+            except Exception as e:
+                logger.error(f"[orchestrator] decision failed ({type(e).__name__}: {e})")
+            finally:
+                self._inflight = None
@@ -1,9 +1,27 @@
+import asyncio
 import base64
+import inspect
 import json
+import re
+import uuid
+from collections import Counter
+from typing import Awaitable, Callable
+
 import websockets
+from loguru import logger
 from openai import AsyncOpenAI
+from agents.tts_cache import TTSCache, cache_key
 from core.config import settings
 
+MessageHandler = Callable[[dict], Awaitable[None] | None]
+Outgoing = tuple[dict, bytes | None, asyncio.Future]
+
+BINARY_AUDIO = "binary-audio"
+AUDIO_FRAME_BYTES = 64 * 1024
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+CLAUSE_BREAK = re.compile(r"(?<=[,;:—])\s+")
+
 EMOTION_VOICE_PARAMS: dict[str, dict] = {
     "happy": {"speed": 1.1},
     "sad": {"speed": 0.9},
@@ -21,36 +39,343 @@ EMOTION_EXPRESSIONS: dict[str, str] = {
 }
 
 
+def split_sentences(text: str, max_chars: int = 160, min_chars: int = 24) -> list[str]:
+    """Split speech into TTS-sized chunks: sentences, long sentences at clause breaks.
+
+    Fragments shorter than `min_chars` ("Wow!") are joined onto the next chunk so a
+    TTS request is never spent on a single word.
+    """
+    pieces: list[str] = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        current = ""
+        for clause in CLAUSE_BREAK.split(sentence):
+            if current and len(current) + len(clause) + 1 > max_chars:
+                pieces.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}".strip()
+        pieces.append(current)
+
+    chunks: list[str] = []
+    carry = ""
+    for piece in filter(None, pieces):
+        piece = f"{carry} {piece}".strip()
+        if len(piece) < min_chars:
+            carry = piece
+            continue
+        chunks.append(piece)
+        carry = ""
+    if carry:
+        if chunks:
+            chunks[-1] = f"{chunks[-1]} {carry}"
+        else:
+            chunks.append(carry)
+    return chunks
+
+
+class FrontendLink:
+    """One long-lived WebSocket to the avatar frontend, shared by every command.
+
+    Messages go through a bounded FIFO and a single sender, so they arrive in the
+    order they were sent. While the socket is down, messages wait in the queue and
+    the link reconnects with exponential backoff; a message whose send failed is
+    retried first on the new connection. `send` gives up after `send_timeout` seconds
+    with a `ConnectionError` and the message is dropped, so callers never stall on a
+    frontend that is down. Liveness uses WebSocket ping/pong every
+    `heartbeat` seconds. Frames from the frontend go to `on_message`.
+
+    The frontend speaks first: a frontend that can take binary audio opens with
+    `{"type": "hello", "accepts": ["binary-audio"]}`, and the link answers with the same
+    hello. Audio then goes out as a JSON header (`"encoding": "binary"`, total `bytes`,
+    `frames` count) followed by raw binary frames of at most `AUDIO_FRAME_BYTES`. Older
+    frontends never send a hello and never receive one; they get base64 in the JSON
+    `audio` field. The encoding is chosen when the message is written, so a queued
+    utterance always matches the connection it goes out on.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        on_message: MessageHandler | None = None,
+        queue_size: int = 256,
+        heartbeat: float = 10.0,
+        min_backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        binary_audio: bool = True,
+        hello_timeout: float = 0.5,
+        send_timeout: float | None = 5.0,
+    ) -> None:
+        self._url = url
+        self._on_message = on_message
+        self._queue: asyncio.Queue[Outgoing] = asyncio.Queue(maxsize=queue_size)
+        self._heartbeat = heartbeat
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._offer_binary = binary_audio
+        self._hello_timeout = hello_timeout
+        self._send_timeout = send_timeout
+        self._retry: Outgoing | None = None
+        self._task: asyncio.Task | None = None
+        self._connected = asyncio.Event()
+        self._negotiated = asyncio.Event()
+        self._binary_audio = False
+        self.stats: Counter[str] = Counter()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    @property
+    def binary_audio(self) -> bool:
+        """Whether the current connection negotiated binary audio frames."""
+        return self._binary_audio
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def wait_connected(self, timeout: float | None = None) -> None:
+        self.start()
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def send(self, message: dict, audio: bytes | None = None) -> None:
+        """Queue `message` (plus optional `audio`) and wait until it has been written to the socket."""
+        self.start()
+        delivered = asyncio.get_running_loop().create_future()
+        try:
+            async with asyncio.timeout(self._send_timeout):
+                await self._queue.put((message, audio, delivered))
+                await delivered
+        except TimeoutError:
+            delivered.cancel()  # the sender skips it if it is still queued
+            self.stats["timeouts"] += 1
+            logger.warning(f"[performer] dropped {message.get('type', 'message')}: frontend link down for {self._send_timeout:g}s")
+            raise ConnectionError(f"frontend did not take the message within {self._send_timeout:g}s") from None
+
+    def _frames(self, message: dict, audio: bytes | None) -> list[str | bytes]:
+        if audio is None:
+            return [json.dumps(message)]
+        if not self._binary_audio:
+            return [json.dumps({**message, "audio": base64.b64encode(audio).decode()})]
+        view = memoryview(audio)
+        frames = [view[i:i + AUDIO_FRAME_BYTES] for i in range(0, len(view), AUDIO_FRAME_BYTES)]
+        header = {**message, "encoding": "binary", "bytes": len(audio), "frames": len(frames)}
+        return [json.dumps(header), *frames]
+
+    async def _run(self) -> None:
+        backoff = self._min_backoff
+        while True:
+            try:
+                async with websockets.connect(
+                    self._url, ping_interval=self._heartbeat, ping_timeout=self._heartbeat,
+                ) as ws:
+                    self._binary_audio = False
+                    self._negotiated.clear()
+                    self._connected.set()
+                    self.stats["connects"] += 1
+                    backoff = self._min_backoff
+                    # The reader ends when the frontend closes the socket; reconnect right
+                    # away instead of waiting for the next send to fail.
+                    tasks = [asyncio.create_task(self._send_loop(ws)), asyncio.create_task(self._read(ws))]
+                    try:
+                        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        for task in tasks:
+                            task.cancel()
+                        await asyncio.gather(*tasks, return_exceptions=True)
+                    for task in done:
+                        task.result()
+                    raise ConnectionError("closed by frontend")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["disconnects"] += 1
+                logger.warning(f"[performer] frontend link down ({type(e).__name__}: {e}); retrying in {backoff:.1f}s")
+            finally:
+                self._connected.clear()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self._max_backoff)
+
+    async def _send_loop(self, ws) -> None:
+        if self._offer_binary:
+            # Give the frontend a moment to send its hello; older ones never do.
+            try:
+                await asyncio.wait_for(self._negotiated.wait(), self._hello_timeout)
+            except TimeoutError:
+                pass
+            if self._binary_audio:
+                hello = json.dumps({"type": "hello", "accepts": [BINARY_AUDIO]})
+                await ws.send(hello)
+                self.stats["bytes_sent"] += len(hello)
+        while True:
+            if self._retry is None:
+                self._retry = await self._queue.get()
+            message, audio, delivered = self._retry
+            if not delivered.done():
+                for frame in self._frames(message, audio):
+                    await ws.send(frame)
+                    self.stats["bytes_sent"] += len(frame.encode()) if isinstance(frame, str) else len(frame)
+                if not delivered.done():  # the caller may have timed out mid-write
+                    delivered.set_result(None)
+                self.stats["sent"] += 1
+            self._retry = None
+
+    async def _read(self, ws) -> None:
+        try:
+            async for raw in ws:
+                try:
+                    message = json.loads(raw)
+                except (TypeError, ValueError):
+                    self.stats["unparsed"] += 1
+                    continue
+                if message.get("type") == "hello":
+                    self._binary_audio = self._offer_binary and BINARY_AUDIO in message.get("accepts", [])
+                    self._negotiated.set()
+                    continue
+                if self._on_message is None:
+                    continue
+                try:
+                    result = self._on_message(message)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.warning(f"[performer] frontend message handler failed ({type(e).__name__}: {e})")
+        except websockets.ConnectionClosed:
+            pass
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        pending = [self._retry] if self._retry else []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for *_, delivered in pending:
+            if not delivered.done():
+                delivered.set_exception(ConnectionError("frontend link closed"))
+        self._retry = None
+
+
 class Performer:
-    def __init__(self, frontend_url: str) -> None:
+    """Voices lines and drives the avatar.
+
+    `speak` splits text into sentences, synthesizes up to `tts_concurrency` of them at
+    once, and sends each chunk to the frontend as soon as it and every chunk before it
+    are ready. First audio therefore waits on one sentence, not the whole reply. Each
+    chunk is a normal `speak` message tagged with `utterance`, `seq` and `final`.
+    Chunks are looked up in the TTS cache first; identical in-flight requests share one
+    synthesis.
+    """
+
+    def __init__(
+        self,
+        frontend_url: str,
+        link: FrontendLink | None = None,
+        tts_concurrency: int = 3,
+        sentence_streaming: bool = True,
+        cache: TTSCache | None = None,
+    ) -> None:
         self._frontend_url = frontend_url.replace("http", "ws") + "/ws"
         self._openai = AsyncOpenAI(api_key=settings.openai_api_key)
+        self._link = link or FrontendLink(self._frontend_url)
+        self._tts_concurrency = tts_concurrency
+        self._sentence_streaming = sentence_streaming
+        self._cache = cache or TTSCache()
+        self._pending_tts: dict[str, asyncio.Task[bytes]] = {}
+
+    @property
+    def link(self) -> FrontendLink:
+        return self._link
+
+    @property
+    def cache(self) -> TTSCache:
+        return self._cache
 
     def _get_expression(self, emotion: str) -> str:
         return EMOTION_EXPRESSIONS.get(emotion, "idle")
 
-    async def speak(self, text: str, emotion: str = "neutral") -> None:
-        params = EMOTION_VOICE_PARAMS.get(emotion, EMOTION_VOICE_PARAMS["neutral"])
+    async def _fetch_tts(self, text: str, voice: str, speed: float) -> bytes:
         response = await self._openai.audio.speech.create(
             model="tts-1",
-            voice=settings.openai_tts_voice,
+            voice=voice,
             input=text,
-            speed=params["speed"],
+            speed=speed,
         )
-        audio_b64 = base64.b64encode(response.content).decode()
+        await self._cache.put(text, voice, speed, response.content)
+        return response.content
+
+    async def _synthesize(self, text: str, speed: float) -> bytes:
+        voice = settings.openai_tts_voice
+        cached = await self._cache.get(text, voice, speed)
+        if cached is not None:
+            return cached
+        # One synthesis per key, detached from any single caller: a cancelled utterance
+        # neither cancels it for others nor throws away audio that is already paid for.
+        key = cache_key(text, voice, speed)
+        task = self._pending_tts.get(key)
+        if task is None:
+            task = self._pending_tts[key] = asyncio.create_task(self._fetch_tts(text, voice, speed))
+            task.add_done_callback(lambda t: (self._pending_tts.pop(key, None), t.cancelled() or t.exception()))
+        return await asyncio.shield(task)
+
+    async def prewarm(self, lines: list[str], emotions: tuple[str, ...] = ("neutral",)) -> int:
+        """Synthesize and cache `lines` at each emotion's speed; returns how many were new."""
+        voice = settings.openai_tts_voice
+        limit = asyncio.Semaphore(self._tts_concurrency)
+        speeds = {EMOTION_VOICE_PARAMS.get(e, EMOTION_VOICE_PARAMS["neutral"])["speed"] for e in emotions}
+        todo = [(line, speed) for line in lines for speed in speeds if cache_key(line, voice, speed) not in self._cache]
+
+        async def warm(line: str, speed: float) -> None:
+            async with limit:
+                await self._synthesize(line, speed)
+
+        results = await asyncio.gather(*(warm(line, speed) for line, speed in todo), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning(f"[performer] {len(failed)} of {len(todo)} pre-warm syntheses failed")
+        return len(todo) - len(failed)
+
+    async def speak(self, text: str, emotion: str = "neutral") -> None:
+        params = EMOTION_VOICE_PARAMS.get(emotion, EMOTION_VOICE_PARAMS["neutral"])
         expression = self._get_expression(emotion)
-        async with websockets.connect(self._frontend_url) as ws:
-            await ws.send(json.dumps({
-                "type": "speak",
-                "text": text,
-                "audio": audio_b64,
-                "expression": expression,
-            }))
+        chunks = split_sentences(text) if self._sentence_streaming else [text]
+        utterance = uuid.uuid4().hex[:8]
+        limit = asyncio.Semaphore(self._tts_concurrency)
+
+        async def synthesize(chunk: str) -> bytes:
+            async with limit:
+                return await self._synthesize(chunk, params["speed"])
+
+        # Semaphore waiters are served FIFO, so chunks are synthesized in speaking order.
+        tasks = [asyncio.create_task(synthesize(chunk)) for chunk in chunks]
+        try:
+            for seq, (chunk, task) in enumerate(zip(chunks, tasks)):
+                audio = await task
+                await self._link.send({
+                    "type": "speak",
+                    "text": chunk,
+                    "expression": expression,
+                    "utterance": utterance,
+                    "seq": seq,
+                    "final": seq == len(chunks) - 1,
+                }, audio)
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def set_expression(self, expression: str) -> None:
-        async with websockets.connect(self._frontend_url) as ws:
-            await ws.send(json.dumps({"type": "expression", "value": expression}))
+        await self._link.send({"type": "expression", "value": expression})
 
     async def set_motion(self, motion: str) -> None:
-        async with websockets.connect(self._frontend_url) as ws:
-            await ws.send(json.dumps({"type": "motion", "value": motion}))
+        await self._link.send({"type": "motion", "value": motion})
+
+    async def interrupt(self) -> None:
+        """Tell the frontend to stop playing and drop any speech it has buffered."""
+        await self._link.send({"type": "interrupt"})
+
+    async def close(self) -> None:
+        await self._link.close()
@@ -16,9 +16,11 @@ class StreamSummary:
 
 
 class StreamRetrospective:
-    def __init__(self, db, bandit) -> None:
+    def __init__(self, db, bandit, history=None, archive=None) -> None:
         self._db = db
         self._bandit = bandit
+        self._history = history
+        self._archive = archive
 
     def build_summary(
         self,
@@ -42,7 +44,14 @@ class StreamRetrospective:
             engagement_score=round(engagement, 1),
         )
 
-    def generate_recommendations(self, summary: StreamSummary) -> list[str]:
+    def cross_stream_report(self, n: int = 90):
+        if not self._archive:
+            return None
+        from agents.stream_analysis import analyze
+        return analyze(self._archive, n=n)
+
+    def generate_recommendations(self, summary: StreamSummary, report=None) -> list[str]:
+        report = report or self.cross_stream_report()
         recs: list[str] = []
         if summary.revenue_per_hour < 10:
             recs.append("Set a donation goal early in the stream to prime giving behavior")
@@ -52,10 +61,31 @@ class StreamRetrospective:
             recs.append("Replace idle time with q_and_a segments — high engagement, low effort")
         if summary.peak_viewers > 200 and summary.total_revenue < 20:
             recs.append("High viewer count but low revenue — introduce subscription perks mention")
+        if report and report.stream_count >= 3:
+            recs.extend(self._history_recommendations(summary, report))
         if not recs:
             recs.append("Stream performed well — maintain current content mix")
         return recs
 
+    def _history_recommendations(self, summary: StreamSummary, report) -> list[str]:
+        recs: list[str] = []
+        median = report.median_revenue_per_hour
+        if median and summary.revenue_per_hour < median * 0.75:
+            recs.append(
+                f"Revenue/hr ${summary.revenue_per_hour:.2f} is below the "
+                f"{report.stream_count}-stream median of ${median:.2f}"
+            )
+        best = report.best_activity
+        if best and best not in summary.top_activities:
+            rate = report.activity_effects[best]["revenue_per_hour"]
+            recs.append(
+                f"{best} has earned the most across {report.stream_count} streams "
+                f"(${rate:.2f}/hr) — schedule more of it"
+            )
+        if report.late_dropoff() < 0.7:
+            recs.append("Engagement drops off late in streams — save a high-energy segment for the final stretch")
+        return recs
+
     def update_bandit(self, summary: StreamSummary) -> None:
         if not self._bandit:
             return
@@ -68,8 +98,8 @@ class StreamRetrospective:
             except ValueError:
                 pass
 
-    def format_report(self, summary: StreamSummary) -> str:
-        recs = self.generate_recommendations(summary)
+    def format_report(self, summary: StreamSummary, report=None) -> str:
+        recs = self.generate_recommendations(summary, report)
         lines = [
             f"=== Stream Retrospective: {summary.stream_id} ===",
             f"Duration:      {summary.duration_minutes:.0f} min",
@@ -88,3 +118,10 @@ class StreamRetrospective:
         if not self._db:
             return
         self._db.create_stream_node(summary.stream_id)
+
+    def save_to_history(self, summary: StreamSummary) -> None:
+        if not self._history:
+            return
+        self._history.append(summary)
+        if self._db:
+            self._history.mirror_to_neo4j(self._db)
@@ -0,0 +1,158 @@
+"""Decision scheduler — wakes the orchestrator on significant stream events instead of a fixed poll."""
+from __future__ import annotations
+import asyncio
+import time
+from collections import Counter, deque
+
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+HEARTBEAT = "heartbeat"
+
+
+def inputs_changed(prev: dict | None, cur: dict) -> bool:
+    """True when the decision inputs moved enough to be worth another LLM call."""
+    if prev is None:
+        return True
+    if prev["activity"] != cur["activity"]:
+        return True
+
+    def moved(key: str, rel: float, floor: float) -> bool:
+        before, after = prev[key], cur[key]
+        return abs(after - before) >= max(abs(before) * rel, floor)
+
+    return (
+        moved("viewer_count", 0.10, 5)
+        or moved("chat_velocity", 0.25, 3.0)
+        or moved("donations_per_hour", 0.20, 2.0)
+        or moved("engagement_score", 0.0, 5.0)
+    )
+
+
+class DecisionScheduler:
+    """Decides *when* the orchestrator should think.
+
+    Wakes immediately (subject to `min_interval`) on large donations, subs, raids,
+    chat velocity spikes and activity timeouts. Otherwise it checks every
+    `check_interval` and only lets a decision through if the context inputs changed
+    materially or `max_interval` has passed since the last one.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        check_interval: float = 5.0,
+        min_interval: float = 2.0,
+        max_interval: float = 60.0,
+        donation_threshold: float = 5.0,
+        spike_ratio: float = 2.5,
+        spike_min_velocity: float = 20.0,
+        spike_cooldown: float = 30.0,
+        activity_timeout: float = 300.0,
+    ) -> None:
+        self.check_interval = check_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.donation_threshold = donation_threshold
+        self.spike_ratio = spike_ratio
+        self.spike_min_velocity = spike_min_velocity
+        self.spike_cooldown = spike_cooldown
+        self.activity_timeout = activity_timeout
+
+        self._wake = asyncio.Event()
+        self._pending: list[str] = []
+        self._pending_donations: list[float] = []
+        self.donations: list[float] = []  # amounts behind the donation reasons of the last wake-up
+        self._last_decision = float("-inf")
+        self._last_inputs: dict | None = None
+        self._activity_since = time.monotonic()
+        self._chat_times: deque[float] = deque()
+        self._velocity_baseline = 0.0
+        self._last_spike = float("-inf")
+        self.stats: Counter[str] = Counter()
+
+        bus.subscribe(EventType.DONATION, self._on_donation)
+        bus.subscribe(EventType.SUBSCRIPTION, self._on_subscription)
+        bus.subscribe(EventType.RAID, self._on_raid)
+        bus.subscribe(EventType.CHAT_MESSAGE, self._on_chat)
+        bus.subscribe(EventType.STREAM_STATE, self._on_stream_state)
+
+    def trigger(self, reason: str) -> None:
+        self._pending.append(reason)
+        self._wake.set()
+
+    async def _on_donation(self, event: Event) -> None:
+        amount = event.payload.get("amount", 0.0)
+        if amount >= self.donation_threshold:
+            username = event.payload.get("username", "anonymous")
+            self._pending_donations.append(amount)
+            self.trigger(f"donation: {username} gave ${amount:.2f}")
+
+    async def _on_subscription(self, event: Event) -> None:
+        username = event.payload.get("username", "anonymous")
+        self.trigger(f"subscription: {username} subscribed at tier {event.payload.get('tier', 1)}")
+
+    async def _on_raid(self, event: Event) -> None:
+        raider = event.payload.get("username", "someone")
+        self.trigger(f"raid: {raider} raided with {event.payload.get('viewers', 0)} viewers")
+
+    async def _on_chat(self, event: Event) -> None:
+        now = time.monotonic()
+        self._chat_times.append(now)
+        while self._chat_times and now - self._chat_times[0] > 10.0:
+            self._chat_times.popleft()
+        velocity = len(self._chat_times) * 6.0  # msgs in last 10s -> msg/min
+        spiking = (
+            velocity >= self.spike_min_velocity
+            and velocity > self._velocity_baseline * self.spike_ratio
+            and now - self._last_spike > self.spike_cooldown
+        )
+        self._velocity_baseline += 0.02 * (velocity - self._velocity_baseline)
+        if spiking:
+            self._last_spike = now
+            self.trigger(f"chat velocity spike: {velocity:.0f} msg/min")
+
+    async def _on_stream_state(self, event: Event) -> None:
+        if event.payload.get("activity"):
+            self._activity_since = time.monotonic()
+
+    async def wait(self) -> list[str]:
+        """Block until the next decision opportunity; return the reasons for waking."""
+        self.donations = []
+        if self._last_decision == float("-inf"):
+            return [HEARTBEAT]
+        activity_deadline = self._activity_since + self.activity_timeout - time.monotonic()
+        timeout = max(min(self.check_interval, activity_deadline), 0.0)
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except TimeoutError:
+            pass
+
+        since_last = time.monotonic() - self._last_decision
+        if since_last < self.min_interval:
+            await asyncio.sleep(self.min_interval - since_last)
+
+        self._wake.clear()
+        reasons, self._pending = self._pending, []
+        self.donations, self._pending_donations = self._pending_donations, []
+        if time.monotonic() - self._activity_since >= self.activity_timeout:
+            self._activity_since = time.monotonic()
+            reasons.append("activity timeout: current activity has run its course")
+        return reasons or [HEARTBEAT]
+
+    def should_decide(self, inputs: dict, reasons: list[str]) -> bool:
+        if reasons != [HEARTBEAT]:
+            return True
+        if time.monotonic() - self._last_decision >= self.max_interval:
+            return True
+        return inputs_changed(self._last_inputs, inputs)
+
+    def mark_decided(self, inputs: dict, reasons: list[str]) -> None:
+        self._last_decision = time.monotonic()
+        self._last_inputs = inputs
+        self.stats["decisions"] += 1
+        for reason in reasons:
+            self.stats[reason.split(":", 1)[0]] += 1
+
+    def mark_skipped(self) -> None:
+        self.stats["skipped"] += 1
@@ -0,0 +1,207 @@
+"""Speech scheduler — one voice at a time, most valuable line first, avatar commands coalesced."""
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+from agents.performer import Performer
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+FILLER_PRIORITY = 0
+RESPONSE_PRIORITY = 5  # orchestrator `send_chat_response`; below PREEMPT_MARGIN, so never cuts off filler
+DONATION_PRIORITY = 10
+PREEMPT_MARGIN = 10
+
+
+def donation_priority(amount: float) -> int:
+    """Speech priority for thanking a donation: bigger donations outrank smaller ones.
+
+    Every thank-you jumps the queue ahead of chat replies, but with the default
+    `PREEMPT_MARGIN` only donations of $50 or more cut off a reply that is already
+    being spoken.
+    """
+    return DONATION_PRIORITY + min(int(amount // 10), 10)
+
+
+@dataclass(order=True)
+class SpeechJob:
+    sort_key: tuple[int, int] = field(init=False, repr=False)
+    priority: int = field(compare=False)
+    seq: int = field(compare=False)
+    text: str = field(compare=False)
+    emotion: str = field(compare=False, default="neutral")
+    source: str = field(compare=False, default="unknown")
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        # heapq is a min-heap: highest priority first, then first come first served.
+        self.sort_key = (-self.priority, self.seq)
+
+
+class SpeechScheduler:
+    """Sits between the bus and the Performer so exactly one line is voiced at a time.
+
+    `SPEAK` events are queued by `Event.priority` (ties in arrival order) and spoken
+    one after another. A line that outranks the one being spoken by `preempt_margin`
+    cancels it mid-utterance — no further chunks are sent and the frontend is told to
+    drop buffered audio — and goes next. Queued lines older than `stale_after` seconds
+    are dropped rather than spoken late; past `max_queue` the lowest-priority line goes.
+
+    `SET_EXPRESSION` and `SET_MOTION` are not queued: only the latest value of each is
+    kept, and it is sent as soon as the previous command is on the wire, so a burst of
+    fifty expression changes costs at most two frontend messages.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        performer: Performer,
+        preempt_margin: int = PREEMPT_MARGIN,
+        stale_after: float = 30.0,
+        max_queue: int = 32,
+    ) -> None:
+        self._performer = performer
+        self.preempt_margin = preempt_margin
+        self.stale_after = stale_after
+        self.max_queue = max_queue
+        self._queue: list[SpeechJob] = []
+        self._seq = itertools.count()
+        self._speech_ready = asyncio.Event()
+        self._current: SpeechJob | None = None
+        self._speaking: asyncio.Task | None = None
+        self._latest: dict[str, str] = {}
+        self._commands_ready = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self.stats: Counter[str] = Counter()
+
+        bus.subscribe(EventType.SPEAK, self._on_speak)
+        bus.subscribe(EventType.SET_EXPRESSION, self._on_expression)
+        bus.subscribe(EventType.SET_MOTION, self._on_motion)
+
+    @property
+    def current(self) -> SpeechJob | None:
+        return self._current
+
+    @property
+    def pending(self) -> list[SpeechJob]:
+        return sorted(self._queue)
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._speech_loop(), name="speech-scheduler"),
+                asyncio.create_task(self._command_loop(), name="avatar-commands"),
+            ]
+
+    async def run(self) -> None:
+        """Run until cancelled; cancelling stops speech and drops anything still queued."""
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.close()
+
+    def submit(self, text: str, emotion: str = "neutral", priority: int = RESPONSE_PRIORITY, source: str = "unknown") -> SpeechJob:
+        job = SpeechJob(priority=priority, seq=next(self._seq), text=text, emotion=emotion, source=source)
+        heapq.heappush(self._queue, job)
+        self.stats["queued"] += 1
+        if len(self._queue) > self.max_queue:
+            lowest = max(self._queue)
+            self._queue.remove(lowest)
+            heapq.heapify(self._queue)
+            self.stats["dropped_overflow"] += 1
+            logger.warning(f"[speech] queue full, dropped priority-{lowest.priority} line from {lowest.source}")
+        current = self._current
+        if current and self._speaking and priority >= current.priority + self.preempt_margin:
+            if self._speaking.cancel():
+                self.stats["preempted"] += 1
+                logger.info(f"[speech] priority-{priority} line from {source} preempts priority-{current.priority} speech")
+        self._speech_ready.set()
+        return job
+
+    def command(self, kind: str, value: str) -> None:
+        """Set the avatar's `expression` or `motion`, superseding any unsent value."""
+        if kind in self._latest:
+            self.stats["coalesced"] += 1
+        self._latest[kind] = value
+        self._commands_ready.set()
+
+    async def _on_speak(self, event: Event) -> None:
+        self.submit(
+            event.payload["text"],
+            emotion=event.payload.get("emotion", "neutral"),
+            priority=event.priority,
+            source=event.source,
+        )
+
+    async def _on_expression(self, event: Event) -> None:
+        self.command("expression", event.payload["expression"])
+
+    async def _on_motion(self, event: Event) -> None:
+        self.command("motion", event.payload["motion"])
+
+    def _next_job(self) -> SpeechJob | None:
+        now = time.monotonic()
+        while self._queue:
+            job = heapq.heappop(self._queue)
+            if now - job.enqueued_at <= self.stale_after:
+                return job
+            self.stats["dropped_stale"] += 1
+        return None
+
+    async def _speech_loop(self) -> None:
+        while True:
+            await self._speech_ready.wait()
+            self._speech_ready.clear()
+            while (job := self._next_job()) is not None:
+                await self._speak(job)
+
+    async def _speak(self, job: SpeechJob) -> None:
+        self._current = job
+        self._speaking = asyncio.create_task(self._performer.speak(job.text, job.emotion))
+        try:
+            await asyncio.shield(self._speaking)
+            self.stats["spoken"] += 1
+        except asyncio.CancelledError:
+            if not self._speaking.cancelled():
+                self._speaking.cancel()  # the scheduler itself is being cancelled
+                raise
+            await self._interrupt()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"[speech] speaking failed ({type(e).__name__}: {e})")
+        finally:
+            self._current = None
+            self._speaking = None
+
+    async def _interrupt(self) -> None:
+        try:
+            await self._performer.interrupt()
+        except ConnectionError as e:
+            logger.warning(f"[speech] could not interrupt frontend playback ({e})")
+
+    async def _command_loop(self) -> None:
+        send = {"expression": self._performer.set_expression, "motion": self._performer.set_motion}
+        while True:
+            await self._commands_ready.wait()
+            self._commands_ready.clear()
+            while self._latest:
+                kind, value = self._latest.popitem()
+                try:
+                    await send[kind](value)
+                    self.stats[f"{kind}_sent"] += 1
+                except ConnectionError as e:
+                    logger.warning(f"[speech] dropped {kind} command ({e})")
+
+    async def close(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue.clear()
@@ -0,0 +1,100 @@
+"""Cross-stream analytics — vectorized comparisons over the columnar stream archive."""
+from __future__ import annotations
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from core.archive import ACTIVITIES, StreamArchive
+
+ANALYSIS_COLUMNS = ["t", "engagement_score", "revenue", "activity", "chat_messages"]
+
+
+@dataclass
+class CrossStreamReport:
+    stream_count: int
+    revenue_per_hour: np.ndarray
+    engagement_curve: np.ndarray
+    activity_effects: dict[str, dict[str, float]] = field(default_factory=dict)
+
+    @property
+    def median_revenue_per_hour(self) -> float:
+        return float(np.median(self.revenue_per_hour)) if self.stream_count else 0.0
+
+    @property
+    def best_activity(self) -> str | None:
+        ranked = [
+            (stats["revenue_per_hour"], name)
+            for name, stats in self.activity_effects.items()
+            if stats["seconds"] >= 600
+        ]
+        return max(ranked)[1] if ranked else None
+
+    def late_dropoff(self) -> float:
+        """Mean engagement in the last quarter of a stream relative to the first quarter."""
+        quarter = max(len(self.engagement_curve) // 4, 1)
+        head = float(self.engagement_curve[:quarter].mean())
+        tail = float(self.engagement_curve[-quarter:].mean())
+        return tail / head if head else 1.0
+
+
+def revenue_per_hour(streams: list[dict[str, np.ndarray]]) -> np.ndarray:
+    """Final cumulative revenue over stream length, one value per stream."""
+    final_revenue = np.array([s["revenue"][-1] for s in streams], dtype=np.float64)
+    hours = np.array([s["t"][-1] for s in streams], dtype=np.float64) / 3600
+    return np.divide(final_revenue, hours, out=np.zeros_like(final_revenue), where=hours > 0)
+
+
+def engagement_curves(streams: list[dict[str, np.ndarray]], bins: int = 60) -> np.ndarray:
+    """Engagement per stream on a normalized 0..1 progress grid, shape (streams, bins)."""
+    curves = np.zeros((len(streams), bins), dtype=np.float64)
+    for i, s in enumerate(streams):
+        t = np.asarray(s["t"])
+        span = t[-1] or 1.0
+        idx = np.minimum((t / span * bins).astype(np.int64), bins - 1)
+        totals = np.bincount(idx, weights=s["engagement_score"], minlength=bins)
+        counts = np.bincount(idx, minlength=bins)
+        curves[i] = np.divide(totals, counts, out=np.zeros(bins), where=counts > 0)
+    return curves
+
+
+def activity_effects(streams: list[dict[str, np.ndarray]]) -> dict[str, dict[str, float]]:
+    """Per-activity engagement, revenue rate and chat rate pooled over every archived second."""
+    activity = np.concatenate([s["activity"] for s in streams]).astype(np.int64)
+    engagement = np.concatenate([s["engagement_score"] for s in streams]).astype(np.float64)
+    chat = np.concatenate([s["chat_messages"] for s in streams]).astype(np.float64)
+    revenue_delta = np.concatenate([
+        np.diff(np.asarray(s["revenue"], dtype=np.float64), prepend=0.0) for s in streams
+    ])
+    known = activity >= 0
+    activity, engagement, chat, revenue_delta = (
+        activity[known], engagement[known], chat[known], revenue_delta[known]
+    )
+
+    k = len(ACTIVITIES)
+    seconds = np.bincount(activity, minlength=k).astype(np.float64)
+    safe = np.maximum(seconds, 1.0)
+    mean_engagement = np.bincount(activity, weights=engagement, minlength=k) / safe
+    revenue_rate = np.bincount(activity, weights=revenue_delta, minlength=k) / safe * 3600
+    chat_rate = np.bincount(activity, weights=chat, minlength=k) / safe * 60
+    return {
+        name: {
+            "seconds": float(seconds[i]),
+            "engagement": round(float(mean_engagement[i]), 2),
+            "revenue_per_hour": round(float(revenue_rate[i]), 2),
+            "chat_per_minute": round(float(chat_rate[i]), 2),
+        }
+        for i, name in enumerate(ACTIVITIES)
+        if seconds[i] > 0
+    }
+
+
+def analyze(archive: StreamArchive, n: int = 90, bins: int = 60) -> CrossStreamReport:
+    streams = [s for s in archive.recent(n, ANALYSIS_COLUMNS) if len(s["t"])]
+    if not streams:
+        return CrossStreamReport(0, np.zeros(0), np.zeros(bins))
+    return CrossStreamReport(
+        stream_count=len(streams),
+        revenue_per_hour=revenue_per_hour(streams),
+        engagement_curve=engagement_curves(streams, bins).mean(axis=0),
+        activity_effects=activity_effects(streams),
+    )
@@ -0,0 +1,111 @@
+"""Token budget manager — per-call and rolling-hour accounting of orchestrator LLM usage."""
+from __future__ import annotations
+import time
+from collections import deque
+from dataclasses import dataclass, fields
+
+# USD per million tokens (Claude Opus 4.x list prices; cache writes 1.25x, reads 0.1x of input).
+OPUS_PRICING = {
+    "input_tokens": 5.00,
+    "output_tokens": 25.00,
+    "cache_creation_input_tokens": 6.25,
+    "cache_read_input_tokens": 0.50,
+}
+
+
+@dataclass
+class CallUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    latency: float = 0.0
+
+    @classmethod
+    def from_usage(cls, usage, latency: float = 0.0) -> CallUsage:
+        """Build from an Anthropic `Usage` object (cache fields may be None)."""
+        return cls(
+            input_tokens=usage.input_tokens or 0,
+            output_tokens=usage.output_tokens or 0,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+            latency=latency,
+        )
+
+    @property
+    def total_input(self) -> int:
+        return self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.total_input + self.output_tokens
+
+    def cost(self, pricing: dict[str, float] = OPUS_PRICING) -> float:
+        return sum(getattr(self, key) * price for key, price in pricing.items()) / 1_000_000
+
+
+class TokenBudget:
+    """Tracks every orchestrator call and enforces an optional hourly token ceiling.
+
+    When the rolling-hour total reaches `hourly_token_limit`, `exhausted` turns true and
+    the orchestrator stays on its local policy tier until usage ages out of the window.
+    """
+
+    def __init__(
+        self,
+        hourly_token_limit: int | None = None,
+        pricing: dict[str, float] = OPUS_PRICING,
+        window: float = 3600.0,
+    ) -> None:
+        self.hourly_token_limit = hourly_token_limit
+        self._pricing = pricing
+        self._window = window
+        self._calls: deque[tuple[float, CallUsage]] = deque()
+        self.lifetime = CallUsage()
+        self.lifetime_calls = 0
+
+    def record(self, usage: CallUsage, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._calls.append((now, usage))
+        self.lifetime_calls += 1
+        for f in fields(CallUsage):
+            setattr(self.lifetime, f.name, getattr(self.lifetime, f.name) + getattr(usage, f.name))
+        self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self._window:
+            self._calls.popleft()
+
+    @property
+    def last(self) -> CallUsage | None:
+        return self._calls[-1][1] if self._calls else None
+
+    def hourly(self, now: float | None = None) -> CallUsage:
+        self._expire(time.monotonic() if now is None else now)
+        total = CallUsage()
+        for _, usage in self._calls:
+            for f in fields(CallUsage):
+                setattr(total, f.name, getattr(total, f.name) + getattr(usage, f.name))
+        return total
+
+    def exhausted(self, now: float | None = None) -> bool:
+        if self.hourly_token_limit is None:
+            return False
+        return self.hourly(now).total_tokens >= self.hourly_token_limit
+
+    def cache_hit_rate(self) -> float:
+        total_input = self.lifetime.total_input
+        return self.lifetime.cache_read_input_tokens / total_input if total_input else 0.0
+
+    def report(self) -> dict:
+        hour = self.hourly()
+        calls = self.lifetime_calls or 1
+        return {
+            "calls": self.lifetime_calls,
+            "calls_last_hour": len(self._calls),
+            "tokens_last_hour": hour.total_tokens,
+            "cost_last_hour": round(hour.cost(self._pricing), 4),
+            "cost_total": round(self.lifetime.cost(self._pricing), 4),
+            "cache_hit_rate": round(self.cache_hit_rate(), 3),
+            "avg_latency": round(self.lifetime.latency / calls, 3),
+        }
@@ -0,0 +1,168 @@
+"""Content-addressed TTS audio cache — an LRU in memory over a memory-mapped on-disk tier."""
+from __future__ import annotations
+import asyncio
+import hashlib
+import mmap
+import os
+from collections import Counter, OrderedDict
+from pathlib import Path
+from string import Formatter
+
+from loguru import logger
+
+from core.checkpoint import atomic_write
+
+
+def cache_key(text: str, voice: str, speed: float, model: str = "tts-1") -> str:
+    return hashlib.sha256(f"{model}\0{voice}\0{speed:.3f}\0{text.strip()}".encode()).hexdigest()
+
+
+def _fields(template: str) -> set[str]:
+    return {name for _, name, _, _ in Formatter().parse(template) if name is not None}
+
+
+def template_lines(templates: list[str], bindings: list[dict] = ()) -> list[str]:
+    """The chunks `Performer.speak` will produce for these templates, for pre-warming.
+
+    Chunks with no placeholders are the same every time. For each binding that fills
+    all of a template's placeholders (e.g. `{"username": "regular_viewer"}` or a goal
+    `{"description": ...}`), the formatted line's chunks are included too.
+    """
+    from agents.performer import split_sentences
+    lines = []
+    for template in templates:
+        names = _fields(template)
+        lines.extend(chunk for chunk in split_sentences(template) if not _fields(chunk))
+        for binding in bindings:
+            if names and names <= binding.keys():
+                lines.extend(split_sentences(template.format(**binding)))
+    return list(dict.fromkeys(lines))
+
+
+class TTSCache:
+    """Synthesized audio keyed by (text, voice, speed, model).
+
+    Hot entries stay in an in-memory LRU capped at `memory_bytes`. With a `root`, every
+    entry is also written (atomically, off the event loop) to `root/ab/<key>.mp3`. Disk
+    reads go through mmap and are promoted to memory. The disk tier is trimmed,
+    least-recently-used first, to `disk_bytes`.
+    """
+
+    def __init__(
+        self,
+        root: str | None = None,
+        memory_bytes: int = 32 * 1024 * 1024,
+        disk_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self._root = Path(root) if root else None
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_size = 0
+        self.stats: Counter[str] = Counter()
+        if self._root:
+            self._scan_disk()
+
+    def _path(self, key: str) -> Path:
+        return self._root / key[:2] / f"{key}.mp3"
+
+    def _scan_disk(self) -> None:
+        entries = []
+        for path in self._root.glob("??/*.mp3"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or key in self._disk
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        if len(audio) > self.memory_bytes:
+            return
+        self._memory[key] = audio
+        self._memory_size += len(audio)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.stats["memory_evictions"] += 1
+
+    def _read_disk(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                audio = bytes(mapped)
+            os.utime(path)
+            return audio
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, audio: bytes, evicted: list[str]) -> None:
+        atomic_write(self._path(key), audio)
+        for old in evicted:
+            self._path(old).unlink(missing_ok=True)
+
+    async def get(self, text: str, voice: str, speed: float, model: str = "tts-1") -> bytes | None:
+        key = cache_key(text, voice, speed, model)
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+        elif key in self._disk:
+            audio = await asyncio.to_thread(self._read_disk, key)
+            if audio is None:
+                self._disk_size -= self._disk.pop(key, 0)
+            else:
+                self._disk.move_to_end(key)
+                self._remember(key, audio)
+                self.stats["disk_hits"] += 1
+        if audio is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["bytes_saved"] += len(audio)
+        return audio
+
+    async def put(self, text: str, voice: str, speed: float, audio: bytes, model: str = "tts-1") -> None:
+        key = cache_key(text, voice, speed, model)
+        self._remember(key, audio)
+        if not self._root or key in self._disk:
+            return
+        # Index bookkeeping stays on the loop; the thread only touches files.
+        self._disk[key] = len(audio)
+        self._disk_size += len(audio)
+        evicted = []
+        while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+            old, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evicted.append(old)
+        self.stats["disk_evictions"] += len(evicted)
+        try:
+            await asyncio.to_thread(self._write_disk, key, audio, evicted)
+        except OSError as e:
+            self._disk_size -= self._disk.pop(key, 0)
+            logger.warning(f"[tts-cache] disk write failed ({type(e).__name__}: {e})")
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def report(self) -> dict:
+        return {
+            "hit_rate": round(self.hit_rate, 3),
+            "memory_hits": self.stats["memory_hits"],
+            "disk_hits": self.stats["disk_hits"],
+            "misses": self.stats["misses"],
+            "bytes_saved": self.stats["bytes_saved"],
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+        }
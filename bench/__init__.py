@@ -0,0 +1,51 @@
+"""Offline benchmarks against local mock upstreams."""
+from __future__ import annotations
+import os
+import statistics
+from contextlib import contextmanager
+from typing import Iterator
+
+# provider -> (base URL variable, path on the mock server, settings key attribute)
+_PROVIDERS = {
+    "anthropic": ("ANTHROPIC_BASE_URL", "", "anthropic_api_key"),
+    "openai": ("OPENAI_BASE_URL", "/v1", "openai_api_key"),
+}
+
+
+@contextmanager
+def mock_upstreams(http_url: str, providers: tuple[str, ...] = ("anthropic", "openai")) -> Iterator[None]:
+    """Point the SDK clients at the mock server, restoring the environment and settings afterwards.
+
+    Clients read the base URL when they are constructed, so build them inside the block.
+    """
+    from core.config import settings
+    saved_env = {_PROVIDERS[p][0]: os.environ.get(_PROVIDERS[p][0]) for p in providers}
+    saved_keys = {_PROVIDERS[p][2]: getattr(settings, _PROVIDERS[p][2]) for p in providers}
+    try:
+        for provider in providers:
+            variable, path, key = _PROVIDERS[provider]
+            os.environ[variable] = f"{http_url}{path}"
+            setattr(settings, key, getattr(settings, key) or "mock")
+        yield
+    finally:
+        for variable, value in saved_env.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+        for key, value in saved_keys.items():
+            setattr(settings, key, value)
+
+
+def percentiles(samples: list[float]) -> dict:
+    """p50 / p95 / max of latency samples in seconds, reported in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+    return {
+        "n": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
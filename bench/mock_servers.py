@@ -0,0 +1,213 @@
+"""Local stand-ins for Anthropic Messages, OpenAI TTS and Open-LLM-VTuber, with configurable latency.
+
+One FastAPI app serves all of them on a single port:
+
+  POST /v1/messages       — streaming Messages API (tool_use blocks, SSE)
+  POST /v1/audio/speech   — OpenAI TTS (returns silent bytes sized to the text)
+  WS   /client-ws         — Open-LLM-VTuber conversation protocol used by TwitchBridge
+  WS   /ws                — avatar frontend socket used by Performer (records receipts;
+                            negotiates binary audio frames unless disabled)
+"""
+from __future__ import annotations
+import asyncio
+import json
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+
+CANNED_LINES = [
+    "okay chat, hot take incoming",
+    "wait wait wait, read that again",
+    "we are SO back",
+    "someone in chat asked the real question",
+]
+
+
+@dataclass
+class LatencyModel:
+    """Log-normal latency in seconds: `median` scaled by exp(N(0, sigma)), never below `floor`."""
+    median: float
+    sigma: float = 0.35
+    floor: float = 0.0
+
+    def sample(self, rng: random.Random = random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return max(self.floor, rng.lognormvariate(0.0, self.sigma) * self.median)
+
+
+@dataclass
+class MockConfig:
+    llm_first_token: LatencyModel = field(default_factory=lambda: LatencyModel(0.8))
+    llm_per_block: LatencyModel = field(default_factory=lambda: LatencyModel(0.4))
+    tts: LatencyModel = field(default_factory=lambda: LatencyModel(0.35))
+    tts_per_char: float = 0.004
+    olv_response: LatencyModel = field(default_factory=lambda: LatencyModel(1.2))
+    audio_bytes_per_char: int = 600
+    frontend_binary_audio: bool = True
+
+
+@dataclass
+class MockStats:
+    llm_requests: int = 0
+    tts_requests: int = 0
+    olv_replies: int = 0
+    olv_inputs: list[tuple[float, str]] = field(default_factory=list)
+    frontend_messages: list[tuple[float, dict]] = field(default_factory=list)
+    frontend_bytes: int = 0
+
+
+def _sse(event: dict) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+def _tool_calls(rng: random.Random) -> list[tuple[str, dict]]:
+    calls = [("send_chat_response", {"text": rng.choice(CANNED_LINES), "emotion": "happy"})]
+    if rng.random() < 0.5:
+        calls.append(("set_activity", {"activity": rng.choice(["talk", "react", "q_and_a"])}))
+    return calls
+
+
+def create_mock_app(config: MockConfig | None = None, seed: int | None = None) -> FastAPI:
+    config = config or MockConfig()
+    rng = random.Random(seed)
+    stats = MockStats()
+    app = FastAPI(title="Aiko mock upstreams")
+    app.state.stats = stats
+    app.state.config = config
+
+    @app.post("/v1/messages")
+    async def messages(request: Request) -> StreamingResponse:
+        body = await request.json()
+        stats.llm_requests += 1
+        cached = any("cache_control" in block for block in body.get("system", []) if isinstance(block, dict))
+        prompt_tokens = len(json.dumps(body)) // 4
+
+        async def events():
+            await asyncio.sleep(config.llm_first_token.sample(rng))
+            yield _sse({"type": "message_start", "message": {
+                "id": f"msg_{uuid.uuid4().hex[:12]}", "type": "message", "role": "assistant",
+                "model": body.get("model", "mock"), "content": [], "stop_reason": None, "stop_sequence": None,
+                "usage": {
+                    "input_tokens": prompt_tokens // 10 if cached else prompt_tokens,
+                    "output_tokens": 1,
+                    "cache_creation_input_tokens": 0,
+                    "cache_read_input_tokens": prompt_tokens - prompt_tokens // 10 if cached else 0,
+                },
+            }})
+            output_tokens = 0
+            for index, (name, tool_input) in enumerate(_tool_calls(rng)):
+                await asyncio.sleep(config.llm_per_block.sample(rng))
+                yield _sse({"type": "content_block_start", "index": index, "content_block": {
+                    "type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:12]}", "name": name, "input": {},
+                }})
+                yield _sse({"type": "content_block_delta", "index": index, "delta": {
+                    "type": "input_json_delta", "partial_json": json.dumps(tool_input),
+                }})
+                yield _sse({"type": "content_block_stop", "index": index})
+                output_tokens += 40
+            yield _sse({"type": "message_delta", "delta": {"stop_reason": "tool_use", "stop_sequence": None},
+                        "usage": {"output_tokens": output_tokens}})
+            yield _sse({"type": "message_stop"})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/audio/speech")
+    async def speech(request: Request) -> Response:
+        body = await request.json()
+        stats.tts_requests += 1
+        text = body.get("input", "")
+        await asyncio.sleep(config.tts.sample(rng) + config.tts_per_char * len(text))
+        return Response(content=bytes(config.audio_bytes_per_char * len(text)), media_type="audio/mpeg")
+
+    @app.websocket("/client-ws")
+    async def olv(ws: WebSocket) -> None:
+        await ws.accept()
+        try:
+            while True:
+                msg = json.loads(await ws.receive_text())
+                if msg.get("type") != "text-input":
+                    continue
+                stats.olv_inputs.append((time.monotonic(), msg.get("text", "")))
+                await asyncio.sleep(config.olv_response.sample(rng))
+                await ws.send_text(json.dumps({"type": "full-text", "text": rng.choice(CANNED_LINES)}))
+                await ws.send_text(json.dumps({"type": "backend-synth-complete"}))
+                while json.loads(await ws.receive_text()).get("type") != "frontend-playback-complete":
+                    pass
+                stats.olv_replies += 1
+                await ws.send_text(json.dumps({"type": "control", "text": "conversation-chain-end"}))
+        except WebSocketDisconnect:
+            pass
+
+    @app.websocket("/ws")
+    async def frontend(ws: WebSocket) -> None:
+        await ws.accept()
+        try:
+            if config.frontend_binary_audio:
+                await ws.send_text(json.dumps({"type": "hello", "accepts": ["binary-audio"]}))
+            while True:
+                raw = await ws.receive_text()
+                stats.frontend_bytes += len(raw.encode())
+                msg = json.loads(raw)
+                if msg.get("type") == "hello":
+                    continue
+                if msg.get("encoding") == "binary":
+                    # Recorded once the last audio frame has arrived.
+                    for _ in range(msg["frames"]):
+                        stats.frontend_bytes += len(await ws.receive_bytes())
+                stats.frontend_messages.append((time.monotonic(), msg))
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class MockServer:
+    """Runs the mock app on 127.0.0.1 inside the current event loop."""
+
+    def __init__(self, config: MockConfig | None = None, port: int | None = None, seed: int | None = None) -> None:
+        self.port = port or free_port()
+        self.app = create_mock_app(config, seed=seed)
+        self._server = uvicorn.Server(uvicorn.Config(
+            self.app, host="127.0.0.1", port=self.port, log_level="warning",
+        ))
+        self._task: asyncio.Task | None = None
+
+    @property
+    def stats(self) -> MockStats:
+        return self.app.state.stats
+
+    @property
+    def http_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    async def __aenter__(self) -> MockServer:
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            await asyncio.sleep(0.01)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._server.should_exit = True
+        if self._task:
+            await self._task
+
+
+if __name__ == "__main__":
+    uvicorn.run(create_mock_app(), host="127.0.0.1", port=12393)
@@ -0,0 +1,176 @@
+"""Offline benchmark of the twitch_client.main pipeline against the local mock upstreams.
+
+Wires the same components main() does (bus, priority queue, analytics, orchestrator,
+bridge) plus a SpeechScheduler-driven Performer for speech, feeds synthetic chat and
+donations (each donation also queues a thank-you line), and reports decisions per
+minute, event-loop lag and speech latency.
+
+    python -m bench.orchestrator_loop --duration 60 --chat-rate 40
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from loguru import logger
+
+from bench import mock_upstreams, percentiles
+from bench.mock_servers import LatencyModel, MockConfig, MockServer
+
+
+async def _loop_lag_probe(samples: list[float], interval: float = 0.05) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - start - interval, 0.0))
+
+
+async def _chat_feeder(bus, queue, rng: random.Random, chat_rate: float, donation_rate: float, sent: dict) -> None:
+    from agents.speech_scheduler import donation_priority
+    from core.interfaces import ChatMessage, Event, EventType
+    n = 0
+    while True:
+        await asyncio.sleep(rng.expovariate(chat_rate / 60))
+        n += 1
+        msg = ChatMessage(username=f"viewer{rng.randint(1, 200)}", text=f"message {n}?")
+        sent[f"[{msg.username}]: {msg.text}"] = time.monotonic()
+        await queue.put(msg)
+        await bus.publish(Event(
+            type=EventType.CHAT_MESSAGE,
+            payload={"username": msg.username, "text": msg.text},
+            priority=1,
+            source="bench",
+        ))
+        if rng.random() < donation_rate / max(chat_rate, 1e-9):
+            amount = rng.choice([2.0, 5.0, 10.0, 25.0])
+            await bus.publish(Event(
+                type=EventType.DONATION,
+                payload={"username": msg.username, "amount": amount},
+                priority=100,
+                source="bench",
+            ))
+            await bus.publish(Event(
+                type=EventType.SPEAK,
+                payload={"text": f"Thank you {msg.username} for the ${amount:.0f} (#{n})!", "emotion": "excited"},
+                priority=donation_priority(amount),
+                source="bench",
+            ))
+
+
+async def run_bench(
+    duration: float = 30.0,
+    chat_rate: float = 30.0,
+    donation_rate: float = 1.0,
+    config: MockConfig | None = None,
+    check_interval: float = 2.0,
+    seed: int = 7,
+) -> dict:
+    async with MockServer(config, seed=seed) as mock:
+        with mock_upstreams(mock.http_url):
+            from agents.analytics import AnalyticsAgent, MetricsCollector
+            from agents.orchestrator import OrchestratorAgent
+            from agents.performer import Performer, split_sentences
+            from agents.scheduler import DecisionScheduler
+            from agents.speech_scheduler import SpeechScheduler
+            from core.bandit import Action, ThompsonBandit
+            from core.event_bus import EventBus
+            from core.interfaces import Event, EventType
+            from twitch_client.bridge import TwitchBridge
+            from twitch_client.priority_queue import PriorityMessageQueue
+
+            bus = EventBus()
+            queue = PriorityMessageQueue()
+            collector = MetricsCollector()
+            analytics = AnalyticsAgent(bus, collector)
+            orchestrator = OrchestratorAgent(collector=collector, bandit=ThompsonBandit(list(Action)))
+            scheduler = DecisionScheduler(bus, check_interval=check_interval, min_interval=check_interval / 2)
+            bridge = TwitchBridge(queue, url=f"{mock.ws_url}/client-ws")
+            performer = Performer(frontend_url=mock.http_url)
+            speech = SpeechScheduler(bus, performer)
+
+            spoken: dict[str, list[float]] = {}
+
+            async def on_speak(event: Event) -> None:
+                # Speech latency is time to the first sentence chunk reaching the frontend.
+                spoken.setdefault(split_sentences(event.payload["text"])[0], []).append(time.monotonic())
+
+            bus.subscribe(EventType.SPEAK, on_speak)
+
+            lag: list[float] = []
+            sent: dict[str, float] = {}
+            tasks = [
+                asyncio.create_task(_loop_lag_probe(lag)),
+                asyncio.create_task(_chat_feeder(bus, queue, random.Random(seed), chat_rate, donation_rate, sent)),
+                asyncio.create_task(bridge.run()),
+                asyncio.create_task(speech.run()),
+                asyncio.create_task(orchestrator.run_loop(
+                    bus, current_activity_getter=lambda: analytics._current_activity, scheduler=scheduler,
+                )),
+            ]
+            await asyncio.sleep(duration)
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await performer.close()
+
+            speech_latency = []
+            for received_at, msg in mock.stats.frontend_messages:
+                text = msg.get("text")
+                if msg.get("seq", 0) == 0 and spoken.get(text):
+                    speech_latency.append(received_at - spoken[text].pop(0))
+
+            queue_latency = [at - sent[text] for at, text in mock.stats.olv_inputs if text in sent]
+
+            minutes = duration / 60
+            decisions = orchestrator.policy.stats["local"] + orchestrator.policy.stats["escalate"]
+            return {
+                "duration_s": duration,
+                "decisions_per_min": round(decisions / minutes, 2),
+                "llm_calls_per_min": round(mock.stats.llm_requests / minutes, 2),
+                "escalation_rate": round(orchestrator.policy.escalation_rate, 3),
+                "olv_replies_per_min": round(mock.stats.olv_replies / minutes, 2),
+                "chat_backlog": len(sent) - len(mock.stats.olv_inputs),
+                "chat_to_olv_latency": percentiles(queue_latency),
+                "loop_lag": percentiles(lag),
+                "speech_latency": percentiles(speech_latency),
+                "speech": dict(speech.stats),
+                "tokens": orchestrator.budget.report(),
+            }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--chat-rate", type=float, default=30.0, help="chat messages per minute")
+    parser.add_argument("--donation-rate", type=float, default=1.0, help="donations per minute")
+    parser.add_argument("--llm-median", type=float, default=0.8, help="median time to first LLM event (s)")
+    parser.add_argument("--tts-median", type=float, default=0.35, help="median TTS latency (s)")
+    parser.add_argument("--olv-median", type=float, default=1.2, help="median OLV reply latency (s)")
+    parser.add_argument("--check-interval", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    config = MockConfig(
+        llm_first_token=LatencyModel(args.llm_median),
+        tts=LatencyModel(args.tts_median),
+        olv_response=LatencyModel(args.olv_median),
+    )
+    report = asyncio.run(run_bench(
+        duration=args.duration,
+        chat_rate=args.chat_rate,
+        donation_rate=args.donation_rate,
+        config=config,
+        check_interval=args.check_interval,
+        seed=args.seed,
+    ))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Per-command latency to the avatar frontend: connect-per-message vs the persistent FrontendLink.
+
+Runs a local WebSocket echo server and times each expression command from send until the
+echo comes back, which includes the TCP and WebSocket handshake in the connect-per-message case.
+Then times `speak` messages carrying audio until the frontend acknowledges the complete
+message, comparing base64-in-JSON against negotiated binary frames, with bytes on the wire.
+
+    python -m bench.performer_link --commands 500 --audio-kb 120
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import websockets
+from loguru import logger
+
+from agents.performer import FrontendLink
+from bench import percentiles
+
+
+async def _echo(ws) -> None:
+    try:
+        async for raw in ws:
+            await ws.send(raw)
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def _connect_per_command(url: str, commands: int) -> list[float]:
+    """The old Performer behaviour: a fresh connection for every message."""
+    samples = []
+    for i in range(commands):
+        started = time.perf_counter()
+        async with websockets.connect(url) as ws:
+            await ws.send(json.dumps({"type": "expression", "value": "smile", "seq": i}))
+            await ws.recv()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _persistent(url: str, commands: int) -> list[float]:
+    echoes: dict[int, asyncio.Future] = {}
+
+    def on_message(msg: dict) -> None:
+        future = echoes.pop(msg["seq"], None)
+        if future and not future.done():
+            future.set_result(time.perf_counter())
+
+    link = FrontendLink(url, on_message=on_message)
+    await link.wait_connected(timeout=5.0)
+    loop = asyncio.get_running_loop()
+    samples = []
+    try:
+        for i in range(commands):
+            echoes[i] = loop.create_future()
+            started = time.perf_counter()
+            await link.send({"type": "expression", "value": "smile", "seq": i})
+            samples.append(await echoes[i] - started)
+    finally:
+        await link.close()
+    return samples
+
+
+async def _audio_sink(ws) -> None:
+    """Frontend stand-in that negotiates binary audio and acks each complete speak message."""
+    try:
+        await ws.send(json.dumps({"type": "hello", "accepts": ["binary-audio"]}))
+        async for raw in ws:
+            msg = json.loads(raw)
+            if msg.get("type") == "hello":
+                continue
+            for _ in range(msg.get("frames", 0)):
+                await ws.recv()
+            await ws.send(json.dumps({"type": "ack", "seq": msg["seq"]}))
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def _audio_commands(url: str, commands: int, audio: bytes, binary: bool) -> dict:
+    acks: dict[int, asyncio.Future] = {}
+
+    def on_message(msg: dict) -> None:
+        future = acks.pop(msg.get("seq"), None)
+        if future and not future.done():
+            future.set_result(time.perf_counter())
+
+    link = FrontendLink(url, on_message=on_message, binary_audio=binary)
+    await link.wait_connected(timeout=5.0)
+    await asyncio.sleep(0.05)  # let the hello exchange finish
+    loop = asyncio.get_running_loop()
+    samples = []
+    try:
+        for i in range(commands):
+            acks[i] = loop.create_future()
+            started = time.perf_counter()
+            await link.send({"type": "speak", "text": "hello chat", "seq": i}, audio)
+            samples.append(await acks[i] - started)
+    finally:
+        await link.close()
+    return {**percentiles(samples), "bytes_per_command": link.stats["bytes_sent"] // max(commands, 1)}
+
+
+async def run_bench(commands: int = 200, audio_kb: int = 120) -> dict:
+    async with websockets.serve(_echo, "127.0.0.1", 0) as server:
+        url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}/ws"
+        per_command = await _connect_per_command(url, commands)
+        persistent = await _persistent(url, commands)
+
+    audio = bytes(range(256)) * (audio_kb * 4)
+    async with websockets.serve(_audio_sink, "127.0.0.1", 0, max_size=None) as server:
+        url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}/ws"
+        base64_audio = await _audio_commands(url, commands, audio, binary=False)
+        binary_audio = await _audio_commands(url, commands, audio, binary=True)
+    return {
+        "commands": commands,
+        "connect_per_command": percentiles(per_command),
+        "persistent_link": percentiles(persistent),
+        "audio_kb": audio_kb,
+        "speak_base64": base64_audio,
+        "speak_binary": binary_audio,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--audio-kb", type=int, default=120, help="audio payload per speak command")
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    print(json.dumps(asyncio.run(run_bench(args.commands, args.audio_kb)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Time-to-first-audio for Performer.speak: whole-reply TTS vs sentence streaming vs cache hits.
+
+Uses the mock OpenAI TTS endpoint (latency = base + per-character cost) and the mock
+frontend socket, and times each utterance from the speak() call to the first and the
+last `speak` frame arriving at the frontend. The first two modes run with caching
+disabled; the third replays the same lines through a pre-warmed TTS cache.
+
+    python -m bench.tts_stream --utterances 10 --tts-median 0.35
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from loguru import logger
+
+from bench import mock_upstreams, percentiles
+from bench.mock_servers import LatencyModel, MockConfig, MockServer
+
+REPLIES = [
+    "Oh my gosh, thank you so much for the donation! You really did not have to do that. "
+    "I am going to put it straight toward the new model. Chat, say thanks!",
+    "Okay, hot take incoming. Pineapple on pizza is fine, actually. The real crime is cold pizza "
+    "for breakfast. Fight me in the comments, I will read every single one.",
+    "Welcome in, raiders! We were just arguing about the best starter Pokémon. "
+    "Grab a seat, pick a side, and tell me why everyone else is wrong.",
+]
+
+
+async def _measure(mock: MockServer, sentence_streaming: bool, utterances: int, cache=None) -> dict:
+    from agents.performer import Performer
+    from agents.tts_cache import TTSCache
+
+    performer = Performer(
+        frontend_url=mock.http_url,
+        sentence_streaming=sentence_streaming,
+        cache=cache or TTSCache(memory_bytes=0),
+    )
+    await performer.link.wait_connected(timeout=5.0)
+    first, total = [], []
+    tts_before = mock.stats.tts_requests
+    try:
+        for i in range(utterances):
+            seen = len(mock.stats.frontend_messages)
+            started = time.monotonic()
+            await performer.speak(REPLIES[i % len(REPLIES)], emotion="happy")
+            while not any(msg.get("final") for _, msg in mock.stats.frontend_messages[seen:]):
+                await asyncio.sleep(0.001)
+            frames = mock.stats.frontend_messages[seen:]
+            first.append(frames[0][0] - started)
+            total.append(frames[-1][0] - started)
+    finally:
+        await performer.close()
+    return {
+        "first_audio": percentiles(first),
+        "last_audio": percentiles(total),
+        "tts_requests": mock.stats.tts_requests - tts_before,
+    }
+
+
+async def run_bench(utterances: int = 6, config: MockConfig | None = None) -> dict:
+    async with MockServer(config) as mock:
+        with mock_upstreams(mock.http_url, providers=("openai",)):
+            whole = await _measure(mock, sentence_streaming=False, utterances=utterances)
+            streamed = await _measure(mock, sentence_streaming=True, utterances=utterances)
+
+            from agents.performer import Performer
+            from agents.tts_cache import TTSCache, template_lines
+            cache = TTSCache()
+            warmer = Performer(frontend_url=mock.http_url, cache=cache)
+            await warmer.prewarm(template_lines(REPLIES), emotions=("happy",))
+            await warmer.close()
+            cache.stats.clear()
+            cached = await _measure(mock, sentence_streaming=True, utterances=utterances, cache=cache)
+            cached["cache"] = cache.report()
+            return {
+                "utterances": utterances,
+                "whole_reply": whole,
+                "sentence_streaming": streamed,
+                "prewarmed_cache": cached,
+            }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utterances", type=int, default=6)
+    parser.add_argument("--tts-median", type=float, default=0.35, help="median TTS base latency (s)")
+    parser.add_argument("--tts-per-char", type=float, default=0.004, help="added TTS latency per character (s)")
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    config = MockConfig(tts=LatencyModel(args.tts_median), tts_per_char=args.tts_per_char)
+    print(json.dumps(asyncio.run(run_bench(args.utterances, config)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
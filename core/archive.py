@@ -0,0 +1,154 @@
+"""Columnar per-stream archive — per-second metric series stored as memory-mapped .npy columns."""
+from __future__ import annotations
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from core.bandit import Action
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+ACTIVITIES = [a.value for a in Action]
+
+COLUMN_DTYPES: dict[str, str] = {
+    "t": "float64",
+    "viewer_count": "int32",
+    "chat_velocity": "float32",
+    "donations_per_hour": "float32",
+    "engagement_score": "float32",
+    "revenue": "float64",
+    "activity": "int8",
+    "chat_messages": "int32",
+    "donations": "int32",
+    "subscriptions": "int32",
+    "raids": "int32",
+}
+
+COUNTED_EVENTS = {
+    EventType.CHAT_MESSAGE: "chat_messages",
+    EventType.DONATION: "donations",
+    EventType.SUBSCRIPTION: "subscriptions",
+    EventType.RAID: "raids",
+}
+
+
+def activity_code(activity: str) -> int:
+    try:
+        return ACTIVITIES.index(activity)
+    except ValueError:
+        return -1
+
+
+class StreamRecorder:
+    """Samples the metrics snapshot once per second and counts bus events between samples."""
+
+    def __init__(self, bus: EventBus) -> None:
+        self._started_at = time.time()
+        self._columns: dict[str, list] = {name: [] for name in COLUMN_DTYPES}
+        self._pending = {name: 0 for name in COUNTED_EVENTS.values()}
+        for event_type in COUNTED_EVENTS:
+            bus.subscribe(event_type, self._on_event)
+
+    def __len__(self) -> int:
+        return len(self._columns["t"])
+
+    async def _on_event(self, event: Event) -> None:
+        self._pending[COUNTED_EVENTS[event.type]] += 1
+
+    def sample(self, snapshot: dict, activity: str, revenue: float, now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        cols = self._columns
+        cols["t"].append(now - self._started_at)
+        cols["viewer_count"].append(snapshot["viewer_count"])
+        cols["chat_velocity"].append(snapshot["chat_velocity"])
+        cols["donations_per_hour"].append(snapshot["donations_per_hour"])
+        cols["engagement_score"].append(snapshot["engagement_score"])
+        cols["revenue"].append(revenue)
+        cols["activity"].append(activity_code(activity))
+        for name, count in self._pending.items():
+            cols[name].append(count)
+            self._pending[name] = 0
+
+    async def sample_loop(
+        self,
+        collector,
+        activity_getter: Callable[[], str],
+        interval: float = 1.0,
+    ) -> None:
+        while True:
+            self.sample(collector.snapshot(), activity_getter(), collector._donation_total)
+            await asyncio.sleep(interval)
+
+    def columns(self) -> dict[str, np.ndarray]:
+        return {
+            name: np.asarray(values, dtype=COLUMN_DTYPES[name])
+            for name, values in self._columns.items()
+        }
+
+    def save(self, archive: StreamArchive, stream_id: str) -> Path:
+        return archive.write(stream_id, self.columns(), started_at=self._started_at)
+
+
+class StreamArchive:
+    """One directory per stream: `<column>.npy` files plus `meta.json`.
+
+    Columns load with `mmap_mode="r"`, so scanning months of streams only pages in
+    the columns an analysis actually touches. Activity codes are translated through the
+    stream's saved `meta["activities"]`, so reordering `Action` never relabels old streams.
+    """
+
+    def __init__(self, root: str) -> None:
+        self._root = Path(root)
+
+    def write(self, stream_id: str, columns: dict[str, np.ndarray], started_at: float) -> Path:
+        stream_dir = self._root / stream_id
+        stream_dir.mkdir(parents=True, exist_ok=True)
+        for name, values in columns.items():
+            np.save(stream_dir / f"{name}.npy", np.asarray(values, dtype=COLUMN_DTYPES[name]))
+        meta = {
+            "stream_id": stream_id,
+            "started_at": started_at,
+            "length": int(len(columns["t"])),
+            "activities": ACTIVITIES,
+        }
+        (stream_dir / "meta.json").write_text(json.dumps(meta))
+        return stream_dir
+
+    def stream_ids(self) -> list[str]:
+        """All archived streams, oldest first."""
+        if not self._root.exists():
+            return []
+        metas = []
+        for meta_path in self._root.glob("*/meta.json"):
+            try:
+                metas.append(json.loads(meta_path.read_text()))
+            except json.JSONDecodeError:
+                continue
+        return [m["stream_id"] for m in sorted(metas, key=lambda m: m["started_at"])]
+
+    def load(self, stream_id: str, columns: list[str] | None = None) -> dict[str, np.ndarray]:
+        stream_dir = self._root / stream_id
+        names = columns or list(COLUMN_DTYPES)
+        loaded = {name: np.load(stream_dir / f"{name}.npy", mmap_mode="r") for name in names}
+        if "activity" in loaded:
+            loaded["activity"] = self._remap_activities(stream_dir, loaded["activity"])
+        return loaded
+
+    @staticmethod
+    def _remap_activities(stream_dir: Path, codes: np.ndarray) -> np.ndarray:
+        """Translate codes written against the stream's `meta["activities"]` into today's `ACTIVITIES`."""
+        try:
+            saved = json.loads((stream_dir / "meta.json").read_text()).get("activities", ACTIVITIES)
+        except (OSError, json.JSONDecodeError):
+            return codes
+        if saved == ACTIVITIES:
+            return codes
+        lookup = np.array([activity_code(name) for name in saved] + [-1], dtype=COLUMN_DTYPES["activity"])
+        return lookup[np.where((codes >= 0) & (codes < len(saved)), codes, -1)]
+
+    def recent(self, n: int, columns: list[str] | None = None) -> list[dict[str, np.ndarray]]:
+        return [self.load(stream_id, columns) for stream_id in self.stream_ids()[-n:]]
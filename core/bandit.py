@@ -1,10 +1,15 @@
-"""Thompson Sampling contextual bandit for engagement-revenue optimization."""
+"""Thompson Sampling bandits for engagement-revenue optimization."""
 from __future__ import annotations
 import json
-import random
+import math
+import time
 from enum import Enum
 from pathlib import Path
 
+import numpy as np
+
+from core.checkpoint import atomic_write, load_newest
+
 
 class Action(str, Enum):
     TALK = "talk"
@@ -21,18 +26,41 @@ class ThompsonBandit:
     Reward signal: normalized donation rate + engagement score delta.
     """
 
-    def __init__(self, actions: list[Action]) -> None:
+    def __init__(self, actions: list[Action], seed: int | None = None) -> None:
         self._arms: dict[Action, dict[str, float]] = {
             action: {"alpha": 1.0, "beta": 1.0} for action in actions
         }
+        self._rng = np.random.default_rng(seed)
+        # Propensity estimates draw from their own generator so they never shift selection.
+        self._estimate_rng = np.random.default_rng(None if seed is None else [seed, 1])
+
+    @property
+    def actions(self) -> list[Action]:
+        return list(self._arms)
+
+    def _params(self) -> tuple[np.ndarray, np.ndarray]:
+        alpha = np.array([arm["alpha"] for arm in self._arms.values()])
+        beta = np.array([arm["beta"] for arm in self._arms.values()])
+        return alpha, beta
 
     def select(self) -> Action:
         """Sample from each arm's Beta distribution, pick the max."""
-        samples = {
-            action: random.betavariate(arm["alpha"], arm["beta"])
-            for action, arm in self._arms.items()
-        }
-        return max(samples, key=lambda a: samples[a])
+        alpha, beta = self._params()
+        return self.actions[int(self._rng.beta(alpha, beta).argmax())]
+
+    def select_batch(self, contexts: np.ndarray, rng: np.random.Generator | None = None) -> np.ndarray:
+        """One sampled arm index per row of `contexts` (contexts themselves are ignored)."""
+        alpha, beta = self._params()
+        rng = rng or self._rng
+        return rng.beta(alpha, beta, size=(len(np.atleast_2d(contexts)), len(alpha))).argmax(axis=1)
+
+    def selection_probabilities(self, context: np.ndarray | None = None, draws: int = 512) -> np.ndarray:
+        """Monte Carlo estimate of P(select() picks each arm); leaves the selection RNG alone."""
+        picks = self.select_batch(np.empty((draws, 0)), rng=self._estimate_rng)
+        return np.bincount(picks, minlength=len(self._arms)) / draws
+
+    def observe(self, inputs: dict, now: float | None = None) -> None:
+        """Context-free: the stream state does not affect arm selection."""
 
     def exploit(self) -> Action:
         """Greedy: pick arm with highest expected value (alpha / (alpha + beta))."""
@@ -50,6 +78,17 @@ class ThompsonBandit:
         else:
             self._arms[action]["beta"] += 1.0
 
+    def update_batch(self, actions: np.ndarray, contexts: np.ndarray, rewards: np.ndarray) -> None:
+        """Same rule as `update` for many (arm index, reward) pairs at once."""
+        actions = np.asarray(actions)
+        rewards = np.asarray(rewards, dtype=float)
+        k = len(self._arms)
+        alpha_gain = np.bincount(actions, weights=np.where(rewards > 0, rewards, 0.0), minlength=k)
+        beta_gain = np.bincount(actions, weights=(rewards <= 0).astype(float), minlength=k)
+        for i, arm in enumerate(self._arms.values()):
+            arm["alpha"] += alpha_gain[i]
+            arm["beta"] += beta_gain[i]
+
     def state(self) -> dict:
         return {
             action.value: {
@@ -60,25 +99,215 @@ class ThompsonBandit:
             for action, arm in self._arms.items()
         }
 
-    def save(self, path: str) -> None:
-        p = Path(path)
-        p.parent.mkdir(parents=True, exist_ok=True)
-        p.write_text(json.dumps(self.state(), indent=2))
+    def to_dict(self) -> dict:
+        """Unrounded saved form of `state()`."""
+        return {
+            action.value: {
+                "alpha": arm["alpha"],
+                "beta": arm["beta"],
+                "expected": round(arm["alpha"] / (arm["alpha"] + arm["beta"]), 3),
+            }
+            for action, arm in self._arms.items()
+        }
 
     @classmethod
-    def load(cls, path: str) -> ThompsonBandit:
-        data = json.loads(Path(path).read_text())
-        actions = [Action(name) for name in data]
-        bandit = cls(actions)
+    def from_dict(cls, data: dict) -> ThompsonBandit:
+        bandit = cls([Action(name) for name in data])
         for name, arm_data in data.items():
             action = Action(name)
-            bandit._arms[action]["alpha"] = arm_data["alpha"]
-            bandit._arms[action]["beta"] = arm_data["beta"]
+            bandit._arms[action]["alpha"] = float(arm_data["alpha"])
+            bandit._arms[action]["beta"] = float(arm_data["beta"])
         return bandit
 
+    def save(self, path: str, keep: int = 1) -> None:
+        atomic_write(path, json.dumps(self.to_dict()).encode(), keep)
+
+    @classmethod
+    def load(cls, path: str) -> ThompsonBandit:
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
     @classmethod
     def load_or_create(cls, path: str) -> ThompsonBandit:
-        try:
-            return cls.load(path)
-        except (FileNotFoundError, json.JSONDecodeError, KeyError):
-            return cls(list(Action))
+        """Newest readable checkpoint generation, or fresh priors if none survives."""
+        return load_newest(path, cls.load) or cls(list(Action))
+
+
+FEATURES = (
+    "bias", "log_viewers", "chat_velocity", "donations_per_hour", "engagement",
+    "hour_sin", "hour_cos", *(f"in_{a.value}" for a in Action),
+)
+
+
+def context_features(inputs: dict, now: float | None = None) -> np.ndarray:
+    """Feature vector for a `MetricsCollector.snapshot()` plus the current `activity`.
+
+    Everything is scaled to roughly [0, 1]; time of day is encoded on the unit circle
+    so 23:00 and 01:00 are neighbours.
+    """
+    local = time.localtime(now)
+    hour = local.tm_hour + local.tm_min / 60
+    angle = 2 * math.pi * hour / 24
+    x = np.zeros(len(FEATURES))
+    x[0] = 1.0
+    x[1] = math.log1p(max(inputs.get("viewer_count", 0), 0)) / 10
+    x[2] = min(inputs.get("chat_velocity", 0.0) / 100, 1.0)
+    x[3] = min(inputs.get("donations_per_hour", 0.0) / 50, 1.0)
+    x[4] = inputs.get("engagement_score", 0.0) / 100
+    x[5], x[6] = math.sin(angle), math.cos(angle)
+    activity = inputs.get("activity")
+    for i, action in enumerate(Action):
+        if action.value == activity:
+            x[7 + i] = 1.0
+    return x
+
+
+class LinearThompsonBandit:
+    """Linear Thompson Sampling over stream-state features — a drop-in for `ThompsonBandit`.
+
+    Each arm keeps a ridge-regression posterior (precision A, response b) over
+    `context_features`. The inverse of A is maintained with Sherman-Morrison rank-one
+    updates, so a decision is a handful of small matrix ops and never a full solve.
+    `observe()` sets the context used by the argument-less `select`/`exploit`/`update`
+    calls the orchestrator and retrospective already make.
+    """
+
+    def __init__(
+        self,
+        actions: list[Action],
+        exploration: float = 0.25,
+        regularization: float = 1.0,
+        seed: int | None = None,
+    ) -> None:
+        self._actions = list(actions)
+        self.exploration = exploration
+        self.regularization = regularization
+        d, k = len(FEATURES), len(self._actions)
+        self._A = np.tile(np.eye(d) * regularization, (k, 1, 1))
+        self._A_inv = np.tile(np.eye(d) / regularization, (k, 1, 1))
+        self._b = np.zeros((k, d))
+        self._n = np.zeros(k)
+        self._index = {action: i for i, action in enumerate(self._actions)}
+        self._rng = np.random.default_rng(seed)
+        self._estimate_rng = np.random.default_rng(None if seed is None else [seed, 1])
+        self._context = np.zeros(d)
+        self._context[0] = 1.0
+
+    @property
+    def actions(self) -> list[Action]:
+        return list(self._actions)
+
+    def observe(self, inputs: dict, now: float | None = None) -> None:
+        """Set the current context from a metrics snapshot plus `activity`."""
+        self._context = context_features(inputs, now)
+
+    def _theta(self) -> np.ndarray:
+        return np.einsum("kij,kj->ki", self._A_inv, self._b)
+
+    def _sample_theta(self, n: int, rng: np.random.Generator | None = None) -> np.ndarray:
+        """n posterior draws per arm, shape (n, k, d)."""
+        cov = self.exploration ** 2 * self._A_inv
+        chol = np.linalg.cholesky(cov + 1e-12 * np.eye(cov.shape[-1]))
+        z = (rng or self._rng).standard_normal((n, *self._b.shape))
+        return self._theta()[None] + np.einsum("kij,nkj->nki", chol, z)
+
+    def select_batch(self, contexts: np.ndarray) -> np.ndarray:
+        """Sampled arm index for each row of `contexts` (n, d), one posterior draw per row."""
+        contexts = np.atleast_2d(contexts)
+        scores = np.einsum("nkd,nd->nk", self._sample_theta(len(contexts)), contexts)
+        return scores.argmax(axis=1)
+
+    def selection_probabilities(self, context: np.ndarray | None = None, draws: int = 512) -> np.ndarray:
+        """Monte Carlo estimate of P(select(context) picks each arm); leaves the selection RNG alone."""
+        x = self._context if context is None else context
+        picks = (self._sample_theta(draws, rng=self._estimate_rng) @ x).argmax(axis=1)
+        return np.bincount(picks, minlength=len(self._actions)) / draws
+
+    def select(self, context: np.ndarray | None = None) -> Action:
+        """Sample each arm's weights from its posterior, pick the highest predicted reward."""
+        x = self._context if context is None else context
+        return self._actions[int(self.select_batch(x)[0])]
+
+    def expected(self, context: np.ndarray | None = None) -> np.ndarray:
+        x = self._context if context is None else context
+        return np.clip(self._theta() @ x, 0.0, 1.0)
+
+    def exploit(self, context: np.ndarray | None = None) -> Action:
+        """Greedy: pick the arm with the highest posterior-mean reward for the context."""
+        return self._actions[int(self.expected(context).argmax())]
+
+    def update(self, action: Action, reward: float, context: np.ndarray | None = None) -> None:
+        """Rank-one posterior update for `action` observed at `context` (default: last observed)."""
+        if action not in self._index:
+            return
+        x = self._context if context is None else np.asarray(context, dtype=float)
+        k = self._index[action]
+        a_inv_x = self._A_inv[k] @ x
+        self._A_inv[k] -= np.outer(a_inv_x, a_inv_x) / (1.0 + x @ a_inv_x)
+        self._A[k] += np.outer(x, x)
+        self._b[k] += reward * x
+        self._n[k] += 1
+
+    def update_batch(self, actions: np.ndarray, contexts: np.ndarray, rewards: np.ndarray) -> None:
+        """Apply many observations at once.
+
+        `actions` are arm indices into `self.actions`; `contexts` is (n, d). Each touched
+        arm gets one accumulated X^T X update and a fresh d x d inverse, which is cheaper
+        than n rank-one updates once n exceeds d and also clears accumulated drift.
+        """
+        actions = np.asarray(actions)
+        contexts = np.atleast_2d(np.asarray(contexts, dtype=float))
+        rewards = np.asarray(rewards, dtype=float)
+        for k in np.unique(actions):
+            mask = actions == k
+            X = contexts[mask]
+            self._A[k] += X.T @ X
+            self._b[k] += X.T @ rewards[mask]
+            self._n[k] += len(X)
+            self._A_inv[k] = np.linalg.inv(self._A[k])
+
+    def state(self) -> dict:
+        expected = self.expected()
+        return {
+            action.value: {
+                "expected": round(float(expected[i]), 3),
+                "n": int(self._n[i]),
+            }
+            for i, action in enumerate(self._actions)
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": "linear_thompson",
+            "features": list(FEATURES),
+            "exploration": self.exploration,
+            "regularization": self.regularization,
+            "arms": {
+                action.value: {"A": self._A[i].tolist(), "b": self._b[i].tolist(), "n": int(self._n[i])}
+                for i, action in enumerate(self._actions)
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> LinearThompsonBandit:
+        if data["kind"] != "linear_thompson" or data["features"] != list(FEATURES):
+            raise ValueError("not a linear Thompson state with the current feature set")
+        arms = data["arms"]
+        bandit = cls([Action(name) for name in arms], data["exploration"], data["regularization"])
+        for i, arm in enumerate(arms.values()):
+            bandit._A[i] = np.asarray(arm["A"])
+            bandit._b[i] = np.asarray(arm["b"])
+            bandit._n[i] = arm["n"]
+        bandit._A_inv = np.linalg.inv(bandit._A)
+        return bandit
+
+    def save(self, path: str, keep: int = 1) -> None:
+        atomic_write(path, json.dumps(self.to_dict()).encode(), keep)
+
+    @classmethod
+    def load(cls, path: str) -> LinearThompsonBandit:
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+    @classmethod
+    def load_or_create(cls, path: str) -> LinearThompsonBandit:
+        """Newest readable checkpoint generation, or a fresh prior if none survives."""
+        return load_newest(path, cls.load) or cls(list(Action))
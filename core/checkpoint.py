@@ -0,0 +1,166 @@
+"""Crash-safe state checkpoints — atomic writes, rotated generations and a debounced off-loop writer."""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import suppress
+from pathlib import Path
+from typing import Callable, Protocol, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class Checkpointable(Protocol):
+    def to_dict(self) -> dict: ...
+
+
+def generation_path(path: str | Path, generation: int) -> Path:
+    """`state.json` for generation 0 (newest), then `state.json.1`, `state.json.2`, ..."""
+    path = Path(path)
+    return path if generation == 0 else path.with_name(f"{path.name}.{generation}")
+
+
+def generations(path: str | Path) -> list[Path]:
+    """Existing generations of `path`, newest first."""
+    found, i = [], 0
+    while True:
+        candidate = generation_path(path, i)
+        if not candidate.exists():
+            if i > 0:
+                return found
+        else:
+            found.append(candidate)
+        i += 1
+
+
+def _fsync_dir(directory: Path) -> None:
+    with suppress(OSError, AttributeError):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def atomic_write(path: str | Path, payload: bytes, keep: int = 1) -> None:
+    """Write `payload` to `path` so readers see either the old file or the new one, never a mix.
+
+    Data goes to a temp file in the same directory, is fsynced, then renamed over
+    `path`. With `keep > 1` the previous versions are kept as `path.1 ... path.{keep-1}`.
+    `path` itself always exists while rotating: the newest old version is hard-linked
+    (or copied) to `path.1` rather than moved.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        if keep > 1 and path.exists():
+            for i in range(keep - 1, 1, -1):
+                older = generation_path(path, i - 1)
+                if older.exists():
+                    os.replace(older, generation_path(path, i))
+            previous = generation_path(path, 1)
+            with suppress(FileNotFoundError):
+                previous.unlink()
+            try:
+                os.link(path, previous)
+            except OSError:
+                shutil.copy2(path, previous)
+        os.replace(tmp, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+    _fsync_dir(path.parent)
+
+
+def load_newest(path: str | Path, loader: Callable[[Path], T]) -> T | None:
+    """Load the newest generation of `path` that `loader` accepts; None if there is none."""
+    for candidate in generations(path):
+        try:
+            loaded = loader(candidate)
+        except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"[checkpoint] {candidate} unreadable ({type(e).__name__}: {e}); trying older generation")
+            continue
+        if candidate != Path(path):
+            logger.warning(f"[checkpoint] recovered state from older generation {candidate}")
+        return loaded
+    return None
+
+
+class StateCheckpointer:
+    """Coalesces state updates into periodic atomic checkpoints written off the event loop.
+
+    Works for any `Checkpointable`; the bandits and the donation goals both use it.
+    `mark_dirty()` is cheap and synchronous. The first call after a write starts a
+    timer; every update within `debounce` seconds rides along in the same write. State
+    is captured with `to_dict()` on the loop, so the thread only serializes and writes a
+    consistent copy. `flush()` writes immediately — call it on shutdown.
+    """
+
+    def __init__(self, state: Checkpointable, path: str, debounce: float = 5.0, keep: int = 5) -> None:
+        self._state = state
+        self._path = Path(path)
+        self.debounce = debounce
+        self.keep = keep
+        self._dirty = False
+        self._lock = asyncio.Lock()
+        self._flush_now = asyncio.Event()
+        self._pending: asyncio.Task | None = None
+        self.stats: Counter[str] = Counter()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+        self.stats["updates"] += 1
+        if self._pending and not self._pending.done():
+            return
+        try:
+            self._pending = asyncio.get_running_loop().create_task(self._write_later())
+        except RuntimeError:
+            self._pending = None  # no loop (e.g. sync callers); the next flush() picks it up
+
+    async def _write_later(self) -> None:
+        with suppress(TimeoutError):
+            await asyncio.wait_for(self._flush_now.wait(), self.debounce)
+        await self._write()
+
+    async def _write(self) -> None:
+        async with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            state = self._state.to_dict()
+            try:
+                await asyncio.to_thread(atomic_write, self._path, json.dumps(state).encode(), self.keep)
+            except OSError as e:
+                self._dirty = True
+                self.stats["errors"] += 1
+                logger.error(f"[checkpoint] writing {self._path} failed ({type(e).__name__}: {e})")
+                return
+            self.stats["writes"] += 1
+
+    async def flush(self) -> None:
+        """Write any pending updates now and wait for the write to land."""
+        pending = self._pending
+        if pending and not pending.done():
+            self._flush_now.set()
+            await pending
+        self._flush_now.clear()
+        await self._write()
@@ -18,7 +18,13 @@ class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379"
     twitch_rtmp_url: str = "rtmp://live.twitch.tv/app/"
     twitch_stream_key: str = ""
+    simulcast_rtmp_urls: str = ""  # comma-separated extra RTMP destinations
+    recording_dir: str = ""  # local segmented recording; empty to disable
+    encoder_profile: str = ""  # fixed profile from the ladder, e.g. "720p30-fast"; empty to calibrate
+    capture_mode: str = "x11"  # "x11" (Xvfb + x11grab) or "screencast" (headless CDP frames)
+    bandit_backend: str = "thompson"  # "thompson" or "linear" (contextual)
     vtuber_frontend_url: str = "http://localhost:12393"
+    analytics_url: str = "http://localhost:8000"
 
 
 settings = Settings()
@@ -62,3 +62,22 @@ class Neo4jDB:
                 """,
                 username=username, stream_id=stream_id, amount=amount,
             )
+
+    def upsert_stream_summaries(self, summaries: list[dict]) -> None:
+        """Batch-mirror stream summaries onto `Stream` nodes with a single UNWIND."""
+        with self._driver.session() as session:
+            session.run(
+                """
+                UNWIND $rows AS row
+                MERGE (s:Stream {id: row.stream_id})
+                ON CREATE SET s.date = datetime({epochMillis: toInteger(row.ended_at * 1000)})
+                SET s.duration_minutes = row.duration_minutes,
+                    s.peak_viewers     = row.peak_viewers,
+                    s.total_revenue    = row.total_revenue,
+                    s.revenue_per_hour = row.revenue_per_hour,
+                    s.top_activities   = row.top_activities,
+                    s.chat_messages    = row.chat_messages,
+                    s.engagement_score = row.engagement_score
+                """,
+                rows=summaries,
+            )
@@ -0,0 +1,178 @@
+"""Stream history index — SQLite store of past StreamSummary rows."""
+from __future__ import annotations
+import base64
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS streams (
+        stream_id        TEXT PRIMARY KEY,
+        ended_at         REAL NOT NULL,
+        duration_minutes REAL NOT NULL,
+        peak_viewers     INTEGER NOT NULL,
+        total_revenue    REAL NOT NULL,
+        revenue_per_hour REAL NOT NULL,
+        top_activities   TEXT NOT NULL,
+        chat_messages    INTEGER NOT NULL,
+        engagement_score REAL NOT NULL,
+        mirrored         INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_streams_ended ON streams (ended_at, stream_id)",
+    "CREATE INDEX IF NOT EXISTS idx_streams_revenue ON streams (revenue_per_hour, stream_id)",
+    "CREATE INDEX IF NOT EXISTS idx_streams_engagement ON streams (engagement_score, stream_id)",
+    "CREATE INDEX IF NOT EXISTS idx_streams_unmirrored ON streams (mirrored) WHERE mirrored = 0",
+]
+
+# Sort key -> indexed column. Every listing is keyset-paginated on (column, stream_id).
+SORT_COLUMNS = {
+    "date": "ended_at",
+    "revenue": "revenue_per_hour",
+    "engagement": "engagement_score",
+}
+
+COLUMNS = (
+    "stream_id", "ended_at", "duration_minutes", "peak_viewers", "total_revenue",
+    "revenue_per_hour", "top_activities", "chat_messages", "engagement_score",
+)
+
+
+def _encode_cursor(value: float, stream_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, stream_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        value, stream_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+    return float(value), str(stream_id)
+
+
+class StreamHistory:
+    """Append-only index of stream summaries, queried by the dashboard history view.
+
+    One connection is shared by the event loop (`append`) and FastAPI's threadpool
+    (`query`), so every use of it holds `_lock`.
+    """
+
+    def __init__(self, path: str) -> None:
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            for query in SCHEMA:
+                self._conn.execute(query)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def append(self, summary, ended_at: float | None = None) -> None:
+        """Insert or replace a StreamSummary (re-running a retrospective is idempotent)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO streams ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                (
+                    summary.stream_id,
+                    ended_at if ended_at is not None else time.time(),
+                    summary.duration_minutes,
+                    summary.peak_viewers,
+                    summary.total_revenue,
+                    summary.revenue_per_hour,
+                    json.dumps(summary.top_activities),
+                    summary.chat_messages,
+                    summary.engagement_score,
+                ),
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM streams").fetchone()[0]
+
+    def query(
+        self,
+        limit: int = 20,
+        cursor: str | None = None,
+        sort: str = "date",
+        since: float | None = None,
+        until: float | None = None,
+        min_revenue: float | None = None,
+        min_engagement: float | None = None,
+        activity: str | None = None,
+    ) -> dict:
+        """Return one page of streams, newest/highest first, plus the cursor for the next page."""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"unknown sort {sort!r}; expected one of {sorted(SORT_COLUMNS)}")
+        column = SORT_COLUMNS[sort]
+        limit = max(1, limit)
+        where: list[str] = []
+        params: list = []
+        if cursor:
+            value, stream_id = _decode_cursor(cursor)
+            where.append(f"({column} < ? OR ({column} = ? AND stream_id < ?))")
+            params += [value, value, stream_id]
+        if since is not None:
+            where.append("ended_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ended_at < ?")
+            params.append(until)
+        if min_revenue is not None:
+            where.append("revenue_per_hour >= ?")
+            params.append(min_revenue)
+        if min_engagement is not None:
+            where.append("engagement_score >= ?")
+            params.append(min_engagement)
+        if activity:
+            where.append("EXISTS (SELECT 1 FROM json_each(top_activities) WHERE value = ?)")
+            params.append(activity)
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM streams"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {column} DESC, stream_id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        page = [self._row_to_dict(r) for r in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = _encode_cursor(last[column], last["stream_id"])
+        return {"streams": page, "next_cursor": next_cursor}
+
+    def mirror_to_neo4j(self, db, batch_size: int = 100) -> int:
+        """Push not-yet-mirrored rows to Neo4j `Stream` nodes, one UNWIND per batch."""
+        mirrored = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM streams WHERE mirrored = 0 LIMIT ?",
+                    (batch_size,),
+                ).fetchall()
+            if not rows:
+                return mirrored
+            batch = [self._row_to_dict(r) for r in rows]
+            db.upsert_stream_summaries(batch)
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "UPDATE streams SET mirrored = 1 WHERE stream_id = ?",
+                    [(row["stream_id"],) for row in batch],
+                )
+            mirrored += len(batch)
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> dict:
+        data = dict(row)
+        data["top_activities"] = json.loads(data["top_activities"])
+        return data
@@ -12,8 +12,12 @@ class EventType(str, Enum):
     VIEWER_COUNT = "viewer_count"
     SPEAK = "speak"
     SET_EXPRESSION = "set_expression"
+    SET_MOTION = "set_motion"
     CLIP_MOMENT = "clip_moment"
+    CLIP_JOB = "clip_job"
     STREAM_STATE = "stream_state"
+    ENCODER_HEALTH = "encoder_health"
+    GOAL_PROGRESS = "goal_progress"
 
 
 @dataclass
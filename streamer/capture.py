@@ -1,30 +1,238 @@
 import asyncio
-from typing import Optional
-from playwright.async_api import async_playwright, Browser, Page
+import base64
+import time
+from collections import Counter
+from contextlib import suppress
+from typing import Callable, Optional
+from loguru import logger
+from playwright.async_api import async_playwright, Browser, Error as PlaywrightError, Page
 
+# Shown while the browser starts and the avatar loads, so the stream can go live at once.
+SLATE_STYLE = (
+    "position:fixed;inset:0;z-index:2147483647;display:flex;align-items:center;"
+    "justify-content:center;background:#101018;color:#e8e8f0;font:600 48px sans-serif"
+)
+SLATE_HTML = f"<html><body style='margin:0'><div style='{SLATE_STYLE}'>Starting soon…</div></body></html>"
+# Runs at document start of every navigation: the avatar page loads underneath the slate.
+SLATE_SCRIPT = f"""(() => {{
+  const add = () => {{
+    if (document.getElementById("__slate")) return;
+    const slate = document.createElement("div");
+    slate.id = "__slate";
+    slate.style.cssText = "{SLATE_STYLE}";
+    slate.textContent = "Starting soon…";
+    document.documentElement.appendChild(slate);
+  }};
+  add();
+  document.addEventListener("DOMContentLoaded", add);
+}})()"""
+# The avatar has rendered once its canvas has a size; evaluated in the page.
+READY_PROBE = "() => { const c = document.querySelector('canvas'); return !!c && c.width > 0 && c.height > 0; }"
 
-class HeadlessCapture:
-    def __init__(self, frontend_url: str) -> None:
+
+class _BrowserCapture:
+    """Shared browser lifecycle: open on a slate, then load the avatar and probe until it is ready."""
+
+    headless = True
+    launch_args = ["--autoplay-policy=no-user-gesture-required", "--disable-web-security"]
+
+    def __init__(self, frontend_url: str, width: int = 1280, height: int = 720, ready_probe: str = READY_PROBE) -> None:
         self._url = frontend_url
+        self.width = width
+        self.height = height
+        self.ready_probe = ready_probe
+        self.ready = False
+        self._pw = None
         self._browser: Optional[Browser] = None
         self._page: Optional[Page] = None
+        self._navigated = False
 
-    async def start(self) -> None:
-        pw = await async_playwright().start()
-        self._browser = await pw.chromium.launch(
-            headless=False,
-            args=[
-                "--display=:99",
-                "--autoplay-policy=no-user-gesture-required",
-                "--disable-web-security",
-            ],
-        )
-        self._page = await self._browser.new_page(
-            viewport={"width": 1280, "height": 720}
-        )
-        await self._page.goto(self._url)
-        await self._page.wait_for_load_state("networkidle")
+    async def open(self) -> None:
+        """Launch the browser showing the holding slate; returns without touching the network."""
+        self._pw = await async_playwright().start()
+        self._browser = await self._pw.chromium.launch(headless=self.headless, args=self.launch_args)
+        self._page = await self._browser.new_page(viewport={"width": self.width, "height": self.height})
+        await self._page.set_content(SLATE_HTML)
+        await self._page.add_init_script(SLATE_SCRIPT)
+
+    async def wait_ready(self, timeout: float = 30.0, retry: float = 1.0) -> bool:
+        """Load the avatar under the slate and lift the slate once `ready_probe` passes.
+
+        The page is navigated once. Navigation is retried every `retry` seconds only while
+        it fails (the avatar server is still coming up, or the load ended on an error page). Returns False (slate still up) if
+        the page is not ready within `timeout`. Calling again keeps polling the page that
+        is already loading rather than reloading it.
+        """
+        deadline = time.monotonic() + timeout
+        while not self._navigated:
+            try:
+                await self._page.goto(self._url, wait_until="commit", timeout=timeout * 1000)
+                self._navigated = True
+            except PlaywrightError as e:
+                if time.monotonic() + retry >= deadline:
+                    logger.warning(f"[capture] {self._url} unreachable ({e.message.splitlines()[0]})")
+                    return False
+                await asyncio.sleep(retry)
+        try:
+            remaining = max(deadline - time.monotonic(), 0.1)
+            await self._page.wait_for_function(self.ready_probe, polling=100, timeout=remaining * 1000)
+        except PlaywrightError:
+            if self._page.url.startswith("chrome-error://"):
+                self._navigated = False  # the load itself failed after commit; navigate again
+            logger.warning(f"[capture] avatar not ready after {timeout:.0f}s")
+            return False
+        await self._page.evaluate("document.getElementById('__slate')?.remove()")
+        self.ready = True
+        return True
 
     async def stop(self) -> None:
         if self._browser:
-            await self._browser.close()
+            with suppress(PlaywrightError):
+                await self._browser.close()
+            self._browser = None
+        if self._pw:
+            await self._pw.stop()
+            self._pw = None
+
+
+class HeadlessCapture(_BrowserCapture):
+    """Headful Chromium on the Xvfb display `:99`, captured by FFmpeg's x11grab."""
+
+    headless = False
+    launch_args = ["--display=:99", *_BrowserCapture.launch_args]
+
+    async def start(self) -> None:
+        await self.open()
+        await self.wait_ready()
+
+
+class FramePacer:
+    """Turns Chrome's change-driven screencast into a constant-rate frame stream.
+
+    `offer()` parks the newest frame together with its ack callback. Every 1/`fps` the
+    pacer takes the parked frame (acking it, so Chrome may render the next one) and
+    writes the latest frame to `sink`, repeating the previous one when nothing changed.
+    Chrome therefore never has more than one unacknowledged frame. A slow `sink` (FFmpeg's
+    stdin is full) makes the pacer skip ticks instead of queueing frames, and the skipped
+    acks throttle Chrome in turn.
+    """
+
+    def __init__(self, sink: Callable[[bytes], bool], fps: int = 30) -> None:
+        self._sink = sink
+        self.fps = fps
+        self._parked: tuple[bytes | str, Callable[[], None]] | None = None
+        self._latest: bytes | None = None
+        self.stats: Counter[str] = Counter()
+
+    def offer(self, frame: bytes | str, ack: Callable[[], None]) -> None:
+        """Accept a frame (raw or base64 JPEG); a frame not yet taken is replaced and acked."""
+        if self._parked:
+            self._parked[1]()
+            self.stats["replaced"] += 1
+        self._parked = (frame, ack)
+        self.stats["received"] += 1
+
+    def _take(self) -> None:
+        if not self._parked:
+            return
+        frame, ack = self._parked
+        self._parked = None
+        self._latest = base64.b64decode(frame) if isinstance(frame, str) else frame
+        ack()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.fps
+        next_tick = loop.time()
+        while True:
+            self._take()
+            if self._latest is not None:
+                ok = await asyncio.to_thread(self._sink, self._latest)
+                self.stats["written" if ok else "sink_errors"] += 1
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Behind schedule (slow sink): skip the missed ticks rather than bursting.
+                missed = int(-delay / interval) + 1
+                self.stats["skipped"] += missed
+                next_tick += missed * interval
+                delay = next_tick - loop.time()
+            await asyncio.sleep(max(delay, 0.0))
+
+
+class ScreencastCapture(_BrowserCapture):
+    """Headless Chromium streamed over CDP `Page.startScreencast` — no Xvfb or x11grab.
+
+    Frames arrive as JPEGs and go through `FramePacer` straight into FFmpeg's stdin
+    (`FFmpegPipe(source="image2pipe")`), so Python never touches pixels. The screencast
+    starts in `open()`, so the holding slate is streamed while the avatar loads.
+    """
+
+    def __init__(
+        self,
+        frontend_url: str,
+        width: int = 1280,
+        height: int = 720,
+        fps: int = 30,
+        quality: int = 80,
+        sink: Optional[Callable[[bytes], bool]] = None,
+        ready_probe: str = READY_PROBE,
+    ) -> None:
+        super().__init__(frontend_url, width, height, ready_probe)
+        self.fps = fps
+        self.quality = quality
+        self._sink = sink
+        self._cdp = None
+        self._pacer: Optional[FramePacer] = None
+        self._acks: set[asyncio.Task] = set()
+
+    @property
+    def pacer(self) -> Optional[FramePacer]:
+        return self._pacer
+
+    async def open(self) -> None:
+        if self._sink is None:
+            raise ValueError("ScreencastCapture needs a frame sink")
+        await super().open()
+        self._pacer = FramePacer(self._sink, fps=self.fps)
+        self._cdp = await self._page.context.new_cdp_session(self._page)
+        self._cdp.on("Page.screencastFrame", self._on_frame)
+        await self._cdp.send("Page.startScreencast", {
+            "format": "jpeg",
+            "quality": self.quality,
+            "maxWidth": self.width,
+            "maxHeight": self.height,
+        })
+
+    async def start(self, sink: Optional[Callable[[bytes], bool]] = None) -> None:
+        self._sink = sink or self._sink
+        await self.open()
+        await self.wait_ready()
+
+    def _on_frame(self, params: dict) -> None:
+        cdp, session_id = self._cdp, params["sessionId"]
+
+        def ack() -> None:
+            task = asyncio.ensure_future(cdp.send("Page.screencastFrameAck", {"sessionId": session_id}))
+            self._acks.add(task)
+            task.add_done_callback(self._ack_done)
+
+        self._pacer.offer(params["data"], ack)
+
+    def _ack_done(self, task: asyncio.Task) -> None:
+        self._acks.discard(task)
+        if not task.cancelled() and task.exception():
+            # The session is gone (browser closing); the next frame will not come anyway.
+            logger.debug(f"[capture] screencast ack failed ({type(task.exception()).__name__})")
+
+    async def run(self) -> None:
+        await self._pacer.run()
+
+    async def stop(self) -> None:
+        for task in list(self._acks):
+            task.cancel()
+        if self._cdp:
+            with suppress(Exception):
+                await self._cdp.send("Page.stopScreencast")
+            self._cdp = None
+        await super().stop()
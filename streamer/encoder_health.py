@@ -0,0 +1,274 @@
+"""Live encoder health — FFmpeg `-progress` parsing, a restart watchdog and reporting to analytics."""
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from typing import IO, Callable
+
+import httpx
+from loguru import logger
+
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+from streamer.ffmpeg_pipe import FFmpegPipe
+
+
+@dataclass
+class EncoderStats:
+    frame: int = 0
+    fps: float = 0.0
+    bitrate_kbps: float = 0.0
+    total_size: int = 0
+    out_time: float = 0.0
+    speed: float = 0.0
+    drop_frames: int = 0
+    dup_frames: int = 0
+    at: float = field(default_factory=time.time)
+
+
+def _number(value: str, cast: Callable[[str], float | int]) -> float | int:
+    try:
+        return cast(value.strip().rstrip("x").replace("kbits/s", ""))
+    except ValueError:
+        return cast("0")  # "N/A" before the first packet is muxed
+
+
+class ProgressParser:
+    """Incremental parser for FFmpeg `-progress` key=value blocks.
+
+    Each block ends with `progress=continue` (or `end`); `feed` returns the finished
+    block as `EncoderStats`, otherwise None.
+    """
+
+    def __init__(self) -> None:
+        self._block: dict[str, str] = {}
+
+    def feed(self, line: str) -> EncoderStats | None:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+        if key != "progress":
+            self._block[key] = value
+            return None
+        block, self._block = self._block, {}
+        return EncoderStats(
+            frame=_number(block.get("frame", "0"), int),
+            fps=_number(block.get("fps", "0"), float),
+            bitrate_kbps=_number(block.get("bitrate", "0"), float),
+            total_size=_number(block.get("total_size", "0"), int),
+            out_time=_number(block.get("out_time_us", "0"), int) / 1e6,
+            speed=_number(block.get("speed", "0"), float),
+            drop_frames=_number(block.get("drop_frames", "0"), int),
+            dup_frames=_number(block.get("dup_frames", "0"), int),
+        )
+
+
+def _pump(stream: IO[bytes], on_line: Callable[[str], None]) -> None:
+    for line in stream:
+        on_line(line.decode(errors="replace"))
+
+
+class RateWindow:
+    """Encode speed and frame-drop rate over the last `seconds` of progress blocks.
+
+    FFmpeg's own `speed` is cumulative since start, and a live source can only be read
+    in real time, so on a healthy stream it hovers just below 1.0x forever. Here speed
+    is Δout_time / Δwall between the oldest and newest block in the window, which
+    follows what the encoder is doing now. Both rates are None until the window spans
+    at least half of `seconds`.
+    """
+
+    def __init__(self, seconds: float = 5.0) -> None:
+        self.seconds = seconds
+        self._samples: deque[tuple[float, float, int]] = deque()
+
+    def add(self, now: float, stats: EncoderStats) -> None:
+        self._samples.append((now, stats.out_time, stats.drop_frames))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.seconds:
+            self._samples.popleft()
+
+    def _span(self) -> tuple[float, float, int] | None:
+        (t0, out0, drop0), (t1, out1, drop1) = self._samples[0], self._samples[-1]
+        wall = t1 - t0
+        return (wall, out1 - out0, drop1 - drop0) if wall >= self.seconds / 2 else None
+
+    @property
+    def speed(self) -> float | None:
+        span = self._span() if len(self._samples) > 1 else None
+        return span[1] / span[0] if span else None
+
+    @property
+    def drop_rate(self) -> float | None:
+        span = self._span() if len(self._samples) > 1 else None
+        return max(span[2], 0) / span[0] if span else None
+
+
+class EncoderSupervisor:
+    """Keeps the live FFmpeg running and reports how well it is keeping up.
+
+    Two daemon threads drain FFmpeg's stdout (`-progress` blocks) and stderr, so a full
+    pipe can never stall the encoder. Each progress block is published on the bus as an
+    `ENCODER_HEALTH` event, with `window_speed` and `drop_rate` (frames/s) measured over
+    the last `window` seconds by `RateWindow`. The watchdog restarts FFmpeg when it
+    exits, or when the windowed speed stays below `min_speed` or the drop rate above
+    `max_drop_rate` for `slow_for` seconds. A live source sits at 0.97-1.0x and must not
+    trip it. An FFmpeg that is still running but has printed no progress for
+    `stall_timeout` seconds (a hung input or output) is restarted as stalled. Restarts back off exponentially from `min_backoff` to `max_backoff`; a run
+    that stays up for `stable_after` seconds resets the backoff. `restart()` stops FFmpeg
+    on purpose (e.g. to pick up a new profile) and brings it back without backoff.
+    """
+
+    def __init__(
+        self,
+        pipe: FFmpegPipe,
+        bus: EventBus,
+        min_speed: float = 0.9,
+        max_drop_rate: float = 3.0,
+        slow_for: float = 15.0,
+        window: float = 5.0,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        stable_after: float = 60.0,
+        stall_timeout: float = 10.0,
+    ) -> None:
+        self._pipe = pipe
+        self._bus = bus
+        self.min_speed = min_speed
+        self.max_drop_rate = max_drop_rate
+        self.slow_for = slow_for
+        self.window = window
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.stall_timeout = stall_timeout
+        self.latest: EncoderStats | None = None
+        self.stderr_tail: deque[str] = deque(maxlen=50)
+        self.stats: Counter[str] = Counter()
+        self._backoff = min_backoff
+        self._requested: str | None = None
+
+    async def _publish(self, status: str, stats: EncoderStats | None = None, **extra) -> None:
+        payload = {
+            **asdict(stats or EncoderStats()),
+            "status": status,
+            "restarts": self.stats["restarts"],
+            "profile": self._pipe.profile.name,
+            **extra,
+        }
+        await self._bus.publish(Event(type=EventType.ENCODER_HEALTH, payload=payload, priority=3, source="streamer"))
+
+    def restart(self, reason: str) -> None:
+        """Stop the running FFmpeg so the watchdog starts a fresh one right away."""
+        process = self._pipe.process
+        if process is None or process.poll() is not None:
+            return
+        self._requested = reason
+        process.terminate()
+
+    async def _supervise_once(self) -> str:
+        """Run FFmpeg until it exits, stalls or falls behind; return why it stopped."""
+        loop = asyncio.get_running_loop()
+        updates: asyncio.Queue[EncoderStats | None] = asyncio.Queue()
+        parser = ProgressParser()
+
+        def on_progress(line: str) -> None:
+            stats = parser.feed(line)
+            if stats is not None:
+                loop.call_soon_threadsafe(updates.put_nowait, stats)
+
+        self._requested = None
+        self._pipe.start()
+        process = self._pipe.process
+        threading.Thread(target=_pump, args=(process.stderr, self.stderr_tail.append), daemon=True).start()
+
+        def read_progress() -> None:
+            _pump(process.stdout, on_progress)
+            loop.call_soon_threadsafe(updates.put_nowait, None)  # stdout closed: FFmpeg is gone
+
+        threading.Thread(target=read_progress, daemon=True).start()
+        rates = RateWindow(self.window)
+        slow_since: float | None = None
+        while True:
+            try:
+                stats = await asyncio.wait_for(updates.get(), self.stall_timeout)
+            except TimeoutError:
+                return self._requested or f"stalled: no progress for {self.stall_timeout:g}s"
+            if stats is None:
+                code = await asyncio.to_thread(process.wait)
+                return self._requested or f"exited with code {code}"
+            self.latest = stats
+            now = time.monotonic()
+            rates.add(now, stats)
+            speed, drops = rates.speed, rates.drop_rate
+            behind = speed is not None and (speed < self.min_speed or drops > self.max_drop_rate)
+            slow_since = (slow_since or now) if behind else None
+            slow = slow_since is not None and now - slow_since >= self.slow_for
+            await self._publish(
+                "slow" if slow_since else "ok", stats,
+                window_speed=None if speed is None else round(speed, 3),
+                drop_rate=None if drops is None else round(drops, 2),
+            )
+            if slow:
+                return (
+                    f"speed {speed:.2f}x with {drops:.1f} dropped frames/s for {self.slow_for:.0f}s "
+                    f"(limits {self.min_speed:.2f}x, {self.max_drop_rate:g}/s)"
+                )
+
+    async def run(self) -> None:
+        """Supervise until cancelled; FFmpeg is stopped on the way out."""
+        try:
+            while True:
+                started = time.monotonic()
+                reason = await self._supervise_once()
+                self._pipe.stop()
+                if self._requested:
+                    self.stats["requested"] += 1
+                    logger.info(f"[encoder] restarting ffmpeg ({reason})")
+                    await self._publish("restarting", self.latest, reason=reason)
+                    continue
+                if time.monotonic() - started >= self.stable_after:
+                    self._backoff = self.min_backoff
+                self.stats["restarts"] += 1
+                kind = "slow" if reason.startswith("speed") else "stalled" if reason.startswith("stalled") else "exits"
+                self.stats[kind] += 1
+                tail = " | ".join(list(self.stderr_tail)[-3:]).strip()
+                logger.warning(f"[encoder] ffmpeg {reason}; restarting in {self._backoff:.0f}s {tail}")
+                await self._publish("restarting", self.latest, reason=reason)
+                await asyncio.sleep(self._backoff)
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+        finally:
+            self._pipe.stop()
+
+
+class AnalyticsReporter:
+    """Forwards `ENCODER_HEALTH` events to the analytics API, at most every `interval` seconds."""
+
+    def __init__(self, bus: EventBus, analytics_url: str, interval: float = 2.0) -> None:
+        self._url = analytics_url.rstrip("/") + "/api/stream/encoder"
+        self.interval = interval
+        self._client = httpx.AsyncClient(timeout=2.0)
+        self._last = float("-inf")
+        self._pending: set[asyncio.Task] = set()
+        bus.subscribe(EventType.ENCODER_HEALTH, self._on_health)
+
+    async def _on_health(self, event: Event) -> None:
+        now = time.monotonic()
+        if now - self._last < self.interval and event.payload["status"] == "ok":
+            return
+        self._last = now
+        # Never hold up the supervisor on a slow analytics endpoint.
+        task = asyncio.create_task(self._post(event.payload))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _post(self, payload: dict) -> None:
+        try:
+            await self._client.post(self._url, json=payload)
+        except httpx.HTTPError as e:
+            logger.debug(f"[encoder] analytics unreachable ({type(e).__name__}: {e})")
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        await self._client.aclose()
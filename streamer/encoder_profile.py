@@ -0,0 +1,230 @@
+"""Encoder profile ladder, startup calibration against a synthetic source, and runtime step-down."""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable
+
+from loguru import logger
+
+from core.checkpoint import atomic_write, load_newest
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+from streamer.encoder_health import ProgressParser
+from streamer.ffmpeg_pipe import DEFAULT_PROFILE, EncoderProfile, FFmpegPipe
+
+# Best first. Each rung is cheaper to encode than the one above it.
+PROFILE_LADDER: tuple[EncoderProfile, ...] = (
+    EncoderProfile("720p30-medium", "medium", 1280, 720, 30, 3000),
+    EncoderProfile("720p30-fast", "fast", 1280, 720, 30, 3000),
+    EncoderProfile("720p30-faster", "faster", 1280, 720, 30, 2800),
+    DEFAULT_PROFILE,
+    EncoderProfile("720p30-superfast", "superfast", 1280, 720, 30, 2500),
+    EncoderProfile("540p30-veryfast", "veryfast", 960, 540, 30, 1800),
+    EncoderProfile("540p30-ultrafast", "ultrafast", 960, 540, 30, 1800),
+    EncoderProfile("480p24-ultrafast", "ultrafast", 854, 480, 24, 1200),
+)
+
+
+def profile_by_name(name: str, ladder: tuple[EncoderProfile, ...] = PROFILE_LADDER) -> EncoderProfile:
+    for profile in ladder:
+        if profile.name == name:
+            return profile
+    raise ValueError(f"unknown encoder profile {name!r}; expected one of {[p.name for p in ladder]}")
+
+
+def calibration_command(profile: EncoderProfile, source_size: tuple[int, int], seconds: float) -> list[str]:
+    """Encode `seconds` of a moving lavfi test pattern with `profile` to the null muxer, as fast as possible."""
+    width, height = source_size
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats", "-progress", "pipe:1",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={profile.fps}",
+        "-t", f"{seconds:g}",
+        *profile.video_args(width, height),
+        "-f", "null", "-",
+    ]
+
+
+class EncoderProfileManager:
+    """Chooses the best `EncoderProfile` the machine can encode in real time, and backs off.
+
+    `calibrate()` binary-searches the ladder (best first, cheaper further down): each probe
+    encodes `calibrate_seconds` of a synthetic source at full speed, and a profile passes
+    when it reaches `headroom` times real time. The live encoder shares the box with
+    Chromium and the capture, so it needs that margin. The result is saved to
+    `state_path` together with the CPU count and is reused for `max_age` seconds, so a
+    restart skips calibration.
+
+    At runtime the manager listens for `ENCODER_HEALTH`. A single restart for running
+    behind can be a passing spike, so the manager only moves one rung down when
+    `EncoderSupervisor` restarts FFmpeg for speed `step_down_after` times within
+    `overload_window` seconds. It does so before the restart, so the new FFmpeg already
+    uses the cheaper profile. After `step_up_after` seconds without a slow report it
+    moves back up one rung, never above the calibrated profile, and asks for a restart
+    through `restart` (usually `EncoderSupervisor.restart`) so the change takes effect.
+    Runtime steps are not saved: the cache only holds what calibration measured.
+    """
+
+    def __init__(
+        self,
+        pipe: FFmpegPipe,
+        bus: EventBus | None = None,
+        ladder: tuple[EncoderProfile, ...] = PROFILE_LADDER,
+        headroom: float = 1.5,
+        calibrate_seconds: float = 3.0,
+        state_path: str | None = None,
+        max_age: float = 7 * 86400,
+        step_down_after: int = 2,
+        overload_window: float = 600.0,
+        step_up_after: float = 1800.0,
+        restart: Callable[[str], None] | None = None,
+    ) -> None:
+        self._pipe = pipe
+        width, height = pipe.capture_size
+        # Never upscale: rungs larger than the capture are skipped.
+        self.ladder = tuple(p for p in ladder if p.width <= width and p.height <= height) or ladder[-1:]
+        self.headroom = headroom
+        self.calibrate_seconds = calibrate_seconds
+        self._state_path = Path(state_path) if state_path else None
+        self.max_age = max_age
+        self.step_down_after = step_down_after
+        self.overload_window = overload_window
+        self.step_up_after = step_up_after
+        self._restart = restart
+        self._calibrated = pipe.profile
+        self._overloads: deque[float] = deque()
+        self._stable_since = time.monotonic()
+        self.measured: dict[str, float] = {}
+        self.stats: Counter[str] = Counter()
+        if bus is not None:
+            bus.subscribe(EventType.ENCODER_HEALTH, self._on_health)
+
+    @property
+    def profile(self) -> EncoderProfile:
+        return self._pipe.profile
+
+    @property
+    def cached(self) -> EncoderProfile | None:
+        """The saved calibration result, if it is still valid for this machine."""
+        return self._load()
+
+    async def measure(self, profile: EncoderProfile) -> float:
+        """Encode speed of `profile` as a multiple of real time. Raises RuntimeError if FFmpeg fails."""
+        started = time.monotonic()
+        proc = await asyncio.create_subprocess_exec(
+            *calibration_command(profile, self._pipe.capture_size, self.calibrate_seconds),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited {proc.returncode}: {stderr.decode(errors='replace').strip()[-300:]}")
+        parser = ProgressParser()
+        speed = 0.0
+        for line in stdout.decode(errors="replace").splitlines():
+            stats = parser.feed(line)
+            if stats is not None and stats.speed:
+                speed = stats.speed
+        # Fall back to wall time (which includes FFmpeg start-up) if no speed was reported.
+        return speed or self.calibrate_seconds / (time.monotonic() - started)
+
+    async def calibrate(self, force: bool = False) -> EncoderProfile:
+        """Pick and apply the best profile that keeps `headroom`; falls back to the current one if FFmpeg is unavailable."""
+        cached = None if force else self.cached
+        if cached is not None:
+            self._calibrated = cached
+            self._apply(cached, "cached calibration")
+            return cached
+        lo, hi = 0, len(self.ladder) - 1
+        best = self.ladder[-1]
+        started = time.monotonic()
+        try:
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                candidate = self.ladder[mid]
+                speed = self.measured[candidate.name] = await self.measure(candidate)
+                self.stats["probes"] += 1
+                logger.debug(f"[encoder] calibration {candidate.name}: {speed:.2f}x")
+                if speed >= self.headroom:
+                    best, hi = candidate, mid - 1
+                else:
+                    lo = mid + 1
+        except (OSError, RuntimeError) as e:  # OSError: ffmpeg not installed
+            logger.warning(f"[encoder] calibration failed ({type(e).__name__}: {e}); keeping {self.profile.name}")
+            return self.profile
+        self.stats["calibrations"] += 1
+        self._calibrated = best
+        self._apply(best, f"calibrated in {time.monotonic() - started:.1f}s")
+        self._save()
+        return best
+
+    def _rung(self, profile: EncoderProfile) -> int:
+        names = [p.name for p in self.ladder]
+        return names.index(profile.name) if profile.name in names else -1
+
+    def step_down(self, reason: str) -> bool:
+        """Move one rung down the ladder; False when already at the bottom."""
+        index = self._rung(self.profile)
+        if index + 1 >= len(self.ladder):
+            logger.warning(f"[encoder] {reason}, but {self.profile.name} is already the cheapest profile")
+            return False
+        self.stats["step_downs"] += 1
+        self._apply(self.ladder[index + 1], reason)
+        return True
+
+    def step_up(self, reason: str) -> bool:
+        """Move one rung back up toward the calibrated profile; False when already there."""
+        index = self._rung(self.profile)
+        if index <= max(self._rung(self._calibrated), 0):
+            return False
+        self.stats["step_ups"] += 1
+        self._apply(self.ladder[index - 1], reason)
+        if self._restart:
+            self._restart(f"profile stepped up to {self.profile.name}")
+        return True
+
+    def _apply(self, profile: EncoderProfile, reason: str) -> None:
+        if profile != self._pipe.profile:
+            logger.info(f"[encoder] profile {self._pipe.profile.name} -> {profile.name} ({reason})")
+        self._pipe.profile = profile
+
+    async def _on_health(self, event: Event) -> None:
+        payload, now = event.payload, time.monotonic()
+        status = payload.get("status")
+        if status == "restarting" and str(payload.get("reason", "")).startswith("speed"):
+            self._stable_since = now
+            self._overloads.append(now)
+            while self._overloads and now - self._overloads[0] > self.overload_window:
+                self._overloads.popleft()
+            if len(self._overloads) >= self.step_down_after:
+                self._overloads.clear()
+                self.step_down(payload["reason"])
+        elif status == "slow":
+            self._stable_since = now
+        elif status == "ok" and now - self._stable_since >= self.step_up_after:
+            self._stable_since = now
+            self.step_up(f"no slow reports for {self.step_up_after:.0f}s")
+
+    def _load(self) -> EncoderProfile | None:
+        if not self._state_path:
+            return None
+        saved = load_newest(self._state_path, lambda p: json.loads(p.read_text()))
+        if not saved or saved.get("cpus") != os.cpu_count() or time.time() - saved.get("at", 0) > self.max_age:
+            return None
+        try:
+            return profile_by_name(saved["profile"], self.ladder)
+        except ValueError:
+            return None
+
+    def _save(self) -> None:
+        if not self._state_path:
+            return
+        state = {"profile": self.profile.name, "cpus": os.cpu_count(), "at": time.time(), "measured": self.measured}
+        try:
+            atomic_write(self._state_path, json.dumps(state).encode())
+        except OSError as e:
+            logger.error(f"[encoder] saving profile failed ({type(e).__name__}: {e})")
@@ -1,44 +1,232 @@
 import subprocess
+from dataclasses import dataclass, field, replace
+from pathlib import Path
 from typing import Optional
 
+from streamer.segment_ring import SegmentRing
+
+# Network slaves sit behind the fifo muxer: a slow or dead endpoint drops its own
+# packets and reconnects in its own thread instead of stalling the other outputs.
+NETWORK_FIFO_OPTIONS = {
+    "drop_pkts_on_overflow": "1",
+    "attempt_recovery": "1",
+    "recover_any_error": "1",
+    "recovery_wait_time": "2",
+    "restart_with_keyframe": "1",
+}
+
+
+def _escape(value: str, special: str) -> str:
+    for ch in "\\" + special:
+        value = value.replace(ch, "\\" + ch)
+    return value
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """x264 settings for the live encode; frames are scaled down when smaller than the capture."""
+
+    name: str
+    preset: str
+    width: int
+    height: int
+    fps: int
+    bitrate_kbps: int
+
+    def video_args(self, source_width: int, source_height: int) -> list[str]:
+        scale = [] if (self.width, self.height) == (source_width, source_height) else ["-vf", f"scale={self.width}:{self.height}"]
+        return [
+            *scale,
+            "-vcodec", "libx264",
+            "-preset", self.preset,
+            "-b:v", f"{self.bitrate_kbps}k",
+            "-maxrate", f"{self.bitrate_kbps}k",
+            "-bufsize", f"{2 * self.bitrate_kbps}k",
+        ]
+
+
+DEFAULT_PROFILE = EncoderProfile("720p30-veryfast", "veryfast", 1280, 720, 30, 2500)
+
+
+@dataclass
+class TeeOutput:
+    """One destination of the tee muxer, with its own muxer options and failure policy."""
+
+    target: str
+    format: str
+    options: dict[str, str] = field(default_factory=dict)
+    fifo: bool = False
+    directory: Optional[Path] = None  # created before FFmpeg starts
+
+    @classmethod
+    def rtmp(cls, url: str) -> "TeeOutput":
+        return cls(url, "flv", fifo=True)
+
+    @classmethod
+    def recording(cls, directory: str, segment_seconds: int = 600) -> "TeeOutput":
+        """Local recording, split into timestamped Matroska files that survive a crash."""
+        path = Path(directory)
+        return cls(
+            str(path / "rec-%Y%m%d-%H%M%S.mkv"),
+            "segment",
+            {
+                "segment_time": str(segment_seconds),
+                "segment_format": "matroska",
+                "strftime": "1",
+                "reset_timestamps": "1",
+            },
+            directory=path,
+        )
+
+    @classmethod
+    def ring(cls, ring: SegmentRing) -> "TeeOutput":
+        options = ring.muxer_options()
+        return cls(ring.output_pattern, options.pop("f"), options, directory=ring.directory)
+
+    def spec(self) -> str:
+        """`[f=...:onfail=ignore:...]target` — a failing slave is dropped, the rest keep going."""
+        options = {"f": self.format, "onfail": "ignore", **self.options}
+        if self.fifo:
+            options["use_fifo"] = "1"
+            options["fifo_options"] = ":".join(f"{k}={v}" for k, v in NETWORK_FIFO_OPTIONS.items())
+        joined = ":".join(f"{key}={_escape(value, ':|[]')}" for key, value in options.items())
+        return f"[{joined}]{_escape(self.target, '|')}"
+
 
 class FFmpegPipe:
-    def __init__(self, rtmp_url: str, width: int = 1280, height: int = 720, fps: int = 30) -> None:
+    """Encodes the capture display once and sends it to every output.
+
+    With a single RTMP output the stream goes straight to the flv muxer. With more
+    (simulcast `outputs`, a local recording, the clip `segments` ring) the encoded
+    packets fan out through FFmpeg's tee muxer, so N destinations cost one x264 encode.
+    Each slave has `onfail=ignore`, and network slaves sit behind the fifo muxer with
+    automatic recovery. A dead RTMP target therefore never stops the recording, and
+    vice versa. With a ring, keyframes are forced on segment boundaries so clips can be
+    cut by stream copy.
+
+    `source="x11grab"` captures the Xvfb display `:99`. `source="image2pipe"` instead
+    reads JPEG frames written to stdin with `write_frame` (see `ScreencastCapture`),
+    timestamped on arrival and resampled to a constant `fps`.
+
+    `profile` sets preset, output size, fps and bitrate (by default `DEFAULT_PROFILE` at
+    `fps`). Assigning a new one takes effect on the next `start()`.
+    """
+
+    def __init__(
+        self,
+        rtmp_url: str,
+        width: int = 1280,
+        height: int = 720,
+        fps: int = 30,
+        segments: Optional[SegmentRing] = None,
+        outputs: Optional[list[TeeOutput]] = None,
+        source: str = "x11grab",
+        profile: Optional[EncoderProfile] = None,
+    ) -> None:
+        if source not in ("x11grab", "image2pipe"):
+            raise ValueError(f"unknown capture source {source!r}")
+        self._source = source
         self._rtmp_url = rtmp_url
         self._width = width
         self._height = height
-        self._fps = fps
+        self.profile = profile or replace(DEFAULT_PROFILE, fps=fps)
+        self._segments = segments
+        self._outputs = [
+            *([TeeOutput.rtmp(rtmp_url)] if rtmp_url else []),
+            *(outputs or []),
+            *([TeeOutput.ring(segments)] if segments else []),
+        ]
         self._process: Optional[subprocess.Popen] = None
 
-    def build_command(self) -> list[str]:
+    @property
+    def segments(self) -> Optional[SegmentRing]:
+        return self._segments
+
+    @property
+    def outputs(self) -> list[TeeOutput]:
+        return list(self._outputs)
+
+    @property
+    def capture_size(self) -> tuple[int, int]:
+        return self._width, self._height
+
+    @property
+    def process(self) -> Optional[subprocess.Popen]:
+        return self._process
+
+    def _video_input_args(self) -> list[str]:
+        if self._source == "image2pipe":
+            return [
+                "-f", "image2pipe",
+                "-use_wallclock_as_timestamps", "1",
+                "-c:v", "mjpeg",
+                "-i", "pipe:0",
+            ]
         return [
-            "ffmpeg", "-y",
             "-f", "x11grab",
-            "-r", str(self._fps),
+            "-r", str(self.profile.fps),
             "-s", f"{self._width}x{self._height}",
             "-i", ":99",
+        ]
+
+    def _output_args(self) -> list[str]:
+        if not self._outputs:
+            raise ValueError("FFmpegPipe needs at least one output")
+        if len(self._outputs) == 1 and self._outputs[0].format == "flv":
+            return ["-f", "flv", self._outputs[0].target]
+        keyframes = []
+        if self._segments:
+            keyframes = ["-force_key_frames", f"expr:gte(t,n_forced*{self._segments.segment_seconds:g})"]
+        return [
+            *keyframes,
+            "-flags", "+global_header",
+            "-map", "0:v", "-map", "1:a",
+            "-f", "tee",
+            "|".join(output.spec() for output in self._outputs),
+        ]
+
+    def build_command(self) -> list[str]:
+        return [
+            "ffmpeg", "-y",
+            "-progress", "pipe:1", "-nostats",
+            *self._video_input_args(),
             "-f", "pulse",
             "-i", "default",
-            "-vcodec", "libx264",
-            "-preset", "veryfast",
-            "-b:v", "2500k",
-            "-maxrate", "2500k",
-            "-bufsize", "5000k",
+            *self.profile.video_args(self._width, self._height),
+            *(["-r", str(self.profile.fps)] if self._source == "image2pipe" else []),
             "-acodec", "aac",
             "-b:a", "128k",
             "-ar", "44100",
-            "-f", "flv",
-            self._rtmp_url,
+            *self._output_args(),
         ]
 
     def start(self) -> None:
+        for output in self._outputs:
+            if output.directory:
+                output.directory.mkdir(parents=True, exist_ok=True)
         self._process = subprocess.Popen(
             self.build_command(),
             stdin=subprocess.PIPE,
-            stdout=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,  # -progress blocks; drained by EncoderSupervisor
             stderr=subprocess.PIPE,
         )
 
+    def write_frame(self, frame: bytes) -> bool:
+        """Blocking write of one encoded frame to FFmpeg's stdin; False if FFmpeg is gone.
+
+        Blocks while FFmpeg's input pipe is full, which is the backpressure signal for
+        the frame pacer.
+        """
+        process = self._process
+        if not process or not process.stdin:
+            return False
+        try:
+            process.stdin.write(frame)
+            process.stdin.flush()
+            return True
+        except (BrokenPipeError, ValueError):  # ValueError: stdin closed by stop()
+            return False
+
     def stop(self) -> None:
         if self._process:
             self._process.terminate()
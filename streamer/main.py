@@ -1,25 +1,57 @@
 import asyncio
+import signal
+from contextlib import suppress
 from core.config import settings
-from streamer.capture import HeadlessCapture
-from streamer.ffmpeg_pipe import FFmpegPipe
+from core.event_bus import EventBus
+from streamer.capture import HeadlessCapture, ScreencastCapture
+from streamer.encoder_health import AnalyticsReporter, EncoderSupervisor
+from streamer.encoder_profile import EncoderProfileManager, profile_by_name
+from streamer.ffmpeg_pipe import FFmpegPipe, TeeOutput
+from streamer.segment_ring import SEGMENT_DIR, SegmentRing
+from streamer.startup import StreamerStartup
+
+ENCODER_PROFILE_PATH = "data/encoder_profile.json"
 
 
 async def main() -> None:
     rtmp_url = f"{settings.twitch_rtmp_url}{settings.twitch_stream_key}"
-    capture = HeadlessCapture(frontend_url=settings.vtuber_frontend_url)
-    pipe = FFmpegPipe(rtmp_url=rtmp_url)
-    print("Starting headless capture...")
-    await capture.start()
-    print("Starting FFmpeg RTMP pipe...")
-    pipe.start()
-    print(f"Streaming live to Twitch: {settings.twitch_channel}")
+    screencast = settings.capture_mode == "screencast"
+    outputs = [TeeOutput.rtmp(url.strip()) for url in settings.simulcast_rtmp_urls.split(",") if url.strip()]
+    if settings.recording_dir:
+        outputs.append(TeeOutput.recording(settings.recording_dir))
+    pipe = FFmpegPipe(
+        rtmp_url=rtmp_url,
+        segments=SegmentRing(SEGMENT_DIR),
+        outputs=outputs,
+        source="image2pipe" if screencast else "x11grab",
+    )
+    bus = EventBus()
+    supervisor = EncoderSupervisor(pipe, bus)
+    reporter = AnalyticsReporter(bus, settings.analytics_url)
+    profiles = None
+    if settings.encoder_profile:
+        pipe.profile = profile_by_name(settings.encoder_profile)
+    else:
+        profiles = EncoderProfileManager(pipe, bus, state_path=ENCODER_PROFILE_PATH, restart=supervisor.restart)
+    if screencast:
+        # Captured at 30 fps; FFmpeg resamples to the profile's rate.
+        capture = ScreencastCapture(frontend_url=settings.vtuber_frontend_url, sink=pipe.write_frame)
+    else:
+        capture = HeadlessCapture(frontend_url=settings.vtuber_frontend_url)
+    startup = StreamerStartup(bus, capture, supervisor, profiles)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, startup.stop)
+
+    print(f"Starting {settings.capture_mode} capture and FFmpeg ({len(pipe.outputs)} outputs, one encode)...")
     try:
-        while True:
-            await asyncio.sleep(10)
-    except KeyboardInterrupt:
-        pipe.stop()
-        await capture.stop()
+        await startup.run()
+    finally:
+        await reporter.close()
+    print(f"Stream to {settings.twitch_channel} ended (startup timings {startup.timings})")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    with suppress(KeyboardInterrupt):
+        asyncio.run(main())
@@ -0,0 +1,139 @@
+"""Rolling on-disk ring of short MPEG-TS segments, and stream-copy clip extraction from it."""
+from __future__ import annotations
+import asyncio
+import csv
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+SEGMENT_DIR = "data/segments"
+SEGMENT_LIST = "segments.csv"
+SEGMENT_PATTERN = "seg%03d.ts"
+
+
+@dataclass(frozen=True)
+class Segment:
+    path: Path
+    start: float  # wall clock, seconds since the epoch
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class SegmentRing:
+    """A bounded ring of `segment_seconds` MPEG-TS files written by the live encoder.
+
+    FFmpeg's segment muxer writes `seg000.ts ... seg{wrap-1}.ts` round-robin and keeps
+    `segments.csv` (`name,start,end` in stream time) listing the finished ones, so disk
+    use is capped at about `buffer_seconds` of stream. Each segment's wall-clock end is its
+    mtime — the moment FFmpeg finished writing it — which needs no clock shared with the
+    encoder process.
+    """
+
+    def __init__(self, directory: str, segment_seconds: float = 2.0, buffer_seconds: float = 120.0) -> None:
+        self.directory = Path(directory)
+        self.segment_seconds = segment_seconds
+        self.buffer_seconds = buffer_seconds
+
+    @property
+    def wrap(self) -> int:
+        return max(math.ceil(self.buffer_seconds / self.segment_seconds), 3)
+
+    def muxer_options(self) -> dict[str, str]:
+        """Options for the segment muxer (as a tee slave or a standalone output)."""
+        return {
+            "f": "segment",
+            "segment_time": f"{self.segment_seconds:g}",
+            "segment_format": "mpegts",
+            "segment_wrap": str(self.wrap),
+            "segment_list": str(self.directory / SEGMENT_LIST),
+            "segment_list_type": "csv",
+            # One short of the ring: the slot being rewritten is never listed.
+            "segment_list_size": str(self.wrap - 1),
+        }
+
+    @property
+    def output_pattern(self) -> str:
+        return str(self.directory / SEGMENT_PATTERN)
+
+    def segments(self) -> list[Segment]:
+        """Finished segments, oldest first."""
+        found = []
+        try:
+            with open(self.directory / SEGMENT_LIST, newline="") as f:
+                rows = list(csv.reader(f))
+        except FileNotFoundError:
+            return []
+        for row in rows:
+            if len(row) < 3:
+                continue
+            path = self.directory / row[0]
+            try:
+                end = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            found.append(Segment(path, end - (float(row[2]) - float(row[1])), end))
+        # A slot can start being rewritten after the list was read; its fresh mtime puts it
+        # out of order, so keep only the run that ends at the newest segment.
+        run: list[Segment] = []
+        for segment in reversed(found):
+            if run and segment.end > run[-1].end:
+                break
+            run.append(segment)
+        return run[::-1]
+
+    def window(self, start: float, end: float) -> list[Segment]:
+        """The contiguous run of segments overlapping [start, end] wall-clock seconds."""
+        return [s for s in self.segments() if s.end > start and s.start < end]
+
+    async def wait_for(self, end: float, timeout: float, poll: float = 0.25) -> bool:
+        """Wait until a finished segment reaches wall-clock `end`; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            segments = self.segments()
+            if segments and segments[-1].end >= end:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(poll)
+
+
+def extract_command(segments: list[Segment], out_path: str | Path) -> list[str]:
+    """Byte-concatenate MPEG-TS segments and remux to MP4 — stream copy, no re-encode."""
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", "concat:" + "|".join(str(s.path) for s in segments),
+        "-map", "0",
+        "-c", "copy",
+        "-bsf:a", "aac_adtstoasc",
+        "-movflags", "+faststart",
+        str(out_path),
+    ]
+
+
+async def extract_clip(segments: list[Segment], out_path: str | Path) -> Path:
+    """Cut `segments` into `out_path`. Raises RuntimeError if FFmpeg fails."""
+    if not segments:
+        raise ValueError("no segments to extract")
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    started = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(
+        *extract_command(segments, out_path),
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited {proc.returncode}: {stderr.decode(errors='replace').strip()[-500:]}")
+    logger.info(
+        f"[clips] {out_path.name}: {len(segments)} segments, "
+        f"{segments[-1].end - segments[0].start:.1f}s in {time.monotonic() - started:.2f}s"
+    )
+    return out_path
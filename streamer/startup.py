@@ -0,0 +1,128 @@
+"""Streamer startup: browser and encoder come up in parallel, the stream goes live on a slate."""
+from __future__ import annotations
+import asyncio
+import shutil
+import time
+from typing import Optional, Protocol
+
+from loguru import logger
+
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+from streamer.encoder_health import EncoderSupervisor
+from streamer.encoder_profile import EncoderProfileManager
+
+
+class Capture(Protocol):
+    async def open(self) -> None: ...
+    async def wait_ready(self, timeout: float = 30.0, retry: float = 1.0) -> bool: ...
+    async def stop(self) -> None: ...
+
+
+class StreamerStartup:
+    """Brings the streamer live as fast as possible and takes it down cleanly.
+
+    The browser is launched on the holding slate while the encoder is prepared (FFmpeg
+    located, the encoder profile loaded from cache). Only when there is no cached profile
+    does calibration run first, on its own: probes measured next to a launching Chromium
+    would settle on a profile that is too cheap. `EncoderSupervisor` starts as soon as
+    the profile is known, so the stream is live with the slate while the avatar loads
+    underneath it. The slate is lifted when the capture's readiness probe passes. Until
+    then the probe keeps polling, with a warning every `ready_timeout` seconds.
+
+    `run()` returns after `stop()` (wired to SIGINT/SIGTERM in `main`) or raises if the
+    encoder or capture fails. Either way, the encoder and browser are shut down before it
+    returns. `timings` records seconds from start to `browser`, `encoder` (first progress
+    report) and `avatar`.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        capture: Capture,
+        supervisor: EncoderSupervisor,
+        profiles: Optional[EncoderProfileManager] = None,
+        ready_timeout: float = 30.0,
+        stop_timeout: float = 10.0,
+    ) -> None:
+        self._capture = capture
+        self._supervisor = supervisor
+        self._profiles = profiles
+        self.ready_timeout = ready_timeout
+        self.stop_timeout = stop_timeout
+        self.timings: dict[str, float] = {}
+        self._started = 0.0
+        self._stopping = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        bus.subscribe(EventType.ENCODER_HEALTH, self._on_health)
+
+    async def _on_health(self, event: Event) -> None:
+        if "encoder" not in self.timings and self._started and event.payload.get("status") == "ok":
+            self._mark("encoder")
+
+    def _mark(self, step: str) -> None:
+        self.timings[step] = round(time.monotonic() - self._started, 2)
+        logger.info(f"[startup] {step} ready after {self.timings[step]:.1f}s")
+
+    async def _prepare_encoder(self) -> None:
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError("ffmpeg not found on PATH")
+        if self._profiles:
+            await self._profiles.calibrate()
+
+    async def _open_browser(self) -> None:
+        await self._capture.open()
+        self._mark("browser")
+        run = getattr(self._capture, "run", None)
+        if run:  # screencast: frames start flowing (slate first) once the page exists
+            self._spawn(run(), "capture")
+
+    async def _lift_slate(self) -> None:
+        while not await self._capture.wait_ready(timeout=self.ready_timeout):
+            logger.warning("[startup] avatar still loading; keeping the slate up")
+        self._mark("avatar")
+
+    def _spawn(self, coro, name: str) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=f"streamer-{name}")
+        self._tasks.append(task)
+        return task
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        self._started = time.monotonic()
+        try:
+            calibrating = self._profiles is not None and self._profiles.cached is None
+            if calibrating:
+                await self._prepare_encoder()
+            browser = self._spawn(self._open_browser(), "browser")
+            if not calibrating:
+                await self._prepare_encoder()
+            self._spawn(self._supervisor.run(), "encoder")
+            await browser
+            self._spawn(self._lift_slate(), "slate")
+            stopping = asyncio.create_task(self._stopping.wait())
+            pending = {stopping, *self._tasks}
+            try:
+                while not stopping.done():
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done - {stopping}:
+                        if not task.cancelled() and task.exception():
+                            raise task.exception()
+            finally:
+                stopping.cancel()
+        finally:
+            await self._shutdown()
+
+    async def _shutdown(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        # The supervisor stops FFmpeg on cancellation; then the browser goes.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self._capture.stop(), self.stop_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[startup] browser did not close within {self.stop_timeout:.0f}s")
+        logger.info("[startup] streamer stopped")
@@ -105,6 +105,41 @@ async def test_analytics_agent_subscription_increments_count():
     assert agent._subs_count == 1
 
 
+@pytest.mark.asyncio
+async def test_analytics_agent_keeps_latest_goal_progress():
+    from agents.donation_goals import DonationGoalTracker, Goal
+    from fastapi.testclient import TestClient
+    bus = EventBus()
+    agent = AnalyticsAgent(bus)
+    goals = DonationGoalTracker(bus)
+    goals.set_goal(Goal(target=50.0, description="karaoke"))
+    await bus.publish(Event(type=EventType.DONATION, payload={"username": "a", "amount": 30.0}))
+    await goals.close()
+    data = TestClient(create_app(agent)).get("/api/stream/goals").json()
+    assert data["goals"][0]["current"] == 30.0 and data["goals"][0]["pct"] == 60.0
+
+
+@pytest.mark.asyncio
+async def test_goals_are_managed_through_the_api():
+    from agents.donation_goals import DonationGoalTracker
+    from fastapi.testclient import TestClient
+    bus = EventBus()
+    goals = DonationGoalTracker(bus)
+    client = TestClient(create_app(AnalyticsAgent(bus), goals=goals))
+    first = client.post("/api/stream/goals", json={"target": 50, "description": "karaoke"})
+    assert first.status_code == 201 and first.json()["primary"]
+    second = client.post("/api/stream/goals", json={"target": 5, "description": "subathon", "kind": "subs", "primary": True})
+    assert second.json()["primary"] and goals.progress_pct == 0.0
+    assert client.post("/api/stream/goals", json={"target": -1, "description": "x"}).status_code == 400
+    assert client.post("/api/stream/goals", json={"target": 5, "description": "x", "kind": "follows"}).status_code == 400
+    assert client.post("/api/stream/goals", json={"target": 5, "description": "x", "milestones": ["half"]}).status_code == 400
+    assert client.delete(f"/api/stream/goals/{first.json()['id']}").status_code == 200
+    assert client.delete("/api/stream/goals/nope").status_code == 404
+    assert [g.description for g in goals.goals] == ["subathon"]
+    assert TestClient(create_app(AnalyticsAgent(bus))).post("/api/stream/goals", json={}).status_code == 503
+    await goals.close()
+
+
 def test_analytics_agent_stream_summary_data():
     bus = EventBus()
     collector = MetricsCollector()
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from core.archive import StreamArchive, StreamRecorder, activity_code
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+SNAPSHOT = {"viewer_count": 40, "chat_velocity": 12.0, "donations_per_hour": 5.0, "engagement_score": 33.0}
+
+
+@pytest.mark.asyncio
+async def test_recorder_counts_events_per_sample():
+    bus = EventBus()
+    recorder = StreamRecorder(bus)
+    await bus.publish(Event(type=EventType.CHAT_MESSAGE, payload={}))
+    await bus.publish(Event(type=EventType.CHAT_MESSAGE, payload={}))
+    await bus.publish(Event(type=EventType.DONATION, payload={"amount": 5.0}))
+    recorder.sample(SNAPSHOT, "talk", revenue=5.0)
+    recorder.sample(SNAPSHOT, "talk", revenue=5.0)
+    cols = recorder.columns()
+    assert cols["chat_messages"].tolist() == [2, 0]
+    assert cols["donations"].tolist() == [1, 0]
+    assert cols["activity"].tolist() == [activity_code("talk")] * 2
+
+
+def test_archive_roundtrip_is_memory_mapped(tmp_path):
+    archive = StreamArchive(str(tmp_path))
+    recorder = StreamRecorder(EventBus())
+    for i in range(10):
+        recorder.sample(SNAPSHOT, "q_and_a", revenue=float(i), now=recorder._started_at + i)
+    recorder.save(archive, "stream-a")
+
+    loaded = archive.load("stream-a")
+    assert isinstance(loaded["revenue"], np.memmap)
+    assert loaded["revenue"][-1] == 9.0
+    assert archive.stream_ids() == ["stream-a"]
+
+
+def test_archive_orders_streams_by_start(tmp_path):
+    archive = StreamArchive(str(tmp_path))
+    cols = StreamRecorder(EventBus()).columns()
+    archive.write("late", cols, started_at=200.0)
+    archive.write("early", cols, started_at=100.0)
+    assert archive.stream_ids() == ["early", "late"]
+    assert StreamArchive(str(tmp_path / "missing")).stream_ids() == []
+
+
+def test_archive_remaps_activities_saved_under_an_older_enum(tmp_path):
+    import json
+    archive = StreamArchive(str(tmp_path))
+    recorder = StreamRecorder(EventBus())
+    recorder.sample(SNAPSHOT, "talk", revenue=0.0)
+    stream_dir = recorder.save(archive, "old")
+    # Written when the enum was ordered differently and still had a "retired" mode.
+    np.save(stream_dir / "activity.npy", np.array([0, 1, 2, 5], dtype="int8"))
+    meta = json.loads((stream_dir / "meta.json").read_text())
+    meta["activities"] = ["q_and_a", "retired", "talk"]
+    (stream_dir / "meta.json").write_text(json.dumps(meta))
+
+    codes = archive.load("old", ["activity"])["activity"]
+    assert codes.tolist() == [activity_code("q_and_a"), -1, activity_code("talk"), -1]
@@ -1,5 +1,6 @@
+import numpy as np
 import pytest
-from core.bandit import ThompsonBandit, Action
+from core.bandit import FEATURES, Action, LinearThompsonBandit, ThompsonBandit, context_features
 
 
 def test_bandit_initializes_with_actions():
@@ -15,6 +16,11 @@ def test_bandit_select_returns_valid_action():
     assert selected in actions
 
 
+def test_bandit_select_is_reproducible_with_seed():
+    a, b = ThompsonBandit(list(Action), seed=3), ThompsonBandit(list(Action), seed=3)
+    assert [a.select() for _ in range(20)] == [b.select() for _ in range(20)]
+
+
 def test_bandit_update_increases_successes():
     bandit = ThompsonBandit(actions=[Action.TALK])
     bandit.update(Action.TALK, reward=1.0)
@@ -56,3 +62,81 @@ def test_bandit_load_or_create_missing_file(tmp_path):
     for arm in bandit._arms.values():
         assert arm["alpha"] == 1.0
         assert arm["beta"] == 1.0
+
+
+def _inputs(activity="talk", velocity=20.0):
+    return {"viewer_count": 50, "chat_velocity": velocity, "donations_per_hour": 3.0,
+            "engagement_score": 40.0, "activity": activity}
+
+
+def test_context_features_encode_activity_and_scale():
+    x = context_features(_inputs(activity="react", velocity=250.0), now=0)
+    assert x.shape == (len(FEATURES),)
+    assert x[FEATURES.index("bias")] == 1.0
+    assert x[FEATURES.index("chat_velocity")] == 1.0
+    assert x[FEATURES.index("in_react")] == 1.0
+    assert x[FEATURES.index("in_talk")] == 0.0
+
+
+def test_linear_bandit_learns_context_dependent_best_arm():
+    bandit = LinearThompsonBandit(list(Action), seed=0)
+    quiet = context_features(_inputs(velocity=0.0), now=0)
+    busy = context_features(_inputs(velocity=100.0), now=0)
+    for _ in range(50):
+        bandit.update(Action.TALK, 0.8, context=quiet)
+        bandit.update(Action.REACT, 0.1, context=quiet)
+        bandit.update(Action.TALK, 0.1, context=busy)
+        bandit.update(Action.REACT, 0.9, context=busy)
+    assert bandit.exploit(quiet) == Action.TALK
+    assert bandit.exploit(busy) == Action.REACT
+
+
+def test_linear_bandit_observe_sets_default_context():
+    bandit = LinearThompsonBandit(list(Action), seed=0)
+    bandit.observe(_inputs(velocity=100.0))
+    for _ in range(30):
+        bandit.update(Action.GAME, 1.0)
+    state = bandit.state()
+    assert state["game"]["n"] == 30
+    assert state["game"]["expected"] > state["talk"]["expected"]
+    assert bandit.select() in list(Action)
+
+
+def test_linear_bandit_rank_one_inverse_matches_direct_inverse():
+    bandit = LinearThompsonBandit(list(Action), seed=0)
+    rng = np.random.default_rng(1)
+    for _ in range(40):
+        bandit.update(Action.QA, float(rng.random()), context=rng.random(len(FEATURES)))
+    assert np.allclose(bandit._A_inv[3], np.linalg.inv(bandit._A[3]))
+
+
+def test_linear_bandit_batch_update_matches_sequential():
+    rng = np.random.default_rng(2)
+    actions = rng.integers(0, 5, 200)
+    contexts = rng.random((200, len(FEATURES)))
+    rewards = rng.random(200)
+    batched, sequential = LinearThompsonBandit(list(Action)), LinearThompsonBandit(list(Action))
+    batched.update_batch(actions, contexts, rewards)
+    for a, x, r in zip(actions, contexts, rewards):
+        sequential.update(list(Action)[a], r, context=x)
+    assert np.allclose(batched._theta(), sequential._theta())
+    picks = batched.select_batch(contexts)
+    assert picks.shape == (200,) and picks.max() < 5
+
+
+def test_linear_bandit_save_and_load_or_create(tmp_path):
+    path = str(tmp_path / "linear.json")
+    bandit = LinearThompsonBandit(list(Action), seed=0)
+    bandit.observe(_inputs())
+    for _ in range(5):
+        bandit.update(Action.REACT, 1.0)
+    bandit.save(path)
+
+    loaded = LinearThompsonBandit.load_or_create(path)
+    assert np.allclose(loaded._theta(), bandit._theta())
+    assert loaded.state()["react"]["n"] == 5
+
+    ThompsonBandit(list(Action)).save(path)
+    fresh = LinearThompsonBandit.load_or_create(path)
+    assert fresh.state()["react"]["n"] == 0
+    assert ThompsonBandit.load_or_create(str(tmp_path / "missing.json"))._arms
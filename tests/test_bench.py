@@ -0,0 +1,57 @@
+import pytest
+from bench.mock_servers import LatencyModel, MockConfig
+from bench.orchestrator_loop import run_bench
+
+
+def test_latency_model_respects_floor_and_zero():
+    assert LatencyModel(0.0).sample() == 0.0
+    assert all(LatencyModel(0.01, floor=0.5).sample() == 0.5 for _ in range(10))
+
+
+@pytest.mark.asyncio
+async def test_bench_runs_pipeline_offline():
+    fast = LatencyModel(0.01)
+    config = MockConfig(llm_first_token=fast, llm_per_block=fast, tts=fast, olv_response=fast)
+    report = await run_bench(duration=2.0, chat_rate=120.0, donation_rate=30.0, config=config, check_interval=0.2)
+    assert report["llm_calls_per_min"] > 0
+    assert report["speech_latency"]["n"] > 0
+    assert report["speech_latency"]["p50_ms"] >= 0
+    assert report["chat_to_olv_latency"]["n"] > 0
+    assert report["loop_lag"]["n"] > 0
+
+
+@pytest.mark.asyncio
+async def test_performer_link_bench_reports_both_modes():
+    from bench.performer_link import run_bench as run_link_bench
+    report = await run_link_bench(commands=20, audio_kb=64)
+    assert report["connect_per_command"]["n"] == 20
+    assert report["persistent_link"]["n"] == 20
+    assert report["speak_binary"]["bytes_per_command"] < report["speak_base64"]["bytes_per_command"]
+
+
+@pytest.mark.asyncio
+async def test_tts_stream_bench_reports_first_and_last_audio():
+    from bench.tts_stream import run_bench as run_tts_bench
+    config = MockConfig(tts=LatencyModel(0.01), tts_per_char=0.0005)
+    report = await run_tts_bench(utterances=2, config=config)
+    for mode in ("whole_reply", "sentence_streaming"):
+        assert report[mode]["first_audio"]["n"] == 2
+        assert report[mode]["first_audio"]["p50_ms"] <= report[mode]["last_audio"]["p50_ms"]
+    assert report["prewarmed_cache"]["tts_requests"] == 0
+    assert report["prewarmed_cache"]["cache"]["hit_rate"] == 1.0
+
+
+def test_mock_upstreams_restores_environment_and_settings(monkeypatch):
+    import os
+    from bench import mock_upstreams
+    from core.config import settings
+    monkeypatch.delenv("ANTHROPIC_BASE_URL", raising=False)
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://example.test/v1")
+    monkeypatch.setattr(settings, "anthropic_api_key", "")
+    with mock_upstreams("http://127.0.0.1:9"):
+        assert os.environ["ANTHROPIC_BASE_URL"] == "http://127.0.0.1:9"
+        assert os.environ["OPENAI_BASE_URL"] == "http://127.0.0.1:9/v1"
+        assert settings.anthropic_api_key == "mock"
+    assert "ANTHROPIC_BASE_URL" not in os.environ
+    assert os.environ["OPENAI_BASE_URL"] == "https://example.test/v1"
+    assert settings.anthropic_api_key == ""
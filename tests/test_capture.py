@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import time
+import pytest
+from streamer.capture import FramePacer, HeadlessCapture, ScreencastCapture
+from playwright.async_api import Error as PlaywrightError
+from streamer.ffmpeg_pipe import FFmpegPipe
+
+
+async def _run_for(pacer: FramePacer, seconds: float) -> None:
+    task = asyncio.create_task(pacer.run())
+    await asyncio.sleep(seconds)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_pacer_holds_constant_rate_for_static_page():
+    written: list[bytes] = []
+    pacer = FramePacer(lambda frame: written.append(frame) or True, fps=50)
+    acks: list[int] = []
+    pacer.offer(base64.b64encode(b"jpeg-1").decode(), lambda: acks.append(1))
+    await _run_for(pacer, 0.3)
+    assert acks == [1]
+    assert 10 <= len(written) <= 17  # ~15 ticks at 50 fps, the one frame repeated
+    assert set(written) == {b"jpeg-1"}
+
+
+@pytest.mark.asyncio
+async def test_pacer_acks_on_take_and_replaces_unconsumed_frames():
+    written: list[bytes] = []
+    pacer = FramePacer(lambda frame: written.append(frame) or True, fps=20)
+    acked: list[str] = []
+    for name in ("a", "b", "c"):
+        pacer.offer(name.encode(), lambda name=name: acked.append(name))
+    await _run_for(pacer, 0.02)
+    assert acked == ["a", "b", "c"]  # a and b replaced (and released) before the first tick
+    assert written[0] == b"c"
+    assert pacer.stats["replaced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_pacer_skips_ticks_when_sink_is_slow():
+    def slow_sink(frame: bytes) -> bool:
+        time.sleep(0.05)
+        return True
+
+    pacer = FramePacer(slow_sink, fps=100)
+    pacer.offer(b"frame", lambda: None)
+    await _run_for(pacer, 0.3)
+    assert pacer.stats["written"] <= 7
+    assert pacer.stats["skipped"] >= 15
+
+
+@pytest.mark.asyncio
+async def test_screencast_acks_are_kept_and_failures_swallowed():
+    class _Session:
+        async def send(self, method, params=None):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("Target closed")
+
+    class _Pacer:
+        def offer(self, data, ack):
+            ack()
+
+    capture = ScreencastCapture("http://localhost:12393", sink=lambda frame: True)
+    capture._cdp, capture._pacer = _Session(), _Pacer()
+    loop = asyncio.get_running_loop()
+    errors = []
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+    try:
+        for _ in range(3):
+            capture._on_frame({"sessionId": 1, "data": ""})
+        assert len(capture._acks) == 3
+        await asyncio.sleep(0.05)
+        assert not capture._acks
+    finally:
+        loop.set_exception_handler(None)
+    assert errors == []
+
+
+class _SlowAvatarPage:
+    """Page whose navigation fails `unreachable` times and whose avatar renders on the `ready_on`th probe."""
+
+    def __init__(self, unreachable: int = 0, ready_on: int = 1) -> None:
+        self.unreachable = unreachable
+        self.ready_on = ready_on
+        self.url = "about:blank"
+        self.gotos = 0
+        self.probes = 0
+        self.slate_removed = False
+
+    async def goto(self, url, **kwargs):
+        self.gotos += 1
+        if self.gotos <= self.unreachable:
+            raise PlaywrightError("net::ERR_CONNECTION_REFUSED")
+        self.url = url
+
+    async def wait_for_function(self, probe, **kwargs):
+        self.probes += 1
+        if self.probes < self.ready_on:
+            raise PlaywrightError("Timeout exceeded")
+
+    async def evaluate(self, script):
+        self.slate_removed = True
+
+
+@pytest.mark.asyncio
+async def test_wait_ready_navigates_once_and_keeps_polling_a_slow_avatar():
+    capture = HeadlessCapture("http://localhost:12393")
+    capture._page = page = _SlowAvatarPage(unreachable=2, ready_on=3)
+    assert not await capture.wait_ready(timeout=1.0, retry=0.01)
+    assert not await capture.wait_ready(timeout=1.0, retry=0.01)
+    assert await capture.wait_ready(timeout=1.0, retry=0.01)
+    assert page.gotos == 3  # two refused, then one navigation for all three probes
+    assert page.slate_removed and capture.ready
+
+
+@pytest.mark.asyncio
+async def test_wait_ready_navigates_again_after_a_failed_load():
+    capture = HeadlessCapture("http://localhost:12393")
+    capture._page = page = _SlowAvatarPage(ready_on=3)
+    assert not await capture.wait_ready(timeout=1.0)
+    page.url = "chrome-error://chromewebdata/"  # the load failed after it committed
+    assert not await capture.wait_ready(timeout=1.0)
+    assert page.gotos == 1
+    assert await capture.wait_ready(timeout=1.0)
+    assert page.gotos == 2 and page.url == "http://localhost:12393"
+
+
+def test_image2pipe_source_reads_frames_from_stdin():
+    pipe = FFmpegPipe(rtmp_url="rtmp://live.twitch.tv/app/testkey", source="image2pipe")
+    cmd = pipe.build_command()
+    assert "x11grab" not in cmd
+    assert cmd[cmd.index("-f") + 1] == "image2pipe" and "pipe:0" in cmd
+    assert cmd[cmd.index("-r") + 1] == "30"
+    assert not pipe.write_frame(b"jpeg")  # not started
+
+
+def test_unknown_capture_source_is_rejected():
+    with pytest.raises(ValueError):
+        FFmpegPipe(rtmp_url="rtmp://x", source="gdigrab")
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import pytest
+from core.bandit import Action, LinearThompsonBandit, ThompsonBandit
+from core.checkpoint import StateCheckpointer, atomic_write, generation_path, generations, load_newest
+
+
+def test_atomic_write_rotates_generations(tmp_path):
+    path = tmp_path / "state.json"
+    for i in range(5):
+        atomic_write(path, json.dumps({"v": i}).encode(), keep=3)
+    assert [json.loads(p.read_text())["v"] for p in generations(path)] == [4, 3, 2]
+    assert not generation_path(path, 3).exists()
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_atomic_write_leaves_old_file_when_write_fails(tmp_path):
+    path = tmp_path / "state.json"
+    atomic_write(path, b'{"v": 1}')
+
+    with pytest.raises(TypeError):
+        atomic_write(path, "not bytes")  # type: ignore[arg-type]
+    assert json.loads(path.read_text()) == {"v": 1}
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_load_or_create_falls_back_to_older_generation(tmp_path):
+    path = str(tmp_path / "bandit.json")
+    bandit = ThompsonBandit(list(Action))
+    for _ in range(5):
+        bandit.update(Action.GAME, 1.0)
+        bandit.save(path, keep=3)
+    generation_path(path, 0).write_text('{"talk": {"alpha": 1.0')  # torn write
+
+    loaded = ThompsonBandit.load_or_create(path)
+    assert loaded._arms[Action.GAME]["alpha"] == 5.0
+
+
+def test_load_newest_returns_none_without_any_generation(tmp_path):
+    assert load_newest(tmp_path / "missing.json", ThompsonBandit.load) is None
+    assert ThompsonBandit.load_or_create(str(tmp_path / "missing.json"))._arms[Action.TALK]["alpha"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_checkpointer_coalesces_updates_into_one_write(tmp_path):
+    path = tmp_path / "bandit.json"
+    bandit = ThompsonBandit(list(Action))
+    checkpointer = StateCheckpointer(bandit, str(path), debounce=0.05, keep=2)
+    for _ in range(20):
+        bandit.update(Action.QA, 1.0)
+        checkpointer.mark_dirty()
+    assert not path.exists()
+    await asyncio.sleep(0.2)
+    assert checkpointer.stats["writes"] == 1
+    assert ThompsonBandit.load(str(path))._arms[Action.QA]["alpha"] == 21.0
+
+
+@pytest.mark.asyncio
+async def test_checkpointer_flush_writes_immediately(tmp_path):
+    path = tmp_path / "linear.json"
+    bandit = LinearThompsonBandit(list(Action), seed=0)
+    checkpointer = StateCheckpointer(bandit, str(path), debounce=60.0)
+    bandit.update(Action.REACT, 1.0)
+    checkpointer.mark_dirty()
+    await asyncio.wait_for(checkpointer.flush(), 1.0)
+    assert not checkpointer.dirty
+    assert LinearThompsonBandit.load(str(path)).state()["react"]["n"] == 1
+    await checkpointer.flush()
+    assert checkpointer.stats["writes"] == 1
+
+
+def test_checkpointer_without_loop_defers_to_flush(tmp_path):
+    path = tmp_path / "bandit.json"
+    checkpointer = StateCheckpointer(ThompsonBandit(list(Action)), str(path))
+    checkpointer.mark_dirty()
+    assert checkpointer.dirty and not path.exists()
+    asyncio.run(checkpointer.flush())
+    assert path.exists()
@@ -0,0 +1,104 @@
+import random
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from agents.clip_agent import ClipExtractor, MomentDetector, RateSignal, RollingStats
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+from streamer.segment_ring import Segment, SegmentRing
+
+
+def _steady_chat(detector: MomentDetector, start: float, end: float, per_minute: float, rng: random.Random) -> float:
+    t = start
+    while True:
+        t += rng.expovariate(per_minute / 60)
+        if t >= end:
+            return end
+        detector.record_chat(t)
+        assert detector.check(t) is None, f"false positive at t={t:.0f}"
+
+
+def test_rolling_stats_matches_numpy_window():
+    rng = np.random.default_rng(0)
+    values = rng.normal(10, 3, 1000)
+    stats = RollingStats(window=64)
+    for x in values:
+        stats.push(float(x))
+    assert stats.mean == pytest.approx(values[-64:].mean())
+    assert stats.std == pytest.approx(values[-64:].std(ddof=1))
+
+
+def test_rate_signal_burst_counts_recent_bins_only():
+    signal = RateSignal(floor=1.0, bucket=1.0, burst=10, window=60)
+    for t in range(30):
+        signal.add(float(t), 2.0)
+    assert signal.burst(29.5) == pytest.approx(20.0)
+    assert signal.burst(100.0) == 0.0
+
+
+def test_chat_spike_is_detected_after_warmup():
+    rng = random.Random(3)
+    detector = MomentDetector(warmup=60, chat_velocity_threshold=30)
+    t = _steady_chat(detector, 0.0, 300.0, per_minute=20, rng=rng)
+    moment = None
+    while moment is None and t < 330:
+        t += rng.expovariate(5.0)
+        detector.record_chat(t)
+        moment = detector.check(t)
+    assert moment is not None and t < 315
+    assert moment["reason"] == "chat"
+    assert moment["score"] >= detector.threshold
+
+
+def test_combined_signals_outscore_single_spike():
+    detector = MomentDetector(warmup=0)
+    for t in range(120):
+        detector.record_viewers(200, now=float(t))
+    detector.record_donation(50.0, now=120.0)
+    donation_only, _ = detector.score(now=120.5)
+    detector.record_sub(5, now=120.6)
+    detector.record_viewers(400, now=120.7)
+    combined, signals = detector.score(now=120.8)
+    assert combined > donation_only
+    assert signals["viewers"] > 0 and signals["subs"] > 0
+
+
+def test_cooldown_suppresses_repeat_moments():
+    detector = MomentDetector(warmup=0, cooldown=120)
+    detector.record_donation(500.0, now=10.0)
+    assert detector.check(now=10.1) is not None
+    detector.record_donation(500.0, now=20.0)
+    assert detector.check(now=20.1) is None
+
+
+@pytest.mark.asyncio
+async def test_detector_publishes_clip_moment_on_bus():
+    bus = EventBus()
+    detector = MomentDetector(bus, warmup=0)
+    moments: list[Event] = []
+
+    async def on_moment(event: Event) -> None:
+        moments.append(event)
+
+    bus.subscribe(EventType.CLIP_MOMENT, on_moment)
+    await bus.publish(Event(type=EventType.VIEWER_COUNT, payload={"count": 150}))
+    await bus.publish(Event(type=EventType.DONATION, payload={"username": "whale", "amount": 250.0}))
+    assert len(moments) == 1
+    assert moments[0].payload["reason"] == "donations"
+    assert moments[0].source == "clip_agent"
+    assert detector.stats["moments"] == 1
+
+
+@pytest.mark.asyncio
+async def test_clip_extractor_cuts_segments_around_moment(tmp_path):
+    at = 1_700_000_100.0
+    segments = [Segment(tmp_path / f"seg{i:03d}.ts", at - 30 + 2 * i, at - 28 + 2 * i) for i in range(25)]
+    ring = SegmentRing(str(tmp_path))
+    extractor = ClipExtractor(EventBus(), ring, clips_dir=str(tmp_path / "clips"), pre_roll=10, post_roll=6)
+    with patch.object(SegmentRing, "segments", return_value=segments), \
+            patch("agents.clip_agent.extract_clip", AsyncMock()) as extract:
+        out = await extractor.extract(at, score=5.2)
+    cut = extract.await_args.args[0]
+    assert cut[0].start <= at - 10 and cut[-1].end >= at + 6
+    assert len(cut) == 8
+    assert out.name.endswith("-5.2.mp4") and extractor.stats["clips"] == 1
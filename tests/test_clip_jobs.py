@@ -0,0 +1,117 @@
+import asyncio
+import json
+import sys
+import time
+import pytest
+from unittest.mock import patch
+from agents.clip_jobs import JOB_KINDS, ClipJobQueue, loudnorm_command, vertical_command
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+FAKE_FFMPEG = """
+import sys, pathlib
+for us in (250000, 500000, 1000000):
+    print(f"out_time_us={us}", flush=True)
+print("progress=end", flush=True)
+pathlib.Path(sys.argv[1]).write_text("done")
+sys.exit(int(sys.argv[2]))
+"""
+
+
+SLOW_FFMPEG = "import time; time.sleep(60)"
+
+
+def _fake_kind(exit_code: int = 0):
+    return (lambda src, out, threads: [sys.executable, "-c", FAKE_FFMPEG, str(out), str(exit_code)], "fake.txt")
+
+
+def _recorder(bus: EventBus) -> list[dict]:
+    events: list[dict] = []
+
+    async def on_job(event: Event) -> None:
+        events.append(event.payload)
+
+    bus.subscribe(EventType.CLIP_JOB, on_job)
+    return events
+
+
+def test_commands_reencode_only_what_they_must(tmp_path):
+    vertical = vertical_command(tmp_path / "a.mp4", tmp_path / "b.mp4", threads=2)
+    assert "crop=ih*9/16:ih,scale=1080:1920" in vertical
+    assert vertical[vertical.index("-c:a") + 1] == "copy"
+    loud = loudnorm_command(tmp_path / "a.mp4", tmp_path / "b.mp4", threads=2)
+    assert loud[loud.index("-c:v") + 1] == "copy"
+    assert "pipe:1" in vertical and "pipe:1" in loud
+
+
+@pytest.mark.asyncio
+async def test_jobs_persist_in_priority_order_and_restore(tmp_path):
+    state = tmp_path / "jobs.json"
+    jobs = ClipJobQueue(EventBus(), state_path=str(state), cpus=[0])
+    await jobs.submit("vertical", tmp_path / "clip.mp4")
+    await jobs.submit("thumbnail", tmp_path / "clip.mp4")
+    await jobs.submit("loudnorm", tmp_path / "clip.mp4")
+    assert [job.kind for job in jobs.pending] == ["thumbnail", "loudnorm", "vertical"]
+    assert len(json.loads(state.read_text())) == 3
+
+    restored = ClipJobQueue(EventBus(), state_path=str(state), cpus=[0])
+    assert [job.kind for job in restored.pending] == ["thumbnail", "loudnorm", "vertical"]
+    assert restored.pending[0].output.name == "clip.thumb.jpg"
+
+
+@pytest.mark.asyncio
+async def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError, match="unknown clip job kind"):
+        await ClipJobQueue(EventBus(), cpus=[0]).submit("gif", "clip.mp4")
+
+
+@pytest.mark.asyncio
+async def test_job_runs_in_pool_and_reports_progress(tmp_path):
+    bus = EventBus()
+    events = _recorder(bus)
+    jobs = ClipJobQueue(bus, state_path=str(tmp_path / "jobs.json"), concurrency=1, nice=0, cpus=None)
+    with patch.dict(JOB_KINDS, {"fake": _fake_kind()}):
+        jobs.start()
+        job = await jobs.submit("fake", tmp_path / "clip.mp4", duration=1.0)
+        await jobs.join()
+        await jobs.close()
+        output = job.output
+    statuses = [e["status"] for e in events]
+    assert statuses[:2] == ["queued", "running"] and statuses[-1] == "done"
+    assert "progress" in statuses
+    assert events[-1]["output"] == str(output) and output.read_text() == "done"
+    assert jobs.stats["done"] == 1
+    assert json.loads((tmp_path / "jobs.json").read_text()) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_then_marked_failed(tmp_path):
+    bus = EventBus()
+    events = _recorder(bus)
+    jobs = ClipJobQueue(bus, concurrency=1, nice=0, cpus=None, max_attempts=2)
+    with patch.dict(JOB_KINDS, {"fake": _fake_kind(exit_code=1)}):
+        jobs.start()
+        await jobs.submit("fake", tmp_path / "clip.mp4")
+        await jobs.join()
+        await jobs.close()
+    assert jobs.stats["retried"] == 1 and jobs.stats["failed"] == 1
+    assert events[-1]["status"] == "failed" and "exited 1" in events[-1]["error"]
+
+
+@pytest.mark.asyncio
+async def test_close_terminates_running_jobs_and_keeps_them_queued(tmp_path):
+    state = tmp_path / "jobs.json"
+    jobs = ClipJobQueue(EventBus(), state_path=str(state), concurrency=1, nice=0, cpus=None)
+    slow = (lambda src, out, threads: [sys.executable, "-c", SLOW_FFMPEG], "slow.txt")
+    with patch.dict(JOB_KINDS, {"slow": slow}):
+        jobs.start()
+        await jobs.submit("slow", tmp_path / "clip.mp4")
+        while not jobs._pids:
+            await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await jobs.close()
+    assert time.monotonic() - started < 5.0
+    assert jobs.stats["interrupted"] == 1 and not jobs.stats["failed"]
+    saved = json.loads(state.read_text())
+    assert [(job["kind"], job["attempts"]) for job in saved] == [("slow", 0)]
+    assert [job.kind for job in ClipJobQueue(EventBus(), state_path=str(state), cpus=[0]).pending] == ["slow"]
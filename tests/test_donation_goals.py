@@ -1,5 +1,8 @@
+import asyncio
 import pytest
-from agents.donation_goals import DonationGoalTracker, Goal
+from agents.donation_goals import GOAL_COMPLETE_TEMPLATE, DonationGoalTracker, Goal
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
 
 
 def test_goal_initializes_at_zero():
@@ -48,3 +51,128 @@ def test_announce_text_includes_progress():
     text = tracker.announce_text()
     assert "30" in text or "30.00" in text
     assert "100" in text
+
+
+def test_stretch_goal_picks_up_overflow():
+    tracker = DonationGoalTracker()
+    base = tracker.add_goal(Goal(target=100.0, description="karaoke"))
+    stretch = tracker.add_goal(Goal(target=50.0, description="cosplay", milestones=[50, 100]), stretch=True)
+    done = []
+    tracker.on_complete = done.append
+    tracker.record_donation(130.0)
+    assert tracker.progress(base.id) == 130.0 and tracker.progress(stretch.id) == 30.0
+    assert len(done) == 1
+    tracker.record_donation(20.0)
+    assert done[-1] == GOAL_COMPLETE_TEMPLATE.format(description="cosplay")
+
+
+def test_goal_kinds_track_separately_and_fire_each_milestone_once():
+    tracker = DonationGoalTracker()
+    subs = tracker.add_goal(Goal(target=10, description="new emote", kind="subs", milestones=[10, 30, 100]))
+    tracker.add_goal(Goal(target=1000, description="bits", kind="bits"))
+    fired = []
+    tracker.on_milestone = lambda pct, msg: fired.append((pct, msg))
+    tracker.on_complete = lambda msg: fired.append((100, msg))
+    tracker.record("subs", 3)
+    tracker.record("subs", 1)
+    tracker.record_donation(500.0)
+    assert [pct for pct, _ in fired] == [10, 30]
+    assert "4 subs of 10 subs" in tracker.announce_text(subs.id)
+    tracker.record("subs", 10)
+    assert [pct for pct, _ in fired] == [10, 30, 100]
+
+
+def test_donation_storm_stays_logarithmic():
+    tracker = DonationGoalTracker()
+    for i in range(2000):
+        tracker.add_goal(Goal(target=10.0 + i, description=f"goal {i}", milestones=[10, 50, 90, 100]))
+    tracker.record_donation(5000.0)
+    assert tracker.stats["milestones"] == 8000
+    assert tracker.record("donations", 1.0) == 0  # nothing left to cross: two bisects
+
+
+@pytest.mark.asyncio
+async def test_bus_events_update_goals_persist_and_coalesce(tmp_path):
+    bus = EventBus()
+    state = tmp_path / "goals.json"
+    tracker = DonationGoalTracker(bus, state_path=str(state), publish_interval=0.2)
+    tracker.set_goal(Goal(target=100.0, description="karaoke"))
+    tracker.add_goal(Goal(target=5, description="subs", kind="subs"))
+    published: list[dict] = []
+
+    async def on_progress(event: Event) -> None:
+        published.append(event.payload)
+
+    bus.subscribe(EventType.GOAL_PROGRESS, on_progress)
+    for _ in range(20):
+        await bus.publish(Event(type=EventType.DONATION, payload={"username": "a", "amount": 1.0}))
+    await bus.publish(Event(type=EventType.SUBSCRIPTION, payload={"username": "b", "tier": 1}))
+    await tracker.close()
+    assert 1 <= len(published) <= 3  # 21 events, coalesced
+    assert published[-1]["goals"][0]["current"] == 20.0 and published[-1]["goals"][1]["current"] == 1.0
+    restored = DonationGoalTracker(state_path=str(state))
+    fired = []
+    restored.on_milestone = lambda pct, msg: fired.append(pct)
+    assert restored.current_total == 20.0 and restored.progress_pct == 20.0
+    restored.record_donation(5.0)
+    assert fired == [25]  # milestones already announced before the restart stay quiet
+
+
+@pytest.mark.asyncio
+async def test_milestone_is_published_without_waiting_for_interval():
+    bus = EventBus()
+    tracker = DonationGoalTracker(bus, publish_interval=60.0)
+    tracker.set_goal(Goal(target=10.0, description="x"))
+    published: list[dict] = []
+
+    async def on_progress(event: Event) -> None:
+        published.append(event.payload)
+
+    bus.subscribe(EventType.GOAL_PROGRESS, on_progress)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    published.clear()
+    await bus.publish(Event(type=EventType.DONATION, payload={"amount": 3.0}))
+    await asyncio.sleep(0.05)
+    assert published and published[-1]["milestones"] == [{"goal": tracker.goals[0].id, "pct": 25}]
+
+
+@pytest.mark.asyncio
+async def test_milestones_and_completion_are_spoken_on_the_bus():
+    from agents.donation_goals import COMPLETE_SPEECH_PRIORITY, MILESTONE_SPEECH_PRIORITY
+    bus = EventBus()
+    tracker = DonationGoalTracker(bus)
+    tracker.set_goal(Goal(target=10.0, description="new mic"))
+    spoken: list[Event] = []
+
+    async def on_speak(event: Event) -> None:
+        spoken.append(event)
+
+    bus.subscribe(EventType.SPEAK, on_speak)
+    await bus.publish(Event(type=EventType.DONATION, payload={"amount": 6.0}))
+    await bus.publish(Event(type=EventType.DONATION, payload={"amount": 4.0}))
+    await tracker.close()
+    assert [e.priority for e in spoken] == [MILESTONE_SPEECH_PRIORITY] * 3 + [COMPLETE_SPEECH_PRIORITY]
+    assert "50%" in spoken[1].payload["text"]
+    assert spoken[-1].payload["text"] == GOAL_COMPLETE_TEMPLATE.format(description="new mic")
+
+
+def test_bad_goals_are_rejected_before_touching_state():
+    tracker = DonationGoalTracker()
+    for bad in [dict(target=0), dict(target=10, milestones=[150]), dict(target=10, milestones=[0]),
+                dict(target=10, milestones="50"), dict(target=10, milestones=[None]), dict(target="lots")]:
+        with pytest.raises((TypeError, ValueError)):
+            tracker.add_goal(Goal(description="x", **bad))
+    assert tracker.goals == [] and not any(tracker._thresholds.values())
+    goal = Goal(target="20", description="x", milestones=["50", 25])
+    assert goal.target == 20.0 and goal.milestones == [25.0, 50.0]
+
+
+def test_restore_skips_an_unreadable_saved_goal(tmp_path):
+    import json
+    state = tmp_path / "goals.json"
+    good = {"target": 10.0, "description": "mic", "kind": "donations", "milestones": [50], "id": "good", "start": 0.0}
+    bad = {**good, "id": "bad", "milestones": ["fifty"]}
+    state.write_text(json.dumps({"totals": {"donations": 2.0}, "goals": [bad, good], "primary": "bad"}))
+    tracker = DonationGoalTracker(state_path=str(state))
+    assert [g.id for g in tracker.goals] == ["good"] and tracker.progress_pct == 20.0
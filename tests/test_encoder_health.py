@@ -0,0 +1,200 @@
+import asyncio
+import subprocess
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from agents.analytics import AnalyticsAgent, create_app
+from streamer.encoder_health import EncoderSupervisor, ProgressParser
+from streamer.ffmpeg_pipe import DEFAULT_PROFILE
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+BLOCK = """frame=912
+fps=29.97
+stream_0_0_q=23.0
+bitrate=2487.3kbits/s
+total_size=9437184
+out_time_us=30400000
+out_time=00:00:30.400000
+dup_frames=2
+drop_frames=5
+speed=0.998x
+progress=continue
+"""
+
+
+class _FakePipe:
+    """Stands in for FFmpegPipe: each start() runs a script printing `-progress` blocks.
+
+    Output time advances at a rate drawn from `speed` (a value or a (low, high) range)
+    for every block, and the reported `speed` is the cumulative one, as FFmpeg does.
+    """
+
+    def __init__(self, blocks: int, speed: float | tuple[float, float], linger: float = 0.0) -> None:
+        low, high = speed if isinstance(speed, tuple) else (speed, speed)
+        head, _, _ = BLOCK.partition("out_time_us=")
+        self._script = (
+            "import random, sys, time\n"
+            "out, start, last = 0.0, time.monotonic(), time.monotonic()\n"
+            f"for _ in range({blocks}):\n"
+            "    time.sleep(0.02)\n"
+            "    now = time.monotonic()\n"
+            f"    out += (now - last) * random.uniform({low}, {high})\n"
+            "    last = now\n"
+            f"    sys.stdout.write({head!r} + f'out_time_us={{int(out * 1e6)}}\\ndrop_frames=5\\n'\n"
+            "                     f'speed={out / (now - start):.3f}x\\nprogress=continue\\n')\n"
+            "    sys.stdout.flush()\n"
+            f"time.sleep({linger})\n"
+        )
+        self.process = None
+        self.profile = DEFAULT_PROFILE
+        self.starts = 0
+
+    def start(self) -> None:
+        self.starts += 1
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", self._script], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+
+    def stop(self) -> None:
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+
+def _health_events(bus: EventBus) -> list[dict]:
+    events: list[dict] = []
+
+    async def on_health(event: Event) -> None:
+        events.append(event.payload)
+
+    bus.subscribe(EventType.ENCODER_HEALTH, on_health)
+    return events
+
+
+def test_progress_parser_yields_stats_per_block():
+    parser = ProgressParser()
+    results = [parser.feed(line) for line in BLOCK.splitlines()]
+    assert results[:-1] == [None] * (len(results) - 1)
+    stats = results[-1]
+    assert stats.frame == 912 and stats.fps == 29.97
+    assert stats.bitrate_kbps == pytest.approx(2487.3)
+    assert stats.speed == pytest.approx(0.998)
+    assert stats.drop_frames == 5 and stats.out_time == pytest.approx(30.4)
+
+
+def test_progress_parser_tolerates_na_values():
+    parser = ProgressParser()
+    for line in ["bitrate=N/A", "speed=N/A", "out_time_us=N/A"]:
+        parser.feed(line)
+    stats = parser.feed("progress=continue")
+    assert stats.bitrate_kbps == 0.0 and stats.speed == 0.0 and stats.out_time == 0.0
+
+
+@pytest.mark.asyncio
+async def test_supervisor_restarts_exited_encoder_with_backoff():
+    bus = EventBus()
+    events = _health_events(bus)
+    pipe = _FakePipe(blocks=2, speed=1.01)
+    supervisor = EncoderSupervisor(pipe, bus, min_backoff=0.01, max_backoff=0.04, stable_after=60)
+    task = asyncio.create_task(supervisor.run())
+    while supervisor.stats["restarts"] < 3:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert pipe.starts >= 3 and supervisor.stats["exits"] >= 3
+    assert supervisor._backoff == pytest.approx(0.04)  # doubled, then capped
+    assert {"ok", "restarting"} <= {e["status"] for e in events}
+    assert supervisor.latest.speed == pytest.approx(1.01, abs=0.1)
+    assert pipe.process is None
+
+
+@pytest.mark.asyncio
+async def test_supervisor_restarts_encoder_that_falls_behind():
+    bus = EventBus()
+    events = _health_events(bus)
+    pipe = _FakePipe(blocks=200, speed=0.62, linger=5.0)
+    supervisor = EncoderSupervisor(pipe, bus, slow_for=0.1, window=0.2, min_backoff=0.01)
+    task = asyncio.create_task(supervisor.run())
+    while supervisor.stats["restarts"] < 1:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert supervisor.stats["slow"] >= 1
+    assert "slow" in [e["status"] for e in events]
+    assert events[-1]["status"] == "restarting" and events[-1]["reason"].startswith("speed 0.6")
+
+
+@pytest.mark.asyncio
+async def test_supervisor_restarts_encoder_that_goes_silent():
+    bus = EventBus()
+    events = _health_events(bus)
+    pipe = _FakePipe(blocks=3, speed=1.0, linger=30.0)
+    supervisor = EncoderSupervisor(pipe, bus, stall_timeout=0.2, min_backoff=0.01)
+    task = asyncio.create_task(supervisor.run())
+    while supervisor.stats["restarts"] < 1:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert supervisor.stats["stalled"] == 1 and supervisor.stats["exits"] == 0
+    assert events[-1]["status"] == "restarting" and events[-1]["reason"] == "stalled: no progress for 0.2s"
+
+
+@pytest.mark.asyncio
+async def test_supervisor_keeps_live_encoder_just_below_real_time():
+    bus = EventBus()
+    events = _health_events(bus)
+    pipe = _FakePipe(blocks=60, speed=(0.97, 0.998), linger=5.0)
+    supervisor = EncoderSupervisor(pipe, bus, slow_for=0.1, window=0.2, min_backoff=0.01)
+    task = asyncio.create_task(supervisor.run())
+    await asyncio.sleep(1.2)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert supervisor.stats["restarts"] == 0 and pipe.starts == 1
+    assert supervisor.latest.speed < 1.0
+    speeds = [e["window_speed"] for e in events if e.get("window_speed") is not None]
+    assert speeds and all(0.9 < speed < 1.1 for speed in speeds)
+    assert {e["status"] for e in events} == {"ok"}
+
+
+@pytest.mark.asyncio
+async def test_requested_restart_skips_backoff():
+    bus = EventBus()
+    events = _health_events(bus)
+    pipe = _FakePipe(blocks=200, speed=1.0, linger=5.0)
+    supervisor = EncoderSupervisor(pipe, bus, min_backoff=30.0)
+    task = asyncio.create_task(supervisor.run())
+    while not supervisor.latest:
+        await asyncio.sleep(0.01)
+    supervisor.restart("profile stepped up to 720p30-fast")
+    while pipe.starts < 2:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert supervisor.stats["requested"] == 1 and supervisor.stats["restarts"] == 0
+    assert {"status": "restarting", "reason": "profile stepped up to 720p30-fast"}.items() <= next(
+        e for e in events if e["status"] == "restarting"
+    ).items()
+
+
+def test_rate_window_measures_recent_speed_and_drops():
+    from streamer.encoder_health import EncoderStats, RateWindow
+    window = RateWindow(seconds=4.0)
+    for second in range(10):
+        fast = second < 6
+        window.add(float(second), EncoderStats(out_time=second * 1.0 if fast else 5 + (second - 5) * 0.5,
+                                               drop_frames=0 if fast else (second - 5) * 10))
+    assert window.speed == pytest.approx(0.5)
+    assert window.drop_rate == pytest.approx(10.0)
+    assert RateWindow(seconds=4.0).speed is None
+
+
+def test_analytics_exposes_pushed_encoder_health():
+    agent = AnalyticsAgent(EventBus())
+    client = TestClient(create_app(agent))
+    assert client.get("/api/stream/encoder").json() == {"status": "unknown"}
+    payload = {"status": "slow", "speed": 0.8, "fps": 24.1, "drop_frames": 12, "restarts": 1}
+    assert client.post("/api/stream/encoder", json=payload).json() == {"ok": True}
+    assert client.get("/api/stream/encoder").json() == payload
+    assert agent.encoder_health == payload
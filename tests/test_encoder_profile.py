@@ -0,0 +1,139 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+from streamer.encoder_profile import PROFILE_LADDER, EncoderProfileManager, calibration_command
+from streamer.ffmpeg_pipe import DEFAULT_PROFILE, FFmpegPipe
+
+RTMP = "rtmp://live.twitch.tv/app/testkey"
+
+
+def _speeds(**by_name: float):
+    async def measure(profile):
+        return by_name.get(profile.name, 0.5)
+    return measure
+
+
+def test_default_profile_keeps_current_encode_settings():
+    cmd = FFmpegPipe(rtmp_url=RTMP).build_command()
+    assert cmd[cmd.index("-preset") + 1] == "veryfast"
+    assert cmd[cmd.index("-b:v") + 1] == "2500k" and cmd[cmd.index("-bufsize") + 1] == "5000k"
+    assert "-vf" not in cmd
+
+
+def test_smaller_profile_scales_and_lowers_frame_rate():
+    pipe = FFmpegPipe(rtmp_url=RTMP, profile=PROFILE_LADDER[-1])
+    cmd = pipe.build_command()
+    assert cmd[cmd.index("-vf") + 1] == "scale=854:480"
+    assert cmd[cmd.index("-r") + 1] == "24"
+    assert cmd[cmd.index("-s") + 1] == "1280x720"  # capture size is unchanged
+
+
+def test_calibration_command_encodes_synthetic_source_to_null():
+    cmd = calibration_command(PROFILE_LADDER[0], (1280, 720), 3.0)
+    assert "testsrc2=size=1280x720:rate=30" in cmd
+    assert cmd[-3:] == ["-f", "null", "-"] and "medium" in cmd
+
+
+@pytest.mark.asyncio
+async def test_calibrate_picks_best_profile_with_headroom_in_few_probes():
+    pipe = FFmpegPipe(rtmp_url=RTMP)
+    manager = EncoderProfileManager(pipe, headroom=1.5)
+    # Everything from "faster" down runs at >= 1.5x real time.
+    passing = {p.name: 2.0 for p in PROFILE_LADDER[2:]}
+    with patch.object(manager, "measure", side_effect=_speeds(**passing)):
+        chosen = await manager.calibrate()
+    assert chosen.name == "720p30-faster" and pipe.profile is chosen
+    assert manager.stats["probes"] <= 4  # binary search over 8 rungs
+
+
+@pytest.mark.asyncio
+async def test_calibration_is_cached_across_restarts(tmp_path):
+    state = tmp_path / "encoder_profile.json"
+    first = EncoderProfileManager(FFmpegPipe(rtmp_url=RTMP), state_path=str(state))
+    with patch.object(first, "measure", side_effect=_speeds(**{p.name: 3.0 for p in PROFILE_LADDER})):
+        await first.calibrate()
+    assert json.loads(state.read_text())["profile"] == "720p30-medium"
+    pipe = FFmpegPipe(rtmp_url=RTMP)
+    second = EncoderProfileManager(pipe, state_path=str(state))
+    with patch.object(second, "measure", AsyncMock()) as measure:
+        await second.calibrate()
+    measure.assert_not_awaited()
+    assert pipe.profile.name == "720p30-medium"
+
+
+@pytest.mark.asyncio
+async def test_calibration_without_ffmpeg_keeps_default():
+    pipe = FFmpegPipe(rtmp_url=RTMP)
+    manager = EncoderProfileManager(pipe)
+    with patch.object(manager, "measure", AsyncMock(side_effect=FileNotFoundError("ffmpeg"))):
+        assert await manager.calibrate() == DEFAULT_PROFILE
+
+
+def _health(bus: EventBus):
+    async def health(status: str, reason: str = "") -> None:
+        await bus.publish(Event(type=EventType.ENCODER_HEALTH, payload={"status": status, "reason": reason}))
+    return health
+
+
+@pytest.mark.asyncio
+async def test_repeated_slow_restarts_step_profile_down(tmp_path):
+    bus = EventBus()
+    pipe = FFmpegPipe(rtmp_url=RTMP)
+    state = tmp_path / "p.json"
+    manager = EncoderProfileManager(pipe, bus, state_path=str(state))
+    health = _health(bus)
+
+    await health("slow")
+    await health("restarting", "exited with code 1")
+    await health("restarting", "speed 0.82x with 0.0 dropped frames/s for 15s")
+    assert pipe.profile == DEFAULT_PROFILE  # one overload may be a spike
+    await health("restarting", "speed 0.80x with 0.0 dropped frames/s for 15s")
+    assert pipe.profile.name == "720p30-superfast"
+    assert manager.stats["step_downs"] == 1
+    assert not state.exists()  # runtime steps never reach the calibration cache
+    pipe.profile = PROFILE_LADDER[-1]
+    assert not manager.step_down("still slow")
+
+
+@pytest.mark.asyncio
+async def test_overloads_far_apart_do_not_step_down():
+    bus = EventBus()
+    pipe = FFmpegPipe(rtmp_url=RTMP)
+    EncoderProfileManager(pipe, bus, overload_window=0.05)
+    health = _health(bus)
+    await health("restarting", "speed 0.82x")
+    await asyncio.sleep(0.1)
+    await health("restarting", "speed 0.82x")
+    assert pipe.profile == DEFAULT_PROFILE
+
+
+@pytest.mark.asyncio
+async def test_stable_encoder_steps_back_up_to_calibrated_profile():
+    bus = EventBus()
+    pipe = FFmpegPipe(rtmp_url=RTMP)
+    restarts = []
+    manager = EncoderProfileManager(pipe, bus, step_down_after=1, step_up_after=0.05, restart=restarts.append)
+    health = _health(bus)
+    await health("restarting", "speed 0.7x")
+    await health("restarting", "speed 0.7x")
+    assert pipe.profile.name == "540p30-veryfast"
+    await health("ok")
+    assert manager.stats["step_ups"] == 0  # not stable for long enough yet
+    await asyncio.sleep(0.06)
+    await health("ok")
+    assert pipe.profile.name == "720p30-superfast"
+    assert restarts == ["profile stepped up to 720p30-superfast"]
+    await asyncio.sleep(0.03)
+    await health("slow")  # resets the stable period
+    await asyncio.sleep(0.03)
+    await health("ok")
+    assert manager.stats["step_ups"] == 1
+    await asyncio.sleep(0.06)
+    await health("ok")
+    await asyncio.sleep(0.06)
+    await health("ok")
+    assert pipe.profile == DEFAULT_PROFILE  # the calibrated ceiling
+    assert manager.stats["step_ups"] == 2
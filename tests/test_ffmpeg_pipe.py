@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from streamer.ffmpeg_pipe import FFmpegPipe
+from streamer.ffmpeg_pipe import FFmpegPipe, TeeOutput
 
 
 def test_ffmpeg_pipe_constructs_rtmp_command():
@@ -26,3 +26,44 @@ def test_ffmpeg_pipe_stop_terminates_process():
     pipe.stop()
     mock_proc.terminate.assert_called_once()
     assert pipe._process is None
+
+
+def test_ffmpeg_pipe_tees_encoder_into_segment_ring(tmp_path):
+    from streamer.segment_ring import SegmentRing
+    ring = SegmentRing(str(tmp_path), segment_seconds=2, buffer_seconds=60)
+    pipe = FFmpegPipe(rtmp_url="rtmp://live.twitch.tv/app/testkey", segments=ring)
+    cmd = pipe.build_command()
+    assert cmd.count("libx264") == 1  # encoded once, muxed twice
+    assert cmd[cmd.index("-f", cmd.index("-acodec")) + 1] == "tee"
+    outputs = cmd[-1].split("|")
+    assert outputs[0].startswith("[f=flv:onfail=ignore:") and outputs[0].endswith("]rtmp://live.twitch.tv/app/testkey")
+    assert "segment_wrap=30" in outputs[1] and outputs[1].endswith("seg%03d.ts")
+    assert "expr:gte(t,n_forced*2)" in cmd
+
+
+def test_ffmpeg_pipe_fans_out_one_encode_with_isolated_failures(tmp_path):
+    pipe = FFmpegPipe(
+        rtmp_url="rtmp://live.twitch.tv/app/testkey",
+        outputs=[TeeOutput.rtmp("rtmp://a.rtmp.youtube.com/live2/yt"), TeeOutput.recording(str(tmp_path / "rec"))],
+    )
+    cmd = pipe.build_command()
+    assert cmd.count("libx264") == 1
+    assert "-force_key_frames" not in cmd  # no ring, no forced keyframes
+    outputs = cmd[-1].split("|")
+    assert len(outputs) == 3
+    assert all("onfail=ignore" in out for out in outputs)
+    # Network targets reconnect behind a fifo; fifo options are escaped inside the slave spec.
+    assert "use_fifo=1" in outputs[1] and "attempt_recovery=1\\:" in outputs[1]
+    assert "use_fifo" not in outputs[2] and "segment_format=matroska" in outputs[2]
+
+
+def test_tee_output_escapes_separators_in_targets():
+    spec = TeeOutput("udp://239.0.0.1:1234?pkt_size=1316|x", "mpegts").spec()
+    assert spec.endswith("]udp://239.0.0.1:1234?pkt_size=1316\\|x")
+
+
+def test_ffmpeg_pipe_start_creates_local_output_dirs(tmp_path):
+    pipe = FFmpegPipe(rtmp_url="", outputs=[TeeOutput.recording(str(tmp_path / "rec"))])
+    with patch("streamer.ffmpeg_pipe.subprocess.Popen"):
+        pipe.start()
+    assert (tmp_path / "rec").is_dir()
@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import MagicMock
+from fastapi.testclient import TestClient
+
+from agents.analytics import AnalyticsAgent, create_app
+from agents.retrospective import StreamSummary
+from core.event_bus import EventBus
+from core.history import StreamHistory
+
+
+def _summary(stream_id: str, revenue_per_hour: float, engagement: float, activities=None) -> StreamSummary:
+    return StreamSummary(
+        stream_id=stream_id,
+        duration_minutes=60,
+        peak_viewers=100,
+        total_revenue=revenue_per_hour,
+        revenue_per_hour=revenue_per_hour,
+        top_activities=activities or ["talk"],
+        chat_messages=500,
+        engagement_score=engagement,
+    )
+
+
+@pytest.fixture
+def history():
+    h = StreamHistory(":memory:")
+    for i in range(5):
+        h.append(_summary(f"s{i}", revenue_per_hour=10.0 * i, engagement=50.0 - i), ended_at=1000.0 + i)
+    yield h
+    h.close()
+
+
+def test_history_append_and_count(history):
+    assert history.count() == 5
+    history.append(_summary("s0", 99.0, 10.0), ended_at=1000.0)
+    assert history.count() == 5
+
+
+def test_history_pages_newest_first_with_cursor(history):
+    first = history.query(limit=2)
+    assert [s["stream_id"] for s in first["streams"]] == ["s4", "s3"]
+    second = history.query(limit=2, cursor=first["next_cursor"])
+    assert [s["stream_id"] for s in second["streams"]] == ["s2", "s1"]
+    last = history.query(limit=2, cursor=second["next_cursor"])
+    assert [s["stream_id"] for s in last["streams"]] == ["s0"]
+    assert last["next_cursor"] is None
+
+
+def test_history_sort_and_filter(history):
+    page = history.query(sort="engagement", min_revenue=15.0)
+    assert [s["stream_id"] for s in page["streams"]] == ["s2", "s3", "s4"]
+
+
+def test_history_filters_by_activity(history):
+    history.append(_summary("qa", 5.0, 5.0, activities=["q_and_a", "talk"]), ended_at=2000.0)
+    page = history.query(activity="q_and_a")
+    assert [s["stream_id"] for s in page["streams"]] == ["qa"]
+    assert page["streams"][0]["top_activities"] == ["q_and_a", "talk"]
+
+
+def test_history_rejects_bad_cursor(history):
+    with pytest.raises(ValueError):
+        history.query(cursor="not-a-cursor")
+
+
+def test_history_mirrors_to_neo4j_in_batches(history):
+    db = MagicMock()
+    assert history.mirror_to_neo4j(db, batch_size=2) == 5
+    assert db.upsert_stream_summaries.call_count == 3
+    assert history.mirror_to_neo4j(db) == 0
+
+
+def test_history_endpoint_uses_store(history):
+    client = TestClient(create_app(AnalyticsAgent(EventBus()), history=history))
+    body = client.get("/api/streams/history", params={"limit": 3, "sort": "revenue"}).json()
+    assert [s["stream_id"] for s in body["streams"]] == ["s4", "s3", "s2"]
+    assert body["next_cursor"]
+    assert client.get("/api/streams/history", params={"sort": "nope"}).status_code == 400
+
+
+def test_history_shared_between_threads(history):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def write(i: int) -> None:
+        history.append(_summary(f"t{i}", 1.0, 1.0), ended_at=2000.0 + i)
+        history.query(limit=5)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(200)))
+    assert history.count() == 205
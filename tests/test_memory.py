@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from agents.memory import ConversationMemory, estimate_tokens, tally_summarizer
+
+SPEAK = {"name": "send_chat_response", "input": {"text": "hi chat"}}
+SWITCH = {"name": "set_activity", "input": {"activity": "talk"}}
+
+
+def test_memory_renders_recent_decisions_verbatim():
+    memory = ConversationMemory()
+    memory.record_decision("llm", "content: dead air", [SPEAK], now=100.0)
+    memory.record_decision("local", "rule: chat is busy", [SWITCH], now=130.0)
+    text = memory.render(now=140.0)
+    assert "- 40s ago: llm (content: dead air): send_chat_response(text='hi chat')" in text
+    assert "- 10s ago: local (rule: chat is busy): set_activity(activity='talk')" in text
+
+
+def test_memory_empty_renders_nothing():
+    assert ConversationMemory().render() == ""
+
+
+@pytest.mark.asyncio
+async def test_memory_compacts_evicted_turns_in_background():
+    memory = ConversationMemory(window=3)
+    for i in range(10):
+        memory.record_decision("llm", f"turn {i}", [SPEAK])
+    assert len(memory) == 3
+    await memory.flush()
+    assert "7 more decisions" in memory.summary
+    assert "turn 9" in memory.render()
+    assert "turn 0" not in memory.render()
+
+
+@pytest.mark.asyncio
+async def test_memory_stays_under_token_ceiling_over_long_stream():
+    memory = ConversationMemory(window=50, token_ceiling=400, summary_tokens=100)
+    for i in range(2000):
+        memory.record_decision("llm", "content: dead air", [{"name": "send_chat_response", "input": {"text": "x" * 80}}])
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    await memory.flush()
+    assert estimate_tokens(memory.render()) <= 400
+
+
+@pytest.mark.asyncio
+async def test_memory_falls_back_when_summarizer_fails():
+    async def broken(summary, turns):
+        raise RuntimeError("api down")
+
+    memory = ConversationMemory(window=1, summarizer=broken)
+    memory.record_decision("llm", "a", [SPEAK])
+    memory.record_decision("llm", "b", [SPEAK])
+    await memory.flush()
+    assert "1 more decisions" in memory.summary
+
+
+@pytest.mark.asyncio
+async def test_tally_summarizer_counts_actions():
+    summary = await tally_summarizer("", ["llm (x): send_chat_response(text='yo'), set_activity(activity='game')"])
+    assert "1 activity switches" in summary
+    assert "'yo'" in summary
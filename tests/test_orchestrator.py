@@ -1,50 +1,124 @@
+import asyncio
+import json
+import threading
+import time
 import pytest
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 from agents.analytics import MetricsCollector
-from core.bandit import ThompsonBandit, Action
+from core.bandit import Action, LinearThompsonBandit, ThompsonBandit
 
 
-def test_orchestrator_returns_tool_calls():
-    with patch("agents.orchestrator.Anthropic") as mock_anthropic:
+class FakeStream:
+    """Stands in for AsyncAnthropic().messages.stream(...): yields content_block_stop events."""
+
+    def __init__(self, blocks, delay: float = 0.0):
+        self._blocks = blocks
+        self._delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for i, block in enumerate(self._blocks):
+            await asyncio.sleep(self._delay)
+            yield SimpleNamespace(type="content_block_stop", index=i, content_block=block)
+
+    async def get_final_message(self):
+        usage = SimpleNamespace(input_tokens=100, output_tokens=20, cache_creation_input_tokens=0, cache_read_input_tokens=0)
+        return SimpleNamespace(content=self._blocks, usage=usage)
+
+
+def _tool_block(name, tool_input):
+    return SimpleNamespace(type="tool_use", name=name, input=tool_input)
+
+
+def _agent_with_stream(stream, **kwargs):
+    with patch("agents.orchestrator.AsyncAnthropic") as mock_anthropic:
         mock_client = MagicMock()
+        mock_client.messages.stream = MagicMock(return_value=stream)
         mock_anthropic.return_value = mock_client
-        mock_block = MagicMock()
-        mock_block.type = "tool_use"
-        mock_block.name = "send_chat_response"
-        mock_block.input = {"text": "hello chat!", "emotion": "happy"}
-        mock_response = MagicMock()
-        mock_response.content = [mock_block]
-        mock_client.messages.create.return_value = mock_response
-
         from agents.orchestrator import OrchestratorAgent
-        agent = OrchestratorAgent()
-        import asyncio
-        calls = asyncio.run(agent.decide("viewer count is 100"))
-        assert len(calls) == 1
-        assert calls[0]["name"] == "send_chat_response"
+        return OrchestratorAgent(**kwargs)
+
+
+def test_orchestrator_returns_tool_calls():
+    agent = _agent_with_stream(FakeStream([_tool_block("send_chat_response", {"text": "hello chat!", "emotion": "happy"})]))
+    calls = asyncio.run(agent.decide("viewer count is 100"))
+    assert len(calls) == 1
+    assert calls[0]["name"] == "send_chat_response"
 
 
 def test_orchestrator_ignores_text_blocks():
-    with patch("agents.orchestrator.Anthropic") as mock_anthropic:
-        mock_client = MagicMock()
-        mock_anthropic.return_value = mock_client
-        mock_block = MagicMock()
-        mock_block.type = "text"
-        mock_block.text = "just thinking..."
-        mock_response = MagicMock()
-        mock_response.content = [mock_block]
-        mock_client.messages.create.return_value = mock_response
+    agent = _agent_with_stream(FakeStream([SimpleNamespace(type="text", text="just thinking...")]))
+    calls = asyncio.run(agent.decide("idle stream"))
+    assert calls == []
 
-        from agents.orchestrator import OrchestratorAgent
-        agent = OrchestratorAgent()
-        import asyncio
-        calls = asyncio.run(agent.decide("idle stream"))
-        assert calls == []
+
+@pytest.mark.asyncio
+async def test_orchestrator_dispatches_each_tool_call_as_it_streams():
+    blocks = [
+        _tool_block("send_chat_response", {"text": "hi"}),
+        _tool_block("set_activity", {"activity": "talk"}),
+    ]
+    agent = _agent_with_stream(FakeStream(blocks, delay=0.05))
+    seen: list[tuple[str, int]] = []
+
+    async def on_call(call):
+        seen.append((call["name"], len(seen)))
+
+    task = asyncio.create_task(agent.decide("ctx", on_tool_call=on_call))
+    await asyncio.sleep(0.07)
+    assert seen == [("send_chat_response", 0)]
+    await task
+    assert [name for name, _ in seen] == ["send_chat_response", "set_activity"]
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_decide_times_out_with_partial_calls():
+    blocks = [_tool_block("send_chat_response", {"text": "hi"}), _tool_block("set_activity", {"activity": "talk"})]
+    agent = _agent_with_stream(FakeStream(blocks, delay=0.1), request_timeout=0.15)
+    calls = await agent.decide("ctx")
+    assert [c["name"] for c in calls] == ["send_chat_response"]
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_run_loop_publishes_and_cancel_stops_decision():
+    from agents.orchestrator import PolicyDecision
+    from core.event_bus import EventBus
+    from core.interfaces import EventType
+    bus = EventBus()
+    spoken = []
+
+    async def on_speak(event):
+        spoken.append(event.payload["text"])
+
+    bus.subscribe(EventType.SPEAK, on_speak)
+    blocks = [_tool_block("send_chat_response", {"text": "hi"}), _tool_block("send_chat_response", {"text": "late"})]
+    agent = _agent_with_stream(FakeStream(blocks, delay=0.05))
+    agent._policy.decide = MagicMock(return_value=PolicyDecision(escalate=True, reason="content"))
+    loop_task = asyncio.create_task(agent.run_loop(bus, poll_interval=10))
+    await asyncio.sleep(0.07)
+    assert agent.cancel() is True
+    await asyncio.sleep(0.05)
+    assert spoken == ["hi"]
+    assert not loop_task.done()
+    loop_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await loop_task
 
 
 def test_orchestrator_builds_context_with_metrics():
-    with patch("agents.orchestrator.Anthropic"):
+    with patch("agents.orchestrator.AsyncAnthropic"):
         from agents.orchestrator import OrchestratorAgent
         collector = MetricsCollector()
         collector.update_viewer_count(42)
@@ -56,7 +130,7 @@ def test_orchestrator_builds_context_with_metrics():
 
 
 def test_orchestrator_builds_context_with_bandit():
-    with patch("agents.orchestrator.Anthropic"):
+    with patch("agents.orchestrator.AsyncAnthropic"):
         from agents.orchestrator import OrchestratorAgent
         collector = MetricsCollector()
         bandit = ThompsonBandit(list(Action))
@@ -66,7 +140,7 @@ def test_orchestrator_builds_context_with_bandit():
 
 
 def test_orchestrator_builds_fallback_context_without_collector():
-    with patch("agents.orchestrator.Anthropic"):
+    with patch("agents.orchestrator.AsyncAnthropic"):
         from agents.orchestrator import OrchestratorAgent
         agent = OrchestratorAgent()
         context = agent._build_context()
@@ -74,7 +148,7 @@ def test_orchestrator_builds_fallback_context_without_collector():
 
 
 def test_orchestrator_records_action_to_bandit():
-    with patch("agents.orchestrator.Anthropic"):
+    with patch("agents.orchestrator.AsyncAnthropic"):
         from agents.orchestrator import OrchestratorAgent
         collector = MetricsCollector()
         collector.update_viewer_count(50)
@@ -83,3 +157,234 @@ def test_orchestrator_records_action_to_bandit():
         initial_alpha = bandit._arms[Action.QA]["alpha"]
         agent._record_action("q_and_a")
         assert bandit._arms[Action.QA]["alpha"] != initial_alpha or bandit._arms[Action.QA]["beta"] != 1.0
+
+
+def test_orchestrator_marks_checkpoint_dirty_instead_of_saving(tmp_path):
+    from core.checkpoint import StateCheckpointer
+    with patch("agents.orchestrator.AsyncAnthropic"):
+        from agents.orchestrator import OrchestratorAgent
+        bandit = ThompsonBandit(list(Action))
+        checkpointer = StateCheckpointer(bandit, str(tmp_path / "bandit.json"))
+        agent = OrchestratorAgent(collector=MetricsCollector(), bandit=bandit, checkpointer=checkpointer)
+        agent._record_action("talk")
+    assert checkpointer.dirty
+    assert not (tmp_path / "bandit.json").exists()
+
+
+def test_orchestrator_logs_bandit_decisions_for_offline_eval(tmp_path):
+    from core.bandit_eval import DecisionLog
+    with patch("agents.orchestrator.AsyncAnthropic"):
+        from agents.orchestrator import OrchestratorAgent
+        collector = MetricsCollector()
+        collector.update_viewer_count(50)
+        log = DecisionLog(str(tmp_path / "decisions.bin"))
+        agent = OrchestratorAgent(collector=collector, bandit=ThompsonBandit(list(Action)), decision_log=log)
+        agent._record_action("q_and_a")
+        agent._record_action("not_an_activity")
+    rows = log.load()
+    assert len(rows) == 1
+    assert rows["action"][0] == list(Action).index(Action.QA)
+    assert rows["propensity"][0] == 1.0
+
+
+def test_orchestrator_context_includes_triggering_events():
+    with patch("agents.orchestrator.AsyncAnthropic"):
+        from agents.orchestrator import OrchestratorAgent
+        agent = OrchestratorAgent(collector=MetricsCollector())
+        context = agent._build_context("talk", events=["heartbeat", "raid: bigstreamer raided with 80 viewers"])
+        assert "Just happened: raid: bigstreamer" in context
+        assert "heartbeat" not in context
+
+
+POLICY_INPUTS = {"viewer_count": 50, "chat_velocity": 10.0, "donations_per_hour": 0.0, "engagement_score": 40.0, "activity": "talk"}
+
+
+def test_local_policy_holds_on_routine_heartbeat():
+    from agents.orchestrator import LocalPolicy
+    policy = LocalPolicy()
+    decision = policy.decide(POLICY_INPUTS, ["heartbeat"], seconds_since_speech=10.0)
+    assert decision.tool_calls == [] and not decision.escalate
+    assert policy.escalation_rate == 0.0
+
+
+def test_local_policy_escalates_for_content():
+    from agents.orchestrator import LocalPolicy
+    policy = LocalPolicy()
+    assert policy.decide(POLICY_INPUTS, ["donation: a gave $20.00"], seconds_since_speech=5.0).escalate
+    assert policy.decide(POLICY_INPUTS, ["heartbeat"], seconds_since_speech=500.0).escalate
+    assert policy.escalation_rate == 1.0
+
+
+def test_local_policy_switches_activity_by_rule():
+    from agents.orchestrator import LocalPolicy
+    policy = LocalPolicy()
+    decision = policy.decide({**POLICY_INPUTS, "chat_velocity": 0.5, "activity": "q_and_a"}, ["heartbeat"], 5.0)
+    assert decision.tool_calls == [{"name": "set_activity", "input": {"activity": "talk"}}]
+    assert not decision.escalate
+
+
+def test_local_policy_follows_confident_bandit():
+    from agents.orchestrator import LocalPolicy
+    bandit = ThompsonBandit(list(Action))
+    for _ in range(20):
+        bandit.update(Action.GAME, reward=1.0)
+    policy = LocalPolicy(bandit, min_activity_seconds=0.0)
+    decision = policy.decide(POLICY_INPUTS, ["heartbeat"], seconds_since_speech=5.0)
+    assert decision.tool_calls[0]["input"]["activity"] == "game"
+
+
+def test_local_policy_follows_confident_contextual_bandit():
+    from agents.orchestrator import LocalPolicy
+    bandit = LinearThompsonBandit(list(Action), seed=0)
+    bandit.observe(POLICY_INPUTS)
+    for _ in range(20):
+        bandit.update(Action.QA, reward=1.0)
+        bandit.update(Action.TALK, reward=0.2)
+    policy = LocalPolicy(bandit, min_activity_seconds=0.0)
+    decision = policy.decide(POLICY_INPUTS, ["heartbeat"], seconds_since_speech=5.0)
+    assert decision.tool_calls[0]["input"]["activity"] == "q_and_a"
+
+
+def test_local_policy_escalates_when_bandit_undecided_on_timeout():
+    from agents.orchestrator import LocalPolicy
+    policy = LocalPolicy(ThompsonBandit(list(Action)))
+    decision = policy.decide(POLICY_INPUTS, ["activity timeout: current activity has run its course"], 5.0)
+    assert decision.escalate and decision.reason.startswith("uncertain")
+
+
+@pytest.mark.asyncio
+async def test_run_loop_skips_llm_when_local_tier_handles_it():
+    from agents.orchestrator import PolicyDecision
+    from core.event_bus import EventBus
+    agent = _agent_with_stream(FakeStream([]))
+    agent._policy.decide = MagicMock(return_value=PolicyDecision())
+    loop_task = asyncio.create_task(agent.run_loop(EventBus(), poll_interval=10))
+    await asyncio.sleep(0.02)
+    agent._client.messages.stream.assert_not_called()
+    loop_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await loop_task
+
+
+@pytest.mark.asyncio
+async def test_run_loop_voices_donation_replies_at_donation_priority():
+    from agents.orchestrator import PolicyDecision
+    from agents.scheduler import DecisionScheduler
+    from agents.speech_scheduler import PREEMPT_MARGIN, RESPONSE_PRIORITY, donation_priority
+    from core.event_bus import EventBus
+    from core.interfaces import Event, EventType
+    bus = EventBus()
+    priorities = []
+
+    async def on_speak(event):
+        priorities.append(event.priority)
+
+    bus.subscribe(EventType.SPEAK, on_speak)
+    scheduler = DecisionScheduler(bus, check_interval=10, min_interval=0)
+    agent = _agent_with_stream(FakeStream([_tool_block("send_chat_response", {"text": "hi"})]))
+    agent._policy.decide = MagicMock(return_value=PolicyDecision(escalate=True, reason="content"))
+    await bus.publish(Event(type=EventType.DONATION, payload={"username": "a", "amount": 20.0}))
+    await bus.publish(Event(type=EventType.DONATION, payload={"username": "b", "amount": 60.0}))
+    loop_task = asyncio.create_task(agent.run_loop(bus, scheduler=scheduler))
+    await asyncio.sleep(0.04)
+    await bus.publish(Event(type=EventType.RAID, payload={"username": "c", "viewers": 5}))
+    await asyncio.sleep(0.02)
+    loop_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await loop_task
+    assert priorities == [RESPONSE_PRIORITY, donation_priority(60.0), RESPONSE_PRIORITY]
+    assert RESPONSE_PRIORITY < PREEMPT_MARGIN
+
+
+def _sse(events: list[dict]) -> bytes:
+    return b"".join(f"event: {e['type']}\ndata: {json.dumps(e)}\n\n".encode() for e in events)
+
+
+@contextmanager
+def _mock_messages_api(requests: list[dict], cache_read: int):
+    """Local HTTP server answering POST /v1/messages with a streamed tool_use response."""
+    tool_input = json.dumps({"text": "hi chat", "emotion": "happy"})
+    body = _sse([
+        {"type": "message_start", "message": {
+            "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-opus-4-6",
+            "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": 50, "output_tokens": 1,
+                      "cache_creation_input_tokens": 0, "cache_read_input_tokens": cache_read},
+        }},
+        {"type": "content_block_start", "index": 0,
+         "content_block": {"type": "tool_use", "id": "tu_1", "name": "send_chat_response", "input": {}}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "input_json_delta", "partial_json": tool_input}},
+        {"type": "content_block_stop", "index": 0},
+        {"type": "message_delta", "delta": {"stop_reason": "tool_use", "stop_sequence": None},
+         "usage": {"output_tokens": 30}},
+        {"type": "message_stop"},
+    ])
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            requests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_requests_are_cacheable_against_mock_messages_api():
+    from anthropic import AsyncAnthropic
+    from agents.orchestrator import OrchestratorAgent
+    requests: list[dict] = []
+    agent = OrchestratorAgent(collector=MetricsCollector())
+    with _mock_messages_api(requests, cache_read=1200) as base_url:
+        agent._client = AsyncAnthropic(api_key="test", base_url=base_url)
+        calls = await agent.decide("Stream state: 10 viewers.")
+
+    assert calls == [{"name": "send_chat_response", "input": {"text": "hi chat", "emotion": "happy"}}]
+    body = requests[0]
+    assert body["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert body["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert all("cache_control" not in t for t in body["tools"][:-1])
+    assert body["messages"][-1] == {"role": "user", "content": "Stream state: 10 viewers."}
+    assert agent.budget.last.cache_read_input_tokens == 1200
+    assert agent.budget.last.output_tokens == 30
+    assert agent.budget.report()["cache_hit_rate"] > 0.9
+
+
+def test_orchestrator_request_puts_memory_before_context():
+    with patch("agents.orchestrator.AsyncAnthropic"):
+        from agents.orchestrator import OrchestratorAgent
+        agent = OrchestratorAgent()
+        agent.memory.record_decision("llm", "content: dead air", [{"name": "set_activity", "input": {"activity": "talk"}}])
+        content = agent._request("Stream state: now.")["messages"][-1]["content"]
+        assert "set_activity(activity='talk')" in content[0]["text"]
+        assert content[-1]["text"] == "Stream state: now."
+
+
+@pytest.mark.asyncio
+async def test_dead_air_counts_from_startup_and_any_speech():
+    from agents.orchestrator import PolicyDecision
+    from core.event_bus import EventBus
+    from core.interfaces import Event, EventType
+    bus = EventBus()
+    agent = _agent_with_stream(FakeStream([]))
+    agent._policy.decide = MagicMock(return_value=PolicyDecision())
+    loop_task = asyncio.create_task(agent.run_loop(bus, poll_interval=10))
+    await asyncio.sleep(0.02)
+    assert agent._policy.decide.call_args.kwargs["seconds_since_speech"] < 5
+    agent._last_speech -= 1000
+    await bus.publish(Event(type=EventType.SPEAK, payload={"text": "thanks!"}, source="donation_goals"))
+    assert time.monotonic() - agent._last_speech < 1
+    loop_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await loop_task
@@ -1,6 +1,10 @@
+import asyncio
+import base64
+import json
 import pytest
+import websockets
 from unittest.mock import AsyncMock, patch, MagicMock
-from agents.performer import Performer
+from agents.performer import FrontendLink, Performer
 
 
 @pytest.mark.asyncio
@@ -11,14 +15,11 @@ async def test_speak_calls_openai_tts():
         mock_instance = MagicMock()
         mock_instance.audio.speech.create = AsyncMock(return_value=mock_response)
         mock_openai_class.return_value = mock_instance
-        performer = Performer(frontend_url="http://localhost:12393")
-        with patch("agents.performer.websockets.connect") as mock_ws:
-            mock_ws_conn = AsyncMock()
-            mock_ws_conn.__aenter__ = AsyncMock(return_value=AsyncMock(send=AsyncMock()))
-            mock_ws_conn.__aexit__ = AsyncMock(return_value=False)
-            mock_ws.return_value = mock_ws_conn
-            await performer.speak("Hello chat!", emotion="happy")
-            mock_instance.audio.speech.create.assert_called_once()
+        link = MagicMock(send=AsyncMock(), close=AsyncMock())
+        performer = Performer(frontend_url="http://localhost:12393", link=link)
+        await performer.speak("Hello chat!", emotion="happy")
+        mock_instance.audio.speech.create.assert_called_once()
+        link.send.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -27,3 +28,233 @@ async def test_emotion_maps_to_expression():
     assert performer._get_expression("happy") == "smile"
     assert performer._get_expression("sad") == "sad"
     assert performer._get_expression("neutral") == "idle"
+
+
+class _Frontend:
+    """Local WS server recording what the link delivers; can drop every connection."""
+
+    def __init__(self, binary=False):
+        self.binary = binary
+        self.received = []
+        self.raw_bytes = 0
+        self.hellos = 0
+        self.connections = set()
+        self.server = None
+
+    async def handler(self, ws):
+        self.connections.add(ws)
+        try:
+            if self.binary:
+                await ws.send(json.dumps({"type": "hello", "accepts": ["binary-audio"]}))
+            async for raw in ws:
+                self.raw_bytes += len(raw.encode()) if isinstance(raw, str) else len(raw)
+                msg = json.loads(raw)
+                if msg.get("type") == "hello":
+                    self.hellos += 1
+                    continue
+                if msg.get("encoding") == "binary":
+                    chunks = [await ws.recv() for _ in range(msg["frames"])]
+                    self.raw_bytes += sum(len(c) for c in chunks)
+                    msg["audio_bytes"] = b"".join(chunks)
+                self.received.append(msg)
+                if msg.get("type") == "ping-me":
+                    await ws.send(json.dumps({"type": "pong-you", "n": msg["n"]}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(ws)
+
+    async def wait_for(self, n, timeout=2.0):
+        async def poll():
+            while len(self.received) < n:
+                await asyncio.sleep(0.005)
+        await asyncio.wait_for(poll(), timeout)
+
+    async def start(self, port=0):
+        self.server = await websockets.serve(self.handler, "127.0.0.1", port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_frontend_link_reuses_one_connection_in_order():
+    frontend = _Frontend()
+    port = await frontend.start()
+    link = FrontendLink(f"ws://127.0.0.1:{port}/ws")
+    try:
+        await asyncio.gather(*(link.send({"type": "expression", "value": str(i)}) for i in range(50)))
+        await frontend.wait_for(50)
+        assert [m["value"] for m in frontend.received] == [str(i) for i in range(50)]
+        assert link.stats["connects"] == 1
+    finally:
+        await link.close()
+        await frontend.stop()
+
+
+@pytest.mark.asyncio
+async def test_frontend_link_queues_while_down_and_reconnects():
+    frontend = _Frontend()
+    port = await frontend.start()
+    link = FrontendLink(f"ws://127.0.0.1:{port}/ws", min_backoff=0.02, max_backoff=0.05)
+    try:
+        await link.send({"type": "motion", "value": "wave"})
+        await frontend.wait_for(1)
+        await frontend.stop()
+        pending = asyncio.gather(*(link.send({"type": "motion", "value": f"m{i}"}) for i in range(3)))
+        await asyncio.sleep(0.1)
+        assert not pending.done()
+
+        await frontend.start(port)
+        await asyncio.wait_for(pending, 2.0)
+        await frontend.wait_for(4)
+        assert [m["value"] for m in frontend.received] == ["wave", "m0", "m1", "m2"]
+        assert link.stats["connects"] >= 2
+    finally:
+        await link.close()
+        await frontend.stop()
+
+
+@pytest.mark.asyncio
+async def test_frontend_link_send_times_out_and_drops_the_message():
+    frontend = _Frontend()
+    port = await frontend.start()
+    await frontend.stop()
+    link = FrontendLink(
+        f"ws://127.0.0.1:{port}/ws", min_backoff=0.02, max_backoff=0.05, hello_timeout=0.01, send_timeout=0.3,
+    )
+    try:
+        with pytest.raises(ConnectionError):
+            await link.send({"type": "speak", "value": "lost"})
+        assert link.stats["timeouts"] == 1
+        await frontend.start(port)
+        await link.send({"type": "speak", "value": "after"})
+        await frontend.wait_for(1)
+        await asyncio.sleep(0.05)
+        assert [m["value"] for m in frontend.received] == ["after"]
+    finally:
+        await link.close()
+        await frontend.stop()
+
+
+@pytest.mark.asyncio
+async def test_frontend_link_delivers_incoming_frames_to_handler():
+    frontend = _Frontend()
+    port = await frontend.start()
+    got = asyncio.Queue()
+    link = FrontendLink(f"ws://127.0.0.1:{port}/ws", on_message=got.put)
+    try:
+        await link.send({"type": "ping-me", "n": 7})
+        assert await asyncio.wait_for(got.get(), 1.0) == {"type": "pong-you", "n": 7}
+    finally:
+        await link.close()
+        await frontend.stop()
+
+
+@pytest.mark.asyncio
+async def test_frontend_link_close_fails_undelivered_messages():
+    link = FrontendLink("ws://127.0.0.1:9/ws", min_backoff=10.0)
+    send = asyncio.create_task(link.send({"type": "expression", "value": "smile"}))
+    await asyncio.sleep(0.05)
+    await link.close()
+    with pytest.raises(ConnectionError):
+        await send
+
+
+@pytest.mark.asyncio
+async def test_frontend_link_sends_binary_audio_frames_when_negotiated():
+    frontend = _Frontend(binary=True)
+    port = await frontend.start()
+    link = FrontendLink(f"ws://127.0.0.1:{port}/ws")
+    audio = bytes(range(256)) * 1000  # 256 KB -> 4 binary frames
+    try:
+        await link.send({"type": "speak", "text": "hi"}, audio)
+        await frontend.wait_for(1)
+        msg = frontend.received[0]
+        assert link.binary_audio
+        assert msg["encoding"] == "binary" and msg["frames"] == 4 and msg["bytes"] == len(audio)
+        assert msg["audio_bytes"] == audio
+        assert "audio" not in msg
+        assert frontend.hellos == 1
+        assert frontend.raw_bytes < len(audio) * 1.01
+        assert link.stats["bytes_sent"] == frontend.raw_bytes
+    finally:
+        await link.close()
+        await frontend.stop()
+
+
+@pytest.mark.asyncio
+async def test_frontend_link_falls_back_to_base64_for_legacy_frontend():
+    frontend = _Frontend(binary=False)
+    port = await frontend.start()
+    link = FrontendLink(f"ws://127.0.0.1:{port}/ws", hello_timeout=0.05)
+    try:
+        await link.send({"type": "speak", "text": "hi"}, b"\x00\x01audio")
+        await frontend.wait_for(1)
+        assert not link.binary_audio
+        assert frontend.hellos == 0
+        assert base64.b64decode(frontend.received[0]["audio"]) == b"\x00\x01audio"
+    finally:
+        await link.close()
+        await frontend.stop()
+
+
+@pytest.mark.asyncio
+async def test_frontend_link_counts_bytes_not_characters():
+    frontend = _Frontend()
+    port = await frontend.start()
+    link = FrontendLink(f"ws://127.0.0.1:{port}/ws", hello_timeout=0.05)
+    try:
+        await link.send({"type": "speak", "text": "héllo — chat ✨"})
+        await frontend.wait_for(1)
+        assert link.stats["bytes_sent"] == frontend.raw_bytes
+    finally:
+        await link.close()
+        await frontend.stop()
+
+
+def test_split_sentences_breaks_long_text_and_merges_fragments():
+    from agents.performer import split_sentences
+    assert split_sentences("Hello chat!") == ["Hello chat!"]
+    chunks = split_sentences(
+        "Wow! That is the best donation I have seen all week. "
+        "Thank you so much, really, you did not have to do that, I will remember it forever and ever, "
+        "no matter what chat says about it later tonight. Okay."
+    , max_chars=80)
+    assert chunks[0] == "Wow! That is the best donation I have seen all week."
+    assert all(len(c) <= 80 + len(" Okay.") for c in chunks)
+    assert " ".join(chunks).split() == (
+        "Wow! That is the best donation I have seen all week. "
+        "Thank you so much, really, you did not have to do that, I will remember it forever and ever, "
+        "no matter what chat says about it later tonight. Okay."
+    ).split()
+
+
+@pytest.mark.asyncio
+async def test_speak_streams_sentences_in_order_with_bounded_concurrency():
+    sent = []
+    link = MagicMock()
+    link.send = AsyncMock(side_effect=lambda msg, audio=None: sent.append({**msg, "audio": audio}))
+    with patch("agents.performer.AsyncOpenAI"):
+        performer = Performer(frontend_url="http://localhost:12393", link=link, tts_concurrency=2)
+    active, peak = 0, 0
+
+    async def synthesize(text, speed):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05 if text.startswith("First") else 0.01)
+        active -= 1
+        return text.encode()
+
+    performer._synthesize = synthesize
+    text = "First sentence is the slow one. Second sentence is quick. Third sentence is quick too. The fourth sentence ends it all."
+    await performer.speak(text, emotion="happy")
+
+    assert [m["seq"] for m in sent] == [0, 1, 2, 3]
+    assert [m["audio"].decode() for m in sent] == [m["text"] for m in sent]
+    assert sent[0]["text"].startswith("First") and sent[-1]["final"] and not sent[0]["final"]
+    assert len({m["utterance"] for m in sent}) == 1
+    assert peak == 2
@@ -65,3 +65,38 @@ def test_report_text_includes_key_stats():
     report = retro.format_report(summary)
     assert "45" in report
     assert "300" in report
+
+
+def test_retrospective_saves_summary_to_history():
+    from core.history import StreamHistory
+    history = StreamHistory(":memory:")
+    retro = StreamRetrospective(db=None, bandit=None, history=history)
+    summary = retro.build_summary(
+        stream_id="stream-002",
+        duration_minutes=60,
+        peak_viewers=80,
+        total_revenue=20.0,
+        top_activities=["talk"],
+        chat_messages=600,
+    )
+    retro.save_to_history(summary)
+    assert history.query()["streams"][0]["stream_id"] == "stream-002"
+
+
+def test_retrospective_mirrors_history_to_the_graph_and_retries_after_a_failure():
+    from unittest.mock import MagicMock
+    from core.history import StreamHistory
+    history = StreamHistory(":memory:")
+    db = MagicMock()
+    db.upsert_stream_summaries.side_effect = [ConnectionError("neo4j down"), None]
+    retro = StreamRetrospective(db=db, bandit=None, history=history)
+    first, second = (
+        retro.build_summary(stream_id=f"stream-00{i}", duration_minutes=60, peak_viewers=80,
+                            total_revenue=20.0, top_activities=["talk"], chat_messages=600)
+        for i in (3, 4)
+    )
+    with pytest.raises(ConnectionError):
+        retro.save_to_history(first)
+    retro.save_to_history(second)
+    mirrored = db.upsert_stream_summaries.call_args.args[0]
+    assert {row["stream_id"] for row in mirrored} == {"stream-003", "stream-004"}
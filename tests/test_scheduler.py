@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from agents.scheduler import HEARTBEAT, DecisionScheduler, inputs_changed
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+INPUTS = {"viewer_count": 100, "chat_velocity": 20.0, "donations_per_hour": 10.0, "engagement_score": 40.0, "activity": "talk"}
+
+
+def test_inputs_changed_ignores_small_moves():
+    assert inputs_changed(None, INPUTS)
+    assert not inputs_changed(INPUTS, {**INPUTS, "viewer_count": 103, "chat_velocity": 21.0})
+    assert inputs_changed(INPUTS, {**INPUTS, "viewer_count": 130})
+    assert inputs_changed(INPUTS, {**INPUTS, "activity": "game"})
+
+
+@pytest.mark.asyncio
+async def test_first_wait_returns_immediately():
+    scheduler = DecisionScheduler(EventBus())
+    assert await asyncio.wait_for(scheduler.wait(), 0.1) == [HEARTBEAT]
+
+
+@pytest.mark.asyncio
+async def test_raid_wakes_scheduler_early():
+    bus = EventBus()
+    scheduler = DecisionScheduler(bus, check_interval=10.0, min_interval=0.0)
+    scheduler.mark_decided(INPUTS, [HEARTBEAT])
+    waiter = asyncio.create_task(scheduler.wait())
+    await asyncio.sleep(0.01)
+    await bus.publish(Event(type=EventType.RAID, payload={"username": "bigstreamer", "viewers": 80}))
+    reasons = await asyncio.wait_for(waiter, 0.5)
+    assert reasons[0].startswith("raid: bigstreamer")
+    assert scheduler.should_decide(INPUTS, reasons)
+
+
+@pytest.mark.asyncio
+async def test_small_donation_does_not_wake():
+    bus = EventBus()
+    scheduler = DecisionScheduler(bus, check_interval=0.05, min_interval=0.0, donation_threshold=5.0)
+    scheduler.mark_decided(INPUTS, [HEARTBEAT])
+    await bus.publish(Event(type=EventType.DONATION, payload={"username": "a", "amount": 1.0}))
+    assert await scheduler.wait() == [HEARTBEAT]
+
+
+@pytest.mark.asyncio
+async def test_min_interval_is_enforced():
+    bus = EventBus()
+    scheduler = DecisionScheduler(bus, check_interval=10.0, min_interval=0.2)
+    scheduler.mark_decided(INPUTS, [HEARTBEAT])
+    scheduler.trigger("donation: x gave $50.00")
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await scheduler.wait()
+    assert loop.time() - start >= 0.19
+
+
+def test_heartbeat_skips_unchanged_inputs_until_max_interval():
+    scheduler = DecisionScheduler(EventBus(), max_interval=60.0)
+    scheduler.mark_decided(INPUTS, [HEARTBEAT])
+    assert not scheduler.should_decide(dict(INPUTS), [HEARTBEAT])
+    scheduler._last_decision -= 61.0
+    assert scheduler.should_decide(dict(INPUTS), [HEARTBEAT])
+
+
+@pytest.mark.asyncio
+async def test_chat_spike_triggers_once():
+    bus = EventBus()
+    scheduler = DecisionScheduler(bus, spike_min_velocity=20.0)
+    for _ in range(10):
+        await bus.publish(Event(type=EventType.CHAT_MESSAGE, payload={}))
+    spikes = [r for r in scheduler._pending if r.startswith("chat velocity spike")]
+    assert len(spikes) == 1
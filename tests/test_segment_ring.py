@@ -0,0 +1,64 @@
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from streamer.segment_ring import SEGMENT_LIST, Segment, SegmentRing, extract_clip, extract_command
+
+
+def _write_ring(directory, ends: dict[str, float], listed: list[str]) -> None:
+    """Fake what FFmpeg leaves behind: segment files finished at `ends`, and the csv list."""
+    for name, end in ends.items():
+        path = directory / name
+        path.write_bytes(b"\x47" * 188)
+        os.utime(path, (end, end))
+    rows = [f"{name},{i * 2.0:.6f},{(i + 1) * 2.0:.6f}" for i, name in enumerate(listed)]
+    (directory / SEGMENT_LIST).write_text("\n".join(rows) + "\n")
+
+
+def test_ring_size_is_bounded_by_buffer(tmp_path):
+    ring = SegmentRing(str(tmp_path), segment_seconds=2, buffer_seconds=120)
+    assert ring.wrap == 60
+    options = ring.muxer_options()
+    assert options["segment_wrap"] == "60"
+    assert options["segment_list_size"] == "59"
+
+
+def test_segments_map_to_wall_clock_and_skip_rewritten_slot(tmp_path):
+    base = 1_700_000_000.0
+    listed = ["seg000.ts", "seg001.ts", "seg002.ts"]
+    ends = {"seg000.ts": base + 500.0, "seg001.ts": base + 2, "seg002.ts": base + 4}  # seg000 reopened
+    _write_ring(tmp_path, ends, listed)
+    segments = SegmentRing(str(tmp_path)).segments()
+    assert [s.path.name for s in segments] == ["seg001.ts", "seg002.ts"]
+    assert segments[0].start == pytest.approx(base)
+    assert segments[0].duration == pytest.approx(2.0)
+
+
+def test_window_selects_overlapping_segments(tmp_path):
+    base = 1_700_000_000.0
+    names = [f"seg{i:03d}.ts" for i in range(10)]
+    _write_ring(tmp_path, {name: base + 2 * (i + 1) for i, name in enumerate(names)}, names)
+    ring = SegmentRing(str(tmp_path))
+    window = ring.window(base + 5.0, base + 9.0)
+    assert [s.path.name for s in window] == ["seg002.ts", "seg003.ts", "seg004.ts"]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_times_out_without_segments(tmp_path):
+    assert not await SegmentRing(str(tmp_path)).wait_for(1e12, timeout=0.05, poll=0.01)
+
+
+def test_extract_command_is_stream_copy(tmp_path):
+    segments = [Segment(tmp_path / f"seg{i:03d}.ts", i * 2.0, i * 2.0 + 2) for i in range(3)]
+    cmd = extract_command(segments, tmp_path / "clip.mp4")
+    assert cmd[cmd.index("-i") + 1] == "concat:" + "|".join(str(s.path) for s in segments)
+    assert cmd[cmd.index("-c") + 1] == "copy"
+    assert "libx264" not in cmd
+
+
+@pytest.mark.asyncio
+async def test_extract_clip_raises_on_ffmpeg_failure(tmp_path):
+    proc = MagicMock(returncode=1)
+    proc.communicate = AsyncMock(return_value=(b"", b"concat:...: No such file"))
+    with patch("streamer.segment_ring.asyncio.create_subprocess_exec", AsyncMock(return_value=proc)):
+        with pytest.raises(RuntimeError, match="No such file"):
+            await extract_clip([Segment(tmp_path / "seg000.ts", 0.0, 2.0)], tmp_path / "clips" / "x.mp4")
@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from agents.speech_scheduler import DONATION_PRIORITY, RESPONSE_PRIORITY, SpeechScheduler, donation_priority
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+
+
+class _Performer:
+    """Records what reaches the avatar; each line takes `speak_time` to voice."""
+
+    def __init__(self, speak_time: float = 0.05) -> None:
+        self.speak_time = speak_time
+        self.log: list[tuple] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def speak(self, text: str, emotion: str = "neutral") -> None:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            self.log.append(("start", text))
+            await asyncio.sleep(self.speak_time)
+            self.log.append(("done", text))
+        finally:
+            self.active -= 1
+
+    async def interrupt(self) -> None:
+        self.log.append(("interrupt",))
+
+    async def set_expression(self, value: str) -> None:
+        self.log.append(("expression", value))
+        await asyncio.sleep(0.01)
+
+    async def set_motion(self, value: str) -> None:
+        self.log.append(("motion", value))
+
+
+def _speak(text: str, priority: int) -> Event:
+    return Event(type=EventType.SPEAK, payload={"text": text}, priority=priority, source="test")
+
+
+async def _drain(scheduler: SpeechScheduler) -> None:
+    while scheduler.current or scheduler.pending:
+        await asyncio.sleep(0.01)
+
+
+def test_donation_priority_scales_with_amount():
+    assert donation_priority(1.0) == DONATION_PRIORITY
+    assert donation_priority(50.0) > donation_priority(5.0)
+    assert donation_priority(10_000.0) == DONATION_PRIORITY + 10
+
+
+@pytest.mark.asyncio
+async def test_one_line_at_a_time_in_priority_order():
+    bus, performer = EventBus(), _Performer()
+    scheduler = SpeechScheduler(bus, performer, preempt_margin=100)
+    scheduler.start()
+    await bus.publish(_speak("filler", 0))
+    await asyncio.sleep(0.01)
+    for text, priority in [("chat a", 10), ("chat b", 10), ("thanks", 25)]:
+        await bus.publish(_speak(text, priority))
+    await _drain(scheduler)
+    await scheduler.close()
+    started = [entry[1] for entry in performer.log if entry[0] == "start"]
+    assert started == ["filler", "thanks", "chat a", "chat b"]
+    assert performer.max_active == 1
+    assert scheduler.stats["spoken"] == 4
+
+
+@pytest.mark.asyncio
+async def test_high_priority_line_preempts_current_speech():
+    bus, performer = EventBus(), _Performer(speak_time=1.0)
+    scheduler = SpeechScheduler(bus, performer, preempt_margin=10)
+    scheduler.start()
+    await bus.publish(_speak("long filler", 0))
+    await asyncio.sleep(0.02)
+    performer.speak_time = 0.02
+    await bus.publish(_speak("big donation", donation_priority(100.0)))
+    await asyncio.wait_for(_drain(scheduler), 0.5)
+    await scheduler.close()
+    assert ("done", "long filler") not in performer.log
+    assert performer.log[-3:] == [("interrupt",), ("start", "big donation"), ("done", "big donation")]
+    assert scheduler.stats["preempted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_small_priority_gap_waits_its_turn():
+    bus, performer = EventBus(), _Performer(speak_time=0.05)
+    scheduler = SpeechScheduler(bus, performer, preempt_margin=10)
+    scheduler.start()
+    await bus.publish(_speak("reply", RESPONSE_PRIORITY))
+    await asyncio.sleep(0.01)
+    await bus.publish(_speak("small donation", donation_priority(5.0)))
+    await _drain(scheduler)
+    await scheduler.close()
+    assert ("interrupt",) not in performer.log
+    assert scheduler.stats["spoken"] == 2
+
+
+@pytest.mark.asyncio
+async def test_only_large_donations_preempt_a_reply():
+    bus, performer = EventBus(), _Performer(speak_time=0.1)
+    scheduler = SpeechScheduler(bus, performer)
+    scheduler.start()
+    await bus.publish(_speak("reply", RESPONSE_PRIORITY))
+    await asyncio.sleep(0.01)
+    await bus.publish(_speak("thanks for the $1", donation_priority(1.0)))
+    await bus.publish(_speak("thanks for the $5", donation_priority(5.0)))
+    await asyncio.sleep(0.02)
+    assert scheduler.stats["preempted"] == 0
+    await bus.publish(_speak("thanks for the $50", donation_priority(50.0)))
+    await _drain(scheduler)
+    await scheduler.close()
+    assert ("done", "reply") not in performer.log
+    started = [entry[1] for entry in performer.log if entry[0] == "start"]
+    assert started == ["reply", "thanks for the $50", "thanks for the $1", "thanks for the $5"]
+    assert scheduler.stats["preempted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_and_overflow_lines_are_dropped():
+    scheduler = SpeechScheduler(EventBus(), _Performer(), stale_after=0.0, max_queue=2)
+    for i, priority in enumerate([5, 1, 9]):
+        scheduler.submit(f"line {i}", priority=priority)
+    assert [job.priority for job in scheduler.pending] == [9, 5]
+    assert scheduler.stats["dropped_overflow"] == 1
+    await asyncio.sleep(0.001)
+    assert scheduler._next_job() is None
+    assert scheduler.stats["dropped_stale"] == 2
+
+
+@pytest.mark.asyncio
+async def test_expression_bursts_collapse_to_latest():
+    bus, performer = EventBus(), _Performer()
+    scheduler = SpeechScheduler(bus, performer)
+    scheduler.start()
+    for value in ["smile", "sad", "angry", "surprised"]:
+        await bus.publish(Event(type=EventType.SET_EXPRESSION, payload={"expression": value}))
+        await bus.publish(Event(type=EventType.SET_MOTION, payload={"motion": f"wave-{value}"}))
+    await asyncio.sleep(0.05)
+    await scheduler.close()
+    expressions = [value for kind, value in performer.log if kind == "expression"]
+    motions = [value for kind, value in performer.log if kind == "motion"]
+    # The first value goes out at once; everything after it collapses into the last.
+    assert len(expressions) <= 2 and expressions[-1] == "surprised"
+    assert len(motions) <= 2 and motions[-1] == "wave-surprised"
+    assert scheduler.stats["coalesced"] + len(expressions) + len(motions) == 8
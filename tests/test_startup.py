@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from core.event_bus import EventBus
+from core.interfaces import Event, EventType
+from streamer.startup import StreamerStartup
+
+
+class _FakeCapture:
+    def __init__(self, open_for: float = 0.2, ready_after: int = 1) -> None:
+        self.open_for = open_for
+        self.ready_after = ready_after
+        self.log: list[str] = []
+
+    async def open(self) -> None:
+        self.log.append("open")
+        await asyncio.sleep(self.open_for)
+        self.log.append("opened")
+
+    async def wait_ready(self, timeout: float = 30.0, retry: float = 1.0) -> bool:
+        await asyncio.sleep(0.01)
+        self.ready_after -= 1
+        return self.ready_after <= 0
+
+    async def stop(self) -> None:
+        self.log.append("stopped")
+
+
+class _FakeSupervisor:
+    def __init__(self, bus: EventBus, log: list[str], fail: bool = False) -> None:
+        self._bus = bus
+        self._log = log
+        self._fail = fail
+
+    async def run(self) -> None:
+        self._log.append("encoder")
+        try:
+            await self._bus.publish(Event(type=EventType.ENCODER_HEALTH, payload={"status": "ok"}))
+            if self._fail:
+                raise FileNotFoundError("ffmpeg")
+            await asyncio.Event().wait()
+        finally:
+            self._log.append("encoder stopped")
+
+
+class _FakeProfiles:
+    def __init__(self, log: list[str], cached: bool) -> None:
+        self._log = log
+        self.cached = object() if cached else None
+
+    async def calibrate(self) -> None:
+        self._log.append("calibrate")
+        await asyncio.sleep(0 if self.cached else 0.05)
+        self._log.append("calibrated")
+
+
+def _startup(capture: _FakeCapture, fail: bool = False, profiles: _FakeProfiles | None = None) -> StreamerStartup:
+    bus = EventBus()
+    return StreamerStartup(bus, capture, _FakeSupervisor(bus, capture.log, fail), profiles, ready_timeout=0.05)
+
+
+@pytest.mark.asyncio
+async def test_encoder_goes_live_while_browser_is_still_launching():
+    capture = _FakeCapture(open_for=0.2, ready_after=3)
+    startup = _startup(capture)
+    with patch("streamer.startup.shutil.which", return_value="/usr/bin/ffmpeg"):
+        task = asyncio.create_task(startup.run())
+        while "avatar" not in startup.timings:
+            await asyncio.sleep(0.01)
+        startup.stop()
+        await task
+    assert capture.log.index("encoder") < capture.log.index("opened")
+    assert startup.timings["encoder"] < startup.timings["browser"] <= startup.timings["avatar"]
+    assert capture.log[-2:] == ["encoder stopped", "stopped"]
+
+
+@pytest.mark.asyncio
+async def test_encoder_failure_shuts_the_browser_down():
+    capture = _FakeCapture(open_for=0.01)
+    startup = _startup(capture, fail=True)
+    with patch("streamer.startup.shutil.which", return_value="/usr/bin/ffmpeg"), pytest.raises(FileNotFoundError):
+        await startup.run()
+    assert capture.log[-1] == "stopped"
+
+
+@pytest.mark.asyncio
+async def test_missing_ffmpeg_fails_fast_and_cleans_up():
+    capture = _FakeCapture(open_for=0.5)
+    startup = _startup(capture)
+    with patch("streamer.startup.shutil.which", return_value=None), pytest.raises(RuntimeError, match="ffmpeg"):
+        await asyncio.wait_for(startup.run(), 0.3)
+    assert "encoder" not in capture.log and capture.log[-1] == "stopped"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cached", [False, True])
+async def test_calibration_runs_before_the_browser_unless_cached(cached):
+    capture = _FakeCapture(open_for=0.05)
+    startup = _startup(capture, profiles=_FakeProfiles(capture.log, cached))
+    with patch("streamer.startup.shutil.which", return_value="/usr/bin/ffmpeg"):
+        task = asyncio.create_task(startup.run())
+        while "avatar" not in startup.timings:
+            await asyncio.sleep(0.01)
+        startup.stop()
+        await task
+    if cached:  # loading the cached profile overlaps the browser launch
+        assert capture.log.index("open") < capture.log.index("calibrated")
+    else:
+        assert capture.log[:3] == ["calibrate", "calibrated", "open"]
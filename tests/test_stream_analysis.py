@@ -0,0 +1,88 @@
+import time
+import numpy as np
+from agents.retrospective import StreamRetrospective, StreamSummary
+from agents.stream_analysis import analyze
+from core.archive import StreamArchive, activity_code
+
+
+def _write_stream(archive, stream_id, started_at, seconds=3600, rate=20.0, activity="talk", fade=False):
+    t = np.arange(seconds, dtype=np.float64)
+    engagement = np.full(seconds, 60.0)
+    if fade:
+        engagement = np.linspace(80.0, 20.0, seconds)
+    zeros = np.zeros(seconds)
+    archive.write(stream_id, {
+        "t": t,
+        "viewer_count": np.full(seconds, 100),
+        "chat_velocity": np.full(seconds, 20.0),
+        "donations_per_hour": np.full(seconds, rate),
+        "engagement_score": engagement,
+        "revenue": t / 3600 * rate,
+        "activity": np.full(seconds, activity_code(activity)),
+        "chat_messages": np.ones(seconds),
+        "donations": zeros,
+        "subscriptions": zeros,
+        "raids": zeros,
+    }, started_at=started_at)
+
+
+def test_analyze_compares_revenue_and_activities(tmp_path):
+    archive = StreamArchive(str(tmp_path))
+    _write_stream(archive, "s1", 1.0, rate=10.0, activity="talk")
+    _write_stream(archive, "s2", 2.0, rate=30.0, activity="q_and_a")
+    report = analyze(archive)
+    assert report.stream_count == 2
+    np.testing.assert_allclose(report.revenue_per_hour, [10.0, 30.0], rtol=0.01)
+    assert report.best_activity == "q_and_a"
+    assert report.activity_effects["talk"]["chat_per_minute"] == 60.0
+
+
+def test_analyze_detects_late_dropoff(tmp_path):
+    archive = StreamArchive(str(tmp_path))
+    _write_stream(archive, "s1", 1.0, fade=True)
+    assert analyze(archive).late_dropoff() < 0.7
+
+
+def test_analyze_empty_archive(tmp_path):
+    report = analyze(StreamArchive(str(tmp_path)))
+    assert report.stream_count == 0
+    assert report.best_activity is None
+
+
+def test_analyze_hundreds_of_streams_quickly(tmp_path):
+    archive = StreamArchive(str(tmp_path))
+    for i in range(200):
+        _write_stream(archive, f"s{i:03d}", float(i), seconds=7200, rate=float(i % 40))
+    start = time.perf_counter()
+    report = analyze(archive, n=200)
+    assert report.stream_count == 200
+    assert time.perf_counter() - start < 5.0
+
+
+def test_recommendations_draw_on_history(tmp_path):
+    archive = StreamArchive(str(tmp_path))
+    for i in range(3):
+        _write_stream(archive, f"s{i}", float(i), rate=40.0, activity="q_and_a")
+    retro = StreamRetrospective(db=None, bandit=None, archive=archive)
+    summary = StreamSummary(
+        stream_id="now", duration_minutes=60, peak_viewers=100, total_revenue=12.0,
+        revenue_per_hour=12.0, top_activities=["talk"], chat_messages=3000, engagement_score=50.0,
+    )
+    recs = retro.generate_recommendations(summary)
+    assert any("median" in r for r in recs)
+    assert any(r.startswith("q_and_a") for r in recs)
+
+
+def test_report_uses_the_baseline_taken_before_archiving(tmp_path):
+    archive = StreamArchive(str(tmp_path))
+    for i in range(3):
+        _write_stream(archive, f"s{i}", float(i), rate=40.0, activity="q_and_a")
+    retro = StreamRetrospective(db=None, bandit=None, archive=archive)
+    past = retro.cross_stream_report()
+    _write_stream(archive, "now", 3.0, rate=1.0, activity="talk")
+    summary = StreamSummary(
+        stream_id="now", duration_minutes=60, peak_viewers=100, total_revenue=1.0,
+        revenue_per_hour=1.0, top_activities=["talk"], chat_messages=3000, engagement_score=50.0,
+    )
+    assert "3-stream median of $40.00" in retro.format_report(summary, past)
+    assert "4-stream median" in retro.format_report(summary)
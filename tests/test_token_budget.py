@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+from agents.token_budget import CallUsage, TokenBudget
+
+
+def test_call_usage_from_sdk_usage_handles_missing_cache_fields():
+    usage = CallUsage.from_usage(SimpleNamespace(input_tokens=10, output_tokens=5, cache_creation_input_tokens=None))
+    assert usage.cache_creation_input_tokens == 0
+    assert usage.cache_read_input_tokens == 0
+    assert usage.total_tokens == 15
+
+
+def test_cached_tokens_cost_less_than_uncached():
+    uncached = CallUsage(input_tokens=2000, output_tokens=100)
+    cached = CallUsage(input_tokens=200, cache_read_input_tokens=1800, output_tokens=100)
+    assert cached.cost() < uncached.cost()
+
+
+def test_budget_rolls_over_hourly_window():
+    budget = TokenBudget(hourly_token_limit=1000)
+    budget.record(CallUsage(input_tokens=900, output_tokens=200), now=0.0)
+    assert budget.exhausted(now=10.0)
+    assert not budget.exhausted(now=3700.0)
+    assert budget.lifetime.input_tokens == 900
+
+
+def test_budget_report_tracks_cache_hit_rate():
+    budget = TokenBudget()
+    budget.record(CallUsage(input_tokens=100, cache_creation_input_tokens=900, output_tokens=50, latency=1.0))
+    budget.record(CallUsage(input_tokens=100, cache_read_input_tokens=900, output_tokens=50, latency=0.5))
+    report = budget.report()
+    assert report["calls"] == 2
+    assert report["cache_hit_rate"] == 0.45
+    assert report["avg_latency"] == 0.75
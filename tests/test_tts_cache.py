@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from agents.donation_goals import GOAL_COMPLETE_TEMPLATE
+from agents.chat_agent import SUB_RESPONSES
+from agents.tts_cache import TTSCache, cache_key, template_lines
+
+
+def test_cache_key_depends_on_voice_and_speed():
+    assert cache_key("hi chat", "nova", 1.0) == cache_key(" hi chat ", "nova", 1.0)
+    assert cache_key("hi chat", "nova", 1.0) != cache_key("hi chat", "nova", 1.1)
+    assert cache_key("hi chat", "nova", 1.0) != cache_key("hi chat", "alloy", 1.0)
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_is_lru_bounded():
+    cache = TTSCache(memory_bytes=10)
+    await cache.put("a", "nova", 1.0, b"aaaa")
+    await cache.put("b", "nova", 1.0, b"bbbb")
+    assert await cache.get("a", "nova", 1.0) == b"aaaa"  # a is now most recent
+    await cache.put("c", "nova", 1.0, b"cccc")
+    assert await cache.get("b", "nova", 1.0) is None
+    assert await cache.get("a", "nova", 1.0) == b"aaaa"
+    report = cache.report()
+    assert report["memory_bytes"] <= 10
+    assert report["memory_hits"] == 2 and report["misses"] == 1
+    assert cache.hit_rate == pytest.approx(2 / 3)
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart_and_promotes_to_memory(tmp_path):
+    first = TTSCache(root=str(tmp_path))
+    await first.put("welcome in raiders", "nova", 1.0, b"\x01" * 100)
+
+    second = TTSCache(root=str(tmp_path))
+    assert second.report()["disk_entries"] == 1
+    assert await second.get("welcome in raiders", "nova", 1.0) == b"\x01" * 100
+    assert await second.get("welcome in raiders", "nova", 1.0) == b"\x01" * 100
+    assert second.stats["disk_hits"] == 1 and second.stats["memory_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = TTSCache(root=str(tmp_path), memory_bytes=0, disk_bytes=250)
+    for name in ("one", "two", "three"):
+        await cache.put(name, "nova", 1.0, b"x" * 100)
+    assert cache.report()["disk_entries"] == 2
+    assert await cache.get("one", "nova", 1.0) is None
+    assert await cache.get("three", "nova", 1.0) == b"x" * 100
+    assert len(list(tmp_path.glob("??/*.mp3"))) == 2
+
+
+def test_template_lines_fill_bindings():
+    lines = template_lines(
+        [SUB_RESPONSES[1], GOAL_COMPLETE_TEMPLATE, "Thanks for hanging out tonight. See you next stream, {username}!"],
+        bindings=[{"username": "ali"}, {"description": "new mic"}],
+    )
+    assert "ali just subscribed!! welcome to the chaos ali we're so glad you're here" in lines
+    assert "WE HIT THE GOAL — new mic!! THANK YOU CHAT" in lines
+    assert "Thanks for hanging out tonight." in lines
+    assert not any("{" in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_performer_uses_cache_and_coalesces_identical_requests():
+    response = MagicMock(content=b"audio")
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.02)
+        return response
+
+    with patch("agents.performer.AsyncOpenAI") as openai_class:
+        openai_class.return_value.audio.speech.create = AsyncMock(side_effect=slow_create)
+        from agents.performer import Performer
+        link = MagicMock(send=AsyncMock())
+        performer = Performer(frontend_url="http://localhost:12393", link=link, cache=TTSCache())
+        create = openai_class.return_value.audio.speech.create
+
+        await asyncio.gather(*(performer.speak("we are SO back chat", "happy") for _ in range(3)))
+        assert create.await_count == 1
+        await performer.speak("we are SO back chat", "happy")
+        assert create.await_count == 1
+        assert link.send.await_count == 4
+
+        assert await performer.prewarm(["okay chat, hot take incoming"], emotions=("neutral", "happy")) == 2
+        assert await performer.prewarm(["okay chat, hot take incoming"], emotions=("neutral", "happy")) == 0
+        assert create.await_count == 3
@@ -18,26 +18,33 @@ class TwitchBridge:
     sending the next, so OLV always finishes responding before getting a new input.
     """
 
-    def __init__(self, queue: PriorityMessageQueue) -> None:
+    def __init__(self, queue: PriorityMessageQueue, url: str = OLV_WS_URL) -> None:
         self._queue = queue
+        self._url = url
         self._ready = asyncio.Event()
 
     async def run(self) -> None:
         """Main run loop — reconnects whenever the OLV WebSocket drops."""
         while True:
             try:
-                logger.info(f"[bridge] Connecting to {OLV_WS_URL}")
-                async with websockets.connect(OLV_WS_URL) as ws:
+                logger.info(f"[bridge] Connecting to {self._url}")
+                async with websockets.connect(self._url) as ws:
                     logger.info("[bridge] Connected to Open-LLM-VTuber")
                     self._ready.set()  # fresh session — ready to accept first message
 
                     receiver = asyncio.create_task(self._receive_loop(ws))
                     sender = asyncio.create_task(self._send_loop(ws))
 
-                    done, pending = await asyncio.wait(
-                        [receiver, sender],
-                        return_when=asyncio.FIRST_COMPLETED,
-                    )
+                    try:
+                        done, pending = await asyncio.wait(
+                            [receiver, sender],
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                    except asyncio.CancelledError:
+                        receiver.cancel()
+                        sender.cancel()
+                        await asyncio.gather(receiver, sender, return_exceptions=True)
+                        raise
                     for t in pending:
                         t.cancel()
                         try:
@@ -1,18 +1,41 @@
 import asyncio
 import signal
+from datetime import datetime, timezone
 import uvicorn
 import twitchio
 from core.config import settings
 from core.event_bus import EventBus
 from core.interfaces import Event, EventType, ChatMessage
-from core.bandit import ThompsonBandit, Action
+from core.bandit import Action, LinearThompsonBandit, ThompsonBandit
+from core.bandit_eval import DecisionLog
+from core.checkpoint import StateCheckpointer
+from core.db import Neo4jDB
+from core.history import StreamHistory
+from core.archive import StreamArchive, StreamRecorder
 from twitch_client.priority_queue import PriorityMessageQueue
 from twitch_client.bridge import TwitchBridge
+from streamer.segment_ring import SEGMENT_DIR, SegmentRing
 from agents.analytics import AnalyticsAgent, MetricsCollector, create_app
+from agents.clip_agent import ClipExtractor, MomentDetector
+from agents.clip_jobs import ClipJobQueue
+from agents.chat_agent import DONATION_RESPONSES_NEW, DONATION_RESPONSES_RETURNING, SUB_RESPONSES
+from agents.donation_goals import GOAL_COMPLETE_TEMPLATE, DonationGoalTracker
 from agents.orchestrator import OrchestratorAgent
+from agents.performer import Performer
 from agents.retrospective import StreamRetrospective
+from agents.speech_scheduler import SpeechScheduler
+from agents.tts_cache import TTSCache, template_lines
 
 BANDIT_STATE_PATH = "data/bandit_state.json"
+LINEAR_BANDIT_STATE_PATH = "data/linear_bandit_state.json"
+BANDIT_CHECKPOINT_GENERATIONS = 5
+BANDIT_DECISION_LOG_PATH = "data/bandit_decisions.bin"
+STREAM_HISTORY_PATH = "data/stream_history.db"
+STREAM_ARCHIVE_DIR = "data/archive"
+CLIPS_DIR = "data/clips"
+CLIP_JOBS_PATH = "data/clip_jobs.json"
+DONATION_GOALS_PATH = "data/donation_goals.json"
+TTS_CACHE_DIR = "data/tts_cache"
 
 
 class VTuberBot(twitchio.Client):
@@ -54,12 +77,23 @@ class VTuberBot(twitchio.Client):
         print(f"[error] {type(error).__name__}: {error} | data={data!r}")
 
 
-async def run_retrospective(analytics: AnalyticsAgent, bandit: ThompsonBandit) -> None:
+async def run_retrospective(
+    analytics: AnalyticsAgent,
+    bandit: ThompsonBandit | LinearThompsonBandit,
+    history: StreamHistory | None = None,
+    recorder: StreamRecorder | None = None,
+    checkpointer: StateCheckpointer | None = None,
+) -> None:
     """Run post-stream retrospective: summarize, update bandit, save state."""
-    retro = StreamRetrospective(db=None, bandit=bandit)
+    checkpointer = checkpointer or StateCheckpointer(bandit, BANDIT_STATE_PATH)
+    archive = StreamArchive(STREAM_ARCHIVE_DIR)
+    db = Neo4jDB(settings.neo4j_uri, settings.neo4j_username, settings.neo4j_password) if settings.neo4j_uri else None
+    retro = StreamRetrospective(db=db, bandit=bandit, history=history, archive=archive)
     data = analytics.get_stream_summary_data()
+    started = datetime.fromtimestamp(analytics._stream_start, tz=timezone.utc)
+    stream_id = f"stream-{started:%Y%m%d-%H%M%S}"
     summary = retro.build_summary(
-        stream_id="live",
+        stream_id=stream_id,
         duration_minutes=data["duration_minutes"],
         peak_viewers=data["peak_viewers"],
         total_revenue=data["total_revenue"],
@@ -67,8 +101,21 @@ async def run_retrospective(analytics: AnalyticsAgent, bandit: ThompsonBandit) -
         chat_messages=data["chat_messages"],
     )
     retro.update_bandit(summary)
-    bandit.save(BANDIT_STATE_PATH)
-    report = retro.format_report(summary)
+    checkpointer.mark_dirty()
+    await checkpointer.flush()
+    try:
+        await asyncio.to_thread(retro.save_to_history, summary)
+    except Exception as e:
+        # The summary is in SQLite already; unmirrored rows go out after the next stream.
+        print(f"[retro] Neo4j mirror failed ({type(e).__name__}: {e})")
+    finally:
+        if db:
+            db.close()
+    # Judge this stream against past ones only: archive it after the cross-stream report.
+    past = retro.cross_stream_report()
+    if recorder and len(recorder):
+        recorder.save(archive, stream_id)
+    report = retro.format_report(summary, past)
     print("\n" + report + "\n")
 
 
@@ -76,16 +123,32 @@ async def main() -> None:
     bus = EventBus()
     queue = PriorityMessageQueue()
     collector = MetricsCollector()
-    bandit = ThompsonBandit.load_or_create(BANDIT_STATE_PATH)
+    if settings.bandit_backend == "linear":
+        bandit_path = LINEAR_BANDIT_STATE_PATH
+        bandit = LinearThompsonBandit.load_or_create(bandit_path)
+    else:
+        bandit_path = BANDIT_STATE_PATH
+        bandit = ThompsonBandit.load_or_create(bandit_path)
+    checkpointer = StateCheckpointer(bandit, bandit_path, debounce=5.0, keep=BANDIT_CHECKPOINT_GENERATIONS)
+    history = StreamHistory(STREAM_HISTORY_PATH)
+    decision_log = DecisionLog(BANDIT_DECISION_LOG_PATH)
 
     analytics = AnalyticsAgent(bus, collector)
+    recorder = StreamRecorder(bus)
+    moments = MomentDetector(bus)
+    goals = DonationGoalTracker(bus, state_path=DONATION_GOALS_PATH)
+    clip_jobs = ClipJobQueue(bus, state_path=CLIP_JOBS_PATH, concurrency=2)
+    clipper = ClipExtractor(bus, SegmentRing(SEGMENT_DIR), clips_dir=CLIPS_DIR, jobs=clip_jobs)
+    performer = Performer(settings.vtuber_frontend_url, cache=TTSCache(TTS_CACHE_DIR))
+    speech = SpeechScheduler(bus, performer)
     orchestrator = OrchestratorAgent(
         collector=collector,
         bandit=bandit,
-        bandit_save_path=BANDIT_STATE_PATH,
+        checkpointer=checkpointer,
+        decision_log=decision_log,
     )
 
-    app = create_app(analytics)
+    app = create_app(analytics, history=history, goals=goals)
     bot = VTuberBot(bus, queue)
     bridge = TwitchBridge(queue)
 
@@ -99,12 +162,25 @@ async def main() -> None:
     for sig in (signal.SIGINT, signal.SIGTERM):
         loop.add_signal_handler(sig, _signal_handler)
 
+    clip_jobs.start()
+
     config = uvicorn.Config(app, host="0.0.0.0", port=8000, log_level="warning")
     server = uvicorn.Server(config)
 
+    # Fixed lines and the goal-complete line are synthesized before anyone needs them.
+    prewarm_lines = template_lines(
+        [*SUB_RESPONSES.values(), *DONATION_RESPONSES_NEW, *DONATION_RESPONSES_RETURNING, GOAL_COMPLETE_TEMPLATE],
+        [{"description": goal.description} for goal in goals.goals],
+    )
+
     tasks = [
+        asyncio.create_task(performer.prewarm(prewarm_lines, emotions=("neutral", "excited")), name="tts-prewarm"),
         asyncio.create_task(bridge.run(), name="bridge"),
         asyncio.create_task(analytics.broadcast_loop(), name="analytics-broadcast"),
+        asyncio.create_task(
+            recorder.sample_loop(collector, lambda: analytics._current_activity),
+            name="stream-recorder",
+        ),
         asyncio.create_task(
             orchestrator.run_loop(
                 bus,
@@ -112,6 +188,7 @@ async def main() -> None:
             ),
             name="orchestrator",
         ),
+        asyncio.create_task(speech.run(), name="speech"),
         asyncio.create_task(server.serve(), name="uvicorn"),
         asyncio.create_task(bot.start(), name="twitch-bot"),
     ]
@@ -120,16 +197,31 @@ async def main() -> None:
     print(f"  - Twitch bot: {settings.twitch_channel}")
     print(f"  - Analytics API: http://0.0.0.0:8000")
     print(f"  - WebSocket: ws://0.0.0.0:8000/ws/metrics")
-    print(f"  - Orchestrator: polling every 5s with bandit")
+    print(f"  - Orchestrator: event-driven (quiet check every 5s) with bandit")
     print(f"  - Bridge: forwarding to Open-LLM-VTuber")
+    print(f"  - Performer: {settings.vtuber_frontend_url} (speech via SpeechScheduler)")
 
     await shutdown_event.wait()
 
-    await run_retrospective(analytics, bandit)
+    await run_retrospective(analytics, bandit, history, recorder, checkpointer)
+    policy = orchestrator.policy
+    print(
+        f"[orchestrator] LLM escalation rate {policy.escalation_rate:.0%} "
+        f"({policy.llm_calls_per_hour():.1f} calls/hr, {dict(policy.stats)})"
+    )
+    print(f"[orchestrator] token usage: {orchestrator.budget.report()}")
+    print(f"[performer] tts cache: {performer.cache.report()}")
+    print(f"[clip] {moments.stats['moments']} clip moments detected, {clipper.stats['clips']} clips saved to {CLIPS_DIR}")
+    await clipper.close()
+    await clip_jobs.close()
+    await goals.close()
+    decision_log.close()
 
     for t in tasks:
         t.cancel()
     await asyncio.gather(*tasks, return_exceptions=True)
+    await performer.close()
+    history.close()
     print("[main] Shutdown complete.")
 
 